@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
-from starlette.status import HTTP_404_NOT_FOUND, HTTP_401_UNAUTHORIZED
+from fastapi import APIRouter, HTTPException, Depends, Request
+from starlette.status import HTTP_404_NOT_FOUND, HTTP_401_UNAUTHORIZED, HTTP_429_TOO_MANY_REQUESTS
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.deps import get_db
+from app.api.deps import get_db, get_current_user_id
 from app.repositories.user_repo import UserRepository
-from app.core.security import create_access_token, verify_password
+from app.core.security import create_access_token, PASSWORDS
+from app.services.login_throttle import LOGIN_THROTTLE
 from app.core.config import settings
 from app.schemas.auth import GuestTokenIn, TokenOut, LoginRequest
 from app.schemas.user import UserOut  # используем существующую схему
@@ -30,17 +31,27 @@ async def guest_token(payload: GuestTokenIn, db: AsyncSession = Depends(get_db))
 
 # ДОБАВЛЯЕМ ЭНДПОИНТ ЛОГИНА
 @router.post("/login", response_model=TokenOut)
-async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)) -> TokenOut:
+async def login(payload: LoginRequest, request: Request, db: AsyncSession = Depends(get_db)) -> TokenOut:
     repo = UserRepository(db)
 
+    # перебор и флуд отсекаем до bcrypt
+    ip = request.client.host if request.client else None
+    retry_after = LOGIN_THROTTLE.check(account=payload.email, ip=ip)
+    if retry_after:
+        raise HTTPException(HTTP_429_TOO_MANY_REQUESTS, "Too many login attempts",
+                            headers={"Retry-After": str(retry_after)})
+
     # Ищем пользователя по email
     user = await repo.get_by_email(payload.email)
     if not user or not user.password_hash:
+        LOGIN_THROTTLE.failure(payload.email, ip)
         raise HTTPException(HTTP_401_UNAUTHORIZED, "Invalid credentials")
 
-    # Проверяем пароль
-    if not verify_password(payload.password, user.password_hash):
+    # Проверяем пароль (bcrypt — в пуле, не на event loop)
+    if not await PASSWORDS.verify(payload.password, user.password_hash):
+        LOGIN_THROTTLE.failure(payload.email, ip)
         raise HTTPException(HTTP_401_UNAUTHORIZED, "Invalid credentials")
+    LOGIN_THROTTLE.success(payload.email, ip)
 
     # Создаем токен
     token = create_access_token(user_id=user.id)
@@ -57,4 +68,19 @@ async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)) -> To
             public_key_pem=user.public_key_pem,
             email=user.email
         )
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/me", response_model=UserOut)
+async def me(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)) -> UserOut:
+    """Текущий пользователь по Bearer-токену."""
+    user = await UserRepository(db).get(user_id)
+    if not user:
+        raise HTTPException(HTTP_401_UNAUTHORIZED, "User not found")
+    return UserOut(
+        id=user.id,
+        nickname=user.nickname,
+        avatar_url=user.avatar_url,
+        public_key_pem=user.public_key_pem,
+        email=user.email
+    )
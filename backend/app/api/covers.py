@@ -1,8 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from starlette.status import HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN, HTTP_413_CONTENT_TOO_LARGE
 from sqlalchemy.ext.asyncio import AsyncSession
-from pathlib import Path
-import shutil
+
+from app.services.covers import COVERS, CoverService
+from app.services.blobs import discard
 
 from app.api.deps import get_db
 from app.repositories.room_repo import RoomRepository
@@ -10,8 +11,6 @@ from app.repositories.membership_repo import MembershipRepository
 
 router = APIRouter()
 
-COVERS_DIR = Path("static/covers")
-
 async def _ensure_admin(db: AsyncSession, room_slug: str, actor_user_id: int):
     rrepo = RoomRepository(db); mrepo = MembershipRepository(db)
     room = await rrepo.get_by_slug(room_slug)
@@ -23,39 +22,35 @@ async def _ensure_admin(db: AsyncSession, room_slug: str, actor_user_id: int):
         raise HTTPException(HTTP_403_FORBIDDEN, "Admin/Owner required")
     return room
 
-def _cover_path(slug: str) -> Path | None:
-    COVERS_DIR.mkdir(parents=True, exist_ok=True)
-    for p in COVERS_DIR.glob(f"{slug}.*"):
-        return p
-    return None
-
 @router.post("/{room_slug}/upload")
 async def upload_cover(room_slug: str, actor_user_id: int, file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
     room = await _ensure_admin(db, room_slug, actor_user_id)
-    COVERS_DIR.mkdir(parents=True, exist_ok=True)
-    # удалим старую
-    old = _cover_path(room.slug)
-    if old and old.exists():
-        try: old.unlink()
-        except Exception: pass
-    # сохраним новую
-    ext = Path(file.filename).suffix or ".jpg"
-    dest = COVERS_DIR / f"{room.slug}{ext}"
-    with dest.open("wb") as out:
-        shutil.copyfileobj(file.file, out)
-    return {"cover_url": f"/static/covers/{dest.name}"}
+    try:
+        out, stale = await CoverService(RoomRepository(db)).upload(room, file)
+    except ValueError as e:
+        code = HTTP_413_CONTENT_TOO_LARGE if str(e) == "file_too_large" else HTTP_400_BAD_REQUEST
+        raise HTTPException(code, str(e))
+    await db.commit()
+    COVERS.invalidate(room.slug)
+    await discard(stale)  # старые файлы — только после коммита новых URL
+    return {"cover_url": out["cover_url"], "cover_urls": out["cover_urls"]}
 
 @router.get("/{room_slug}")
-async def get_cover(room_slug: str):
-    p = _cover_path(room_slug)
-    if not p:
+async def get_cover(room_slug: str, db: AsyncSession = Depends(get_db)):
+    # метаданные из строки комнаты (кэшируются в памяти) — без сканирования каталога
+    try:
+        out = await COVERS.get(RoomRepository(db), room_slug)
+    except ValueError:
+        out = None
+    if not out:
         raise HTTPException(HTTP_404_NOT_FOUND, "No cover")
-    return {"cover_url": f"/static/covers/{p.name}"}
+    return {"cover_url": out["cover_url"], "cover_urls": out["cover_urls"]}
 
 @router.delete("/{room_slug}")
 async def delete_cover(room_slug: str, actor_user_id: int, db: AsyncSession = Depends(get_db)):
     room = await _ensure_admin(db, room_slug, actor_user_id)
-    p = _cover_path(room.slug)
-    if p and p.exists():
-        p.unlink()
+    stale = await CoverService(RoomRepository(db)).delete(room)
+    await db.commit()
+    COVERS.invalidate(room.slug)
+    await discard(stale)
     return {"ok": True}
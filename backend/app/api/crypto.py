@@ -8,6 +8,7 @@ from app.repositories.membership_repo import MembershipRepository
 from app.repositories.user_repo import UserRepository
 from app.repositories.crypto_repo import CryptoRepository
 from app.services.crypto import CryptoService
+from app.services.key_delivery import KEY_DELIVERY
 
 router = APIRouter()
 
@@ -18,6 +19,8 @@ def _svc(db: AsyncSession) -> CryptoService:
 async def init_room_key(room_slug: str, actor_user_id: int = Query(...), db: AsyncSession = Depends(get_db)):
     try:
         res = await _svc(db).init_room_key(room_slug=room_slug, actor_user_id=actor_user_id)
+        await db.commit()
+        KEY_DELIVERY.mark_keyed(res["room_id"])
         return res
     except ValueError as e:
         if str(e) == "forbidden":
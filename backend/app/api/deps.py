@@ -1,10 +1,13 @@
 from collections.abc import AsyncGenerator
-from fastapi import Depends
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Query
+from starlette.status import HTTP_401_UNAUTHORIZED
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import SessionLocal
 from app.repositories.room_repo import RoomRepository
 from app.services.rooms import RoomService
+from app.services.tokens import TOKENS
 
 # Глобальный автокоммит на каждый успешный запрос REST.
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -22,3 +25,19 @@ async def get_room_repo(db: AsyncSession = Depends(get_db)) -> AsyncGenerator[Ro
 
 async def get_room_service(repo: RoomRepository = Depends(get_room_repo)) -> AsyncGenerator[RoomService, None]:
     yield RoomService(repo)
+
+
+# Текущий пользователь по JWT: заголовок Authorization: Bearer <token> или ?token=
+# (как у WS). Проверка через общий кэш TOKENS.
+async def get_current_user_id(
+    authorization: Optional[str] = Header(None),
+    token: Optional[str] = Query(None, include_in_schema=False),
+) -> int:
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    if not token:
+        raise HTTPException(HTTP_401_UNAUTHORIZED, "Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return TOKENS.user_id(token)
+    except ValueError:
+        raise HTTPException(HTTP_401_UNAUTHORIZED, "Invalid token", headers={"WWW-Authenticate": "Bearer"})
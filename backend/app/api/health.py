@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from starlette.status import HTTP_200_OK, HTTP_503_SERVICE_UNAVAILABLE
+
+from app.services.health import HEALTH
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def live():
+    """Liveness: процесс жив и event loop отвечает (БД не трогаем)."""
+    return {"status": "alive", "uptime_seconds": round(HEALTH.uptime_seconds(), 1)}
+
+
+@router.get("/ready")
+async def ready():
+    """Readiness по последней фоновой проверке: 503 — вывести воркер из ротации."""
+    res = HEALTH.readiness()
+    return ORJSONResponse(res, status_code=HTTP_200_OK if res["ready"] else HTTP_503_SERVICE_UNAVAILABLE)
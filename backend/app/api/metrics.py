@@ -1,9 +1,15 @@
 # app/api/metrics.py
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
 from app.services.metrics import metrics_service
+from app.services.system_sampler import SAMPLER
+from app.services.health import HEALTH
+from app.utils.prometheus import CONTENT_TYPE
 from app.schemas.metrics import SystemStats, HealthCheck
 
 router = APIRouter()
+# /metrics для скрейпера Prometheus — без префикса /api
+prom_router = APIRouter()
 
 @router.get("/system", response_model=SystemStats)
 async def get_system_metrics():
@@ -15,6 +21,41 @@ async def get_performance_metrics():
     """Получить метрики производительности"""
     return metrics_service.get_performance_metrics()
 
+@router.get("/uploads")
+async def get_upload_metrics():
+    """Пропускная способность загрузок файлов (записи/обложки/аватары)"""
+    return metrics_service.get_upload_metrics()
+
+@router.get("/samples")
+async def get_system_samples(minutes: int = Query(60, ge=1, le=24 * 60)):
+    """История замеров CPU/памяти фонового сэмплера"""
+    return SAMPLER.history(minutes * 60)
+
+@router.get("/sql")
+async def get_sql_metrics():
+    """SQL-выражения и время в БД по маршрутам и типам WS-сообщений"""
+    return metrics_service.get_sql_metrics()
+
+@router.get("/event-loop")
+async def get_loop_metrics():
+    """Задержка event loop и последние зависания со стеком"""
+    return metrics_service.get_loop_metrics()
+
+@router.get("/hub")
+async def get_hub_metrics():
+    """WS-хаб: соединения, комнаты, участники по комнатам, ошибки отправки"""
+    return metrics_service.get_hub_metrics()
+
+@router.get("/latency")
+async def get_latency_metrics():
+    """p50/p95/p99 по HTTP-маршрутам и типам WS-сообщений"""
+    return metrics_service.get_latency_metrics()
+
+@router.get("/auth")
+async def get_auth_metrics():
+    """Проверка токенов: попадания в кэш и стоимость полной проверки"""
+    return metrics_service.get_auth_metrics()
+
 @router.get("/rooms/{room_slug}")
 async def get_room_metrics(room_slug: str):
     """Получить метрики комнаты"""
@@ -33,4 +74,11 @@ async def get_all_metrics(
 @router.get("/health", response_model=HealthCheck)
 async def health_check():
     """Health check с метриками"""
-    return metrics_service.get_health_status()
\ No newline at end of file
+    return HEALTH.snapshot() or await HEALTH.check_once()
+
+
+@prom_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Метрики в text exposition format"""
+    body = "".join(metrics_service.prometheus_families())
+    return Response(body, media_type=CONTENT_TYPE)
@@ -6,6 +6,7 @@ from app.repositories.membership_repo import MembershipRepository
 from app.repositories.room_repo import RoomRepository
 from app.repositories.user_repo import UserRepository
 from app.services.participants import ParticipantService
+from app.services.key_delivery import KEY_DELIVERY
 from app.schemas.membership import (
     ParticipantJoinIn,
     ParticipantLeaveIn,
@@ -36,6 +37,9 @@ async def join(payload: ParticipantJoinIn, db: AsyncSession = Depends(get_db)) -
         if msg == "invite_required_or_invalid":
             raise HTTPException(HTTP_400_BAD_REQUEST, "Invite required or invalid")
         raise
+    # ключ комнаты опоздавшему — в фоне и только после коммита членства
+    await db.commit()
+    KEY_DELIVERY.schedule(room_slug=payload.room_slug, room_id=m.room_id, user_id=m.user_id)
     from app.services.participants import ONLINE_TTL_SECONDS
     from datetime import datetime, timedelta
     is_online = (datetime.utcnow() - m.last_seen) <= timedelta(seconds=ONLINE_TTL_SECONDS)
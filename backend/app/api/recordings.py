@@ -1,17 +1,37 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from starlette.status import HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request, Header, Response
+from starlette.responses import FileResponse
+from starlette.status import (
+    HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN, HTTP_409_CONFLICT,
+    HTTP_413_CONTENT_TOO_LARGE, HTTP_304_NOT_MODIFIED,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db
 from app.repositories.room_repo import RoomRepository
 from app.repositories.recording_repo import RecordingRepository
 from app.repositories.membership_repo import MembershipRepository
+from app.repositories.upload_repo import UploadRepository
+from app.services.blobs import discard
 from app.services.recording import RecordingService
+from app.schemas.upload import UploadCreateIn, UploadStatusOut
 
 router = APIRouter()
 
 def _svc(db: AsyncSession) -> RecordingService:
-    return RecordingService(RoomRepository(db), MembershipRepository(db), RecordingRepository(db))
+    return RecordingService(RoomRepository(db), MembershipRepository(db), RecordingRepository(db), UploadRepository(db))
+
+_UPLOAD_ERRORS = {
+    "room_not_found": HTTP_404_NOT_FOUND,
+    "upload_not_found": HTTP_404_NOT_FOUND,
+    "file_too_large": HTTP_413_CONTENT_TOO_LARGE,
+    "chunk_out_of_range": HTTP_400_BAD_REQUEST,
+    "chunk_incomplete": HTTP_400_BAD_REQUEST,
+    "upload_incomplete": HTTP_409_CONFLICT,
+    "upload_part_missing": HTTP_409_CONFLICT,
+}
+
+def _upload_error(e: ValueError) -> HTTPException:
+    return HTTPException(_UPLOAD_ERRORS.get(str(e), HTTP_400_BAD_REQUEST), str(e))
 
 @router.post("/{room_slug}/upload")
 async def upload_record(
@@ -26,16 +46,84 @@ async def upload_record(
         return await _svc(db).save_file(
             room_slug=room_slug,
             uploader_user_id=uploader_user_id,
-            filename=file.filename,
-            file_obj=file.file,
+            file=file,
             title=title,
             duration_sec=duration_sec,
         )
     except PermissionError:
         raise HTTPException(HTTP_403_FORBIDDEN, "Forbidden")
     except ValueError as e:
+        if str(e) == "file_too_large":
+            raise HTTPException(HTTP_413_CONTENT_TOO_LARGE, str(e))
         raise HTTPException(HTTP_404_NOT_FOUND, str(e))
 
+# --- возобновляемая загрузка больших записей ---
+# POST /uploads -> PUT /uploads/{id}?offset=N (сырое тело, куски можно слать параллельно)
+# -> GET /uploads/{id} (где продолжить) -> POST /uploads/{id}/complete
+
+@router.post("/{room_slug}/uploads", response_model=UploadStatusOut)
+async def create_upload(room_slug: str, payload: UploadCreateIn, db: AsyncSession = Depends(get_db)):
+    try:
+        return await _svc(db).create_upload(
+            room_slug=room_slug,
+            uploader_user_id=payload.uploader_user_id,
+            filename=payload.filename,
+            size=payload.size,
+            title=payload.title,
+            duration_sec=payload.duration_sec,
+        )
+    except PermissionError:
+        raise HTTPException(HTTP_403_FORBIDDEN, "Forbidden")
+    except ValueError as e:
+        raise _upload_error(e)
+
+@router.put("/{room_slug}/uploads/{upload_id}", response_model=UploadStatusOut)
+async def put_upload_chunk(
+    room_slug: str,
+    upload_id: str,
+    offset: int,
+    user_id: int,
+    request: Request,
+    content_length: int | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        return await _svc(db).put_chunk(
+            room_slug=room_slug, upload_id=upload_id, user_id=user_id,
+            offset=offset, length=content_length, body=request.stream(),
+        )
+    except PermissionError:
+        raise HTTPException(HTTP_403_FORBIDDEN, "Forbidden")
+    except ValueError as e:
+        raise _upload_error(e)
+
+@router.get("/{room_slug}/uploads/{upload_id}", response_model=UploadStatusOut)
+async def get_upload_status(room_slug: str, upload_id: str, user_id: int, db: AsyncSession = Depends(get_db)):
+    try:
+        return await _svc(db).upload_status(room_slug=room_slug, upload_id=upload_id, user_id=user_id)
+    except PermissionError:
+        raise HTTPException(HTTP_403_FORBIDDEN, "Forbidden")
+    except ValueError as e:
+        raise _upload_error(e)
+
+@router.post("/{room_slug}/uploads/{upload_id}/complete")
+async def complete_upload(room_slug: str, upload_id: str, user_id: int, db: AsyncSession = Depends(get_db)):
+    try:
+        return await _svc(db).complete_upload(room_slug=room_slug, upload_id=upload_id, user_id=user_id)
+    except PermissionError:
+        raise HTTPException(HTTP_403_FORBIDDEN, "Forbidden")
+    except ValueError as e:
+        raise _upload_error(e)
+
+@router.delete("/{room_slug}/uploads/{upload_id}")
+async def abort_upload(room_slug: str, upload_id: str, user_id: int, db: AsyncSession = Depends(get_db)):
+    try:
+        return {"ok": await _svc(db).abort_upload(room_slug=room_slug, upload_id=upload_id, user_id=user_id)}
+    except PermissionError:
+        raise HTTPException(HTTP_403_FORBIDDEN, "Forbidden")
+    except ValueError as e:
+        raise _upload_error(e)
+
 @router.get("/{room_slug}")
 async def list_records(room_slug: str, limit: int = 100, db: AsyncSession = Depends(get_db)):
     try:
@@ -43,13 +131,51 @@ async def list_records(room_slug: str, limit: int = 100, db: AsyncSession = Depe
     except ValueError as e:
         raise HTTPException(HTTP_404_NOT_FOUND, str(e))
 
+# --- раздача записей для плееров ---
+
+# файл записи не перезаписывается (уникальное имя), поэтому кэшируем навсегда
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+class MediaFileResponse(FileResponse):
+    """
+    FileResponse с крупными кусками: Range/206/416 и If-Range — из Starlette;
+    при поддержке сервером ASGI-расширения http.response.pathsend файл целиком
+    отдаётся самим сервером (sendfile), без чтения в воркере.
+    """
+    chunk_size = 1024 * 1024
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+@router.api_route("/{room_slug}/{rec_id}/media", methods=["GET", "HEAD"])
+async def recording_media(
+    room_slug: str,
+    rec_id: int,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        path, rec = await _svc(db).media_file(room_slug=room_slug, rec_id=rec_id)
+    except ValueError as e:
+        raise HTTPException(HTTP_404_NOT_FOUND, str(e))
+    etag = f'"{rec.sha256}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE, "Accept-Ranges": "bytes"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+    return MediaFileResponse(path, headers=headers)
+
 @router.delete("/{room_slug}/{rec_id}")
 async def delete_record(room_slug: str, rec_id: int, actor_user_id: int, db: AsyncSession = Depends(get_db)):
     svc = _svc(db)
     try:
-        ok = await svc.delete(room_slug=room_slug, rec_id=rec_id, actor_user_id=actor_user_id)
-        return {"ok": ok}
+        ok, stale = await svc.delete(room_slug=room_slug, rec_id=rec_id, actor_user_id=actor_user_id)
     except PermissionError:
         raise HTTPException(HTTP_403_FORBIDDEN, "Forbidden")
     except ValueError as e:
         raise HTTPException(HTTP_404_NOT_FOUND, str(e))
+    await db.commit()
+    await discard(stale)  # файл старой записи — только после коммита удаления строки
+    return {"ok": ok}
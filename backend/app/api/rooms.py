@@ -4,6 +4,8 @@ from starlette.status import HTTP_404_NOT_FOUND, HTTP_201_CREATED
 
 from app.api.deps import get_room_service
 from app.services.rooms import RoomService
+from app.services.covers import cover_payload
+from app.models.room import Room
 from app.schemas.room import (
     RoomCreate,
     RoomOut,
@@ -14,6 +16,19 @@ from app.schemas.room import (
 
 router = APIRouter()
 
+def _room_out(room: Room, svc: RoomService, schema=RoomOut):
+    cover = cover_payload(room) or {}
+    return schema(
+        id=room.id,
+        slug=room.slug,
+        title=room.title,
+        is_private=room.is_private,
+        invite_key=room.invite_key,
+        invite_url=svc.make_invite_url(room),
+        cover_url=cover.get("cover_url"),
+        cover_urls=cover.get("cover_urls"),
+    )
+
 @router.post("", response_model=RoomOut, status_code=HTTP_201_CREATED)
 async def create_room(payload: RoomCreate, svc: RoomService = Depends(get_room_service)) -> RoomOut:
     room = await svc.create_room(
@@ -22,43 +37,19 @@ async def create_room(payload: RoomCreate, svc: RoomService = Depends(get_room_s
         create_invite=payload.create_invite,
         created_by=payload.created_by,
     )
-    return RoomOut(
-        id=room.id,
-        slug=room.slug,
-        title=room.title,
-        is_private=room.is_private,
-        invite_key=room.invite_key,
-        invite_url=svc.make_invite_url(room),
-    )
+    return _room_out(room, svc)
 
 @router.get("", response_model=List[RoomListItem])
 async def list_rooms(svc: RoomService = Depends(get_room_service)) -> List[RoomListItem]:
     rooms = await svc.repo.list()
-    return [
-        RoomListItem(
-            id=r.id,
-            slug=r.slug,
-            title=r.title,
-            is_private=r.is_private,
-            invite_key=r.invite_key,
-            invite_url=svc.make_invite_url(r),
-        )
-        for r in rooms
-    ]
+    return [_room_out(r, svc, RoomListItem) for r in rooms]
 
 @router.get("/{slug}", response_model=RoomOut)
 async def get_room(slug: str, svc: RoomService = Depends(get_room_service)) -> RoomOut:
     room = await svc.repo.get_by_slug(slug)
     if not room:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Room not found")
-    return RoomOut(
-        id=room.id,
-        slug=room.slug,
-        title=room.title,
-        is_private=room.is_private,
-        invite_key=room.invite_key,
-        invite_url=svc.make_invite_url(room),
-    )
+    return _room_out(room, svc)
 
 @router.get("/{slug}/exists", response_model=RoomExistsOut)
 async def room_exists(slug: str, svc: RoomService = Depends(get_room_service)) -> RoomExistsOut:
@@ -69,11 +60,4 @@ async def join_by_invite(payload: RoomJoinByInviteIn, svc: RoomService = Depends
     room = await svc.repo.get_by_invite_key(payload.invite_key)
     if not room:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Invalid invite key")
-    return RoomOut(
-        id=room.id,
-        slug=room.slug,
-        title=room.title,
-        is_private=room.is_private,
-        invite_key=room.invite_key,
-        invite_url=svc.make_invite_url(room),
-    )
+    return _room_out(room, svc)
@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.status import HTTP_404_NOT_FOUND
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_413_CONTENT_TOO_LARGE, HTTP_429_TOO_MANY_REQUESTS
 from pathlib import Path
-from app.core.security import get_password_hash, verify_password
-import shutil
-import bcrypt
+from app.core.security import PASSWORDS
+import json
 from typing import Optional
 
 from app.api.deps import get_db
+from app.core.config import settings
+from app.services.blobs import BlobStore, discard
+from app.services.login_throttle import LOGIN_THROTTLE
+from app.services.images import IMAGES, ImagesBusy, stale_variants
 from app.repositories.user_repo import UserRepository
+from app.repositories.blob_repo import BlobRepository
 from app.schemas.user import UserCreate, UserUpdate, UserOut
 
 router = APIRouter()
 
 
+def _avatar_urls(user) -> dict | None:
+    return json.loads(user.avatar_variants) if user.avatar_variants else None
+
+
 # app/api/users.py
 @router.post("", response_model=UserOut)
 async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
@@ -29,7 +37,7 @@ async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
     # Хешируем пароль если указан
     password_hash = None
     if payload.password:
-        password_hash = get_password_hash(payload.password)
+        password_hash = await PASSWORDS.hash(payload.password)
 
     # Создаем пользователя
     user = await repo.create(
@@ -50,6 +58,7 @@ async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
         id=user.id,
         nickname=user.nickname,
         avatar_url=user.avatar_url,
+        avatar_urls=_avatar_urls(user),
         public_key_pem=user.public_key_pem,
         email=user.email
     )
@@ -67,6 +76,7 @@ async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
         id=user.id,
         nickname=user.nickname,
         avatar_url=user.avatar_url,
+        avatar_urls=_avatar_urls(user),
         public_key_pem=user.public_key_pem,
         email=user.email
     )
@@ -79,16 +89,22 @@ async def update_user(user_id: int, payload: UserUpdate, db: AsyncSession = Depe
     if not user:
         raise HTTPException(404, "User not found")
 
+    stale = []
     if payload.nickname is not None:
         user.nickname = payload.nickname
     if payload.avatar_url is not None:
+        stale = stale_variants(_avatar_urls(user))
         user.avatar_url = payload.avatar_url
+        user.avatar_variants = None  # внешний URL — производных нет
+        await BlobStore(BlobRepository(db)).release(user.avatar_sha256, None)
+        user.avatar_sha256 = None
     if payload.public_key_pem is not None:
         user.public_key_pem = payload.public_key_pem
     if payload.email is not None:
         user.email = payload.email
 
     await db.commit()
+    await discard(stale)
     await db.refresh(user)
 
     # Преобразуем SQLAlchemy модель в Pydantic модель
@@ -96,6 +112,7 @@ async def update_user(user_id: int, payload: UserUpdate, db: AsyncSession = Depe
         id=user.id,
         nickname=user.nickname,
         avatar_url=user.avatar_url,
+        avatar_urls=_avatar_urls(user),
         public_key_pem=user.public_key_pem,
         email=user.email
     )
@@ -108,13 +125,37 @@ async def upload_avatar(user_id: int, file: UploadFile = File(...), db: AsyncSes
     if not user:
         raise HTTPException(HTTP_404_NOT_FOUND, "User not found")
 
-    Path("static/avatars").mkdir(parents=True, exist_ok=True)
-    dest = Path("static/avatars") / f"user_{user_id}{Path(file.filename).suffix}"
-    with dest.open("wb") as out:
-        shutil.copyfileobj(file.file, out)
-
-    user.avatar_url = f"/static/avatars/{dest.name}"
+    blobs = BlobStore(BlobRepository(db))
+    try:
+        tmp, size, sha256 = await blobs.stage_upload(
+            file, max_bytes=settings.upload_max_avatar_mb * 1024 * 1024, kind="avatar")
+    except ValueError as e:
+        raise HTTPException(HTTP_413_CONTENT_TOO_LARGE, str(e))
+
+    # клиентам отдаём не оригинал, а WebP-производные с хэшем в имени
+    try:
+        variants = await IMAGES.avatar(tmp, user_id)
+    except ValueError as e:
+        tmp.unlink(missing_ok=True)
+        raise HTTPException(HTTP_400_BAD_REQUEST, str(e))
+    except ImagesBusy:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    # оригинал — в content-addressed хранилище; аватары до него лежали в static/avatars
+    await blobs.publish(tmp, size, sha256, file.filename, file.content_type)
+    # устаревшие производные — из заменяемой строки: файлы параллельной загрузки не наши
+    stale = stale_variants(_avatar_urls(user), variants)
+    if user.avatar_sha256:
+        await blobs.release(user.avatar_sha256, None)
+    else:
+        stale += Path("static/avatars").glob(f"user_{user_id}.*")
+    user.avatar_sha256 = sha256
+    user.avatar_url = variants["128"]  # размер плитки участника
+    user.avatar_variants = json.dumps(variants)
     await db.commit()
+    # старые файлы — только после коммита: до него строка ссылается на них
+    await discard(stale)
     await db.refresh(user)
 
     # Исправляем Pydantic валидацию - создаем UserOut явно
@@ -122,6 +163,7 @@ async def upload_avatar(user_id: int, file: UploadFile = File(...), db: AsyncSes
         id=user.id,
         nickname=user.nickname,
         avatar_url=user.avatar_url,
+        avatar_urls=_avatar_urls(user),
         public_key_pem=user.public_key_pem,
         email=user.email
     )
@@ -134,9 +176,13 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     if not user:
         raise HTTPException(404, "User not found")
 
-    # Удаляем пользователя
+    # Удаляем пользователя; оригинал аватара больше не нужен — отпускаем блоб
+    stale = stale_variants(_avatar_urls(user))
+    if user.avatar_sha256:
+        await BlobStore(BlobRepository(db)).release(user.avatar_sha256, None)
     await db.delete(user)
     await db.commit()
+    await discard(stale)
 
     return {"message": "User deleted successfully"}
 
@@ -150,6 +196,7 @@ class ChangePasswordRequest(BaseModel):
 async def change_password(
         user_id: int,
         payload: ChangePasswordRequest,
+        request: Request,
         db: AsyncSession = Depends(get_db)
 ):
     repo = UserRepository(db)
@@ -157,10 +204,18 @@ async def change_password(
     if not user:
         raise HTTPException(404, "User not found")
 
-    if not user.password_hash or not verify_password(payload.current_password, user.password_hash):
+    # проверка текущего пароля — тот же перебор, что и при входе
+    account = f"user:{user_id}"
+    ip = request.client.host if request.client else None
+    retry_after = LOGIN_THROTTLE.check(account=account, ip=ip)
+    if retry_after:
+        raise HTTPException(HTTP_429_TOO_MANY_REQUESTS, "Too many attempts", headers={"Retry-After": str(retry_after)})
+    if not user.password_hash or not await PASSWORDS.verify(payload.current_password, user.password_hash):
+        LOGIN_THROTTLE.failure(account, ip)
         raise HTTPException(400, "Current password is incorrect")
+    LOGIN_THROTTLE.success(account, ip)
 
-    user.password_hash = get_password_hash(payload.new_password)
+    user.password_hash = await PASSWORDS.hash(payload.new_password)
 
     await db.commit()
     await db.refresh(user)
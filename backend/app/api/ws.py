@@ -20,27 +20,13 @@ from app.services.chat import ChatService
 from app.services.state import StateService
 from app.services.media import MediaService
 from app.services.sync import SyncService
-from app.core.security import get_user_id_from_token
-from app.services.metrics import MetricsService
+from app.services.key_delivery import KEY_DELIVERY
+from app.services.tokens import TOKENS
+from app.db import sql_stats
+from app.services.metrics import MetricsService, metrics_service
 
 router = APIRouter()
 
-# Глобальный экземпляр метрик для reuse между подключениями
-_metrics_service = None
-
-
-def get_metrics_service(db: AsyncSession) -> MetricsService:
-    """Получить или создать сервис метрик"""
-    global _metrics_service
-    if _metrics_service is None:
-        _metrics_service = MetricsService(
-            room_repo=RoomRepository(db),
-            user_repo=UserRepository(db),
-            message_repo=MessageRepository(db),
-            membership_repo=MembershipRepository(db)
-        )
-    return _metrics_service
-
 
 @router.websocket("/ws/rooms/{room_slug}")
 async def ws_room(
@@ -55,7 +41,7 @@ async def ws_room(
     await websocket.accept()
 
     try:
-        user_id = get_user_id_from_token(token)
+        user_id = TOKENS.user_id(token)
     except Exception as e:
         await _safe_json_send(websocket, {"type": "error", "reason": "invalid_token"})
         await _safe_close(websocket, status.WS_1008_POLICY_VIOLATION)
@@ -70,9 +56,6 @@ async def ws_room(
     urepo = UserRepository(db)
     msg_repo = MessageRepository(db)
 
-    # Инициализация сервиса метрик
-    metrics_service = get_metrics_service(db)
-
     svc_part = ParticipantService(mrepo, rrepo, urepo)
     svc_chat = ChatService(msg_repo, rrepo, urepo)
     svc_state = StateService(rrepo, mrepo)
@@ -80,21 +63,16 @@ async def ws_room(
     svc_sync = SyncService(rrepo, erepo)
 
     try:
-        # JOIN
+        # JOIN: комната, пользователь, членство и seq — одним запросом, затем
+        # членство + событие member.joined одним коммитом
         try:
-            membership = await svc_part.join(room_slug=room_slug, user_id=user_id, invite_key=invite_key)
+            bundle = await svc_part.join_bundle(room_slug=room_slug, user_id=user_id, invite_key=invite_key)
+            room = bundle["room"]
+            room_id = room.id
+            ev = await svc_sync.append_for_room(room_id=room.id, type_="member.joined", payload={"user_id": user_id})
             await db.commit()
-
-            # Метрика: присоединение к комнате
-            metrics_service.increment_join_count(room_slug)
-
-            # Обновляем метрики участников
-            room = await rrepo.get_by_slug(room_slug)
-            if room:
-                participants = await mrepo.list_by_room(room_id=room.id)
-                online_count = sum(1 for p in participants if p.status == "active")
-                metrics_service.update_room_participants(room_slug, online_count)
-
+            # ключ комнаты, если он уже раздан, — обернём для этого участника в фоне
+            KEY_DELIVERY.schedule(room_slug=room_slug, room_id=room_id, user_id=user_id)
         except ValueError as e:
             error_type = f"join_error_{str(e)}"
             metrics_service.increment_errors(error_type)
@@ -102,26 +80,32 @@ async def ws_room(
             await _safe_close(websocket, status.WS_1008_POLICY_VIOLATION)
             return
 
-        # Успешное подключение
+        snap = await svc_state.snapshot_for(room)
+
+        # Метрики: присоединение и число участников (из живого состава, без SQL)
+        metrics_service.increment_join_count(room_slug)
+        metrics_service.update_room_participants(room_slug, snap["online_count"])
+
+        # Успешное подключение: один кадр с состоянием, ростером и позицией синхронизации
         await HUB.join(room_slug, user_id, websocket)
+        join_time = time.time() - connection_start_time
         await _safe_json_send(websocket, {
             "type": "joined",
             "room_slug": room_slug,
             "user_id": user_id,
-            "connection_time_ms": int((time.time() - connection_start_time) * 1000)
+            "role": bundle["membership"].role,
+            "connection_time_ms": int(join_time * 1000),
+            "state": snap,
+            "participants": [
+                {**p, "last_seen": p["last_seen"].isoformat() + "Z"} for p in bundle["participants"]
+            ],
+            "next_seq": bundle["next_seq"],
+            "seq": ev.id,
         })
-
-        # Отправка начального состояния
-        snap = await svc_state.snapshot(room_slug)
-        await _safe_json_send(websocket, {"type": "state.snapshot", **snap})
-
-        next_seq = await svc_sync.next_seq()
-        await _safe_json_send(websocket, {"type": "sync.info", "next_seq": next_seq})
+        metrics_service.record_join_time(join_time)
 
         # Уведомление других участников
-        await HUB.broadcast(room_slug, {"type": "member.joined", "user_id": user_id}, exclude={user_id})
-        ev = await svc_sync.append(room_slug=room_slug, type_="member.joined", payload={"user_id": user_id})
-        await db.commit()
+        await HUB.broadcast(room_slug, {"type": "member.joined", "seq": ev.id, "user_id": user_id}, exclude={user_id})
 
         # Основной цикл обработки сообщений
         message_count = 0
@@ -129,9 +113,8 @@ async def ws_room(
             raw = await websocket.receive_text()
             message_count += 1
 
-            # Heartbeat для поддержания активности
-            await svc_part.heartbeat(room_slug=room_slug, user_id=user_id)
-            await db.commit()
+            # Heartbeat: только в памяти (колесо присутствия + live-кэш), без записи в БД
+            mrepo.presence.touch(room_id=room_id, user_id=user_id)
 
             try:
                 msg = json.loads(raw)
@@ -143,6 +126,8 @@ async def ws_room(
                 continue
 
             mtype = msg.get("type")
+            handle_started = time.perf_counter()
+            sql = sql_stats.begin()
 
             # Метрика: WebSocket событие
             metrics_service.increment_ws_events(mtype)
@@ -182,6 +167,7 @@ async def ws_room(
                 svc_chat, svc_state, svc_media, svc_sync,
                 db, HUB
             )
+            metrics_service.record_ws_message_time(mtype, time.perf_counter() - handle_started, sql)
 
     except (WebSocketDisconnect, SWebSocketDisconnect):
         # Нормальное отключение
@@ -520,15 +506,14 @@ async def _cleanup_connection(
             # Метрики отключения
             connection_duration = time.time() - connection_start_time
             metrics_service.increment_ws_events("member_left")
-            metrics_service.record_response_time(connection_duration)
+            metrics_service.record_ws_connection_duration(connection_duration)
 
             # Обновление счетчика участников
             room_repo = RoomRepository(db)
             room = await room_repo.get_by_slug(room_slug)
             if room:
                 mrepo = MembershipRepository(db)
-                participants = await mrepo.list_by_room(room_id=room.id)
-                online_count = sum(1 for p in participants if p.status == "active")
+                online_count = await mrepo.count_active(room_id=room.id)
                 metrics_service.update_room_participants(room_slug, online_count)
 
     except Exception as e:
@@ -5,6 +5,7 @@ class Settings(BaseSettings):
     app_env: str = "dev"
     app_host: str = "0.0.0.0"
     app_port: int = 8090
+    debug: bool = False  # заголовок Server-Timing с числом SQL-запросов и временем в БД
 
     # SQLite (async)
     database_url: str = "sqlite+aiosqlite:///./axenix.db"
@@ -15,6 +16,73 @@ class Settings(BaseSettings):
     jwt_secret: str = "dev-secret-change-me"
     jwt_algorithm: str = "HS256"
     jwt_ttl_seconds: int = 24 * 3600  # 24h
+    auth_token_cache_size: int = 10_000  # проверенные токены (LRU)
+
+    # bcrypt: пул потоков и предел очереди (сверх — 503)
+    password_workers: int = 2
+    password_max_pending: int = 16
+    # Ограничение входа: неудачи на аккаунт и попытки с IP за окно (сверх — 429)
+    login_window_seconds: int = 300
+    login_max_failures_per_account: int = 5
+    login_max_attempts_per_ip: int = 30
+    login_throttle_max_keys: int = 100_000
+
+    # Присутствие: через сколько секунд без активности участник считается offline,
+    # и через сколько фоновый reaper закрывает его членство (мертвый сокет, kill воркера)
+    presence_online_ttl_seconds: int = 45
+    presence_reap_after_seconds: int = 120
+    presence_tick_seconds: float = 1.0
+    presence_reap_batch: int = 500
+
+    # Метрики активности комнат: простаивающие дольше TTL вытесняются, не больше max_rooms
+    metrics_room_ttl_seconds: int = 1800
+    metrics_max_rooms: int = 10_000
+    metrics_top_rooms: int = 10
+    # Фоновый сэмплер CPU/памяти: период и длина истории (720 * 5 с = час)
+    metrics_sample_interval_seconds: float = 5.0
+    metrics_sample_history: int = 720
+    # Проба event loop: период, порог зависания (снимается стек) и число хранимых отчётов
+    loop_probe_interval_seconds: float = 0.1
+    loop_stall_threshold_seconds: float = 0.25
+    loop_stall_history: int = 20
+    # Фоновые проверки здоровья: период, пороги warning/fail и минимум свободного места под записи
+    health_interval_seconds: float = 5.0
+    health_db_warn_ms: float = 50
+    health_db_fail_ms: float = 1000
+    health_lock_warn_ms: float = 100
+    health_lock_fail_ms: float = 2000
+    health_loop_fail_ms: float = 1000
+    health_disk_min_free_mb: int = 500
+
+    # Загрузки: лимиты размера (МБ) и размер куска копирования на диск (КБ)
+    upload_max_recording_mb: int = 2048
+    upload_max_cover_mb: int = 10
+    upload_max_avatar_mb: int = 5
+    upload_chunk_kb: int = 1024
+    # Возобновляемые загрузки записей: недокачанные файлы лежат вне static/
+    upload_tmp_dir: str = "data/uploads"
+    upload_resumable_chunk_mb: int = 8
+    # брошенная загрузка (ни одного куска дольше TTL) удаляется вместе с .part-файлом
+    upload_ttl_hours: float = 24.0
+    # Content-addressed хранилище: блоб без ссылок удаляется не раньше grace-периода
+    blob_gc_interval_seconds: float = 300.0
+    blob_gc_grace_seconds: int = 3600
+    blob_gc_batch: int = 200
+
+    # Обработка изображений (аватары/обложки): пул процессов и параметры WebP
+    image_workers: int = 2
+    image_max_pending: int = 8
+    image_quality: int = 80
+    image_max_pixels: int = 40_000_000
+
+    # Раздача ключа комнаты: RSA-OAEP в пуле процессов, разобранные публичные ключи в LRU
+    crypto_workers: int = 2
+    crypto_wrap_chunk: int = 64
+    crypto_pubkey_cache_size: int = 4096
+    # KEK для хранения ключа комнаты (base64, 32 байта). Обязателен вне dev (app_env);
+    # в dev пусто — выводится из jwt_secret с предупреждением при старте
+    crypto_kek: str = ""
+    crypto_delivery_concurrency: int = 4
 
     # RTC / ICE (STUN/TURN) — статическая конфигурация для MVP
     stun_url: str = "stun:stun.l.google.com:19302"
@@ -1,5 +1,7 @@
+import asyncio
 import time
 import jwt
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any
 from app.core.config import settings
 import bcrypt
@@ -10,6 +12,46 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
+
+class HasherBusy(RuntimeError):
+    """Очередь bcrypt переполнена — API отвечает 503 с Retry-After."""
+
+
+class PasswordHasher:
+    """
+    bcrypt в ограниченном пуле потоков: один вызов — сотни миллисекунд CPU,
+    на event loop он замораживал бы все WebSocket воркера. bcrypt отпускает GIL,
+    поэтому потоков достаточно. Сверх max_pending (выполняются + ждут) задачи
+    не принимаются: лучше быстрый 503, чем очередь на десятки секунд.
+    """
+
+    def __init__(self, workers: int = settings.password_workers, max_pending: int = settings.password_max_pending):
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise HasherBusy("hasher_busy")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+
+PASSWORDS = PasswordHasher()
+
 def create_access_token(*, user_id: int, extra: Optional[Dict[str, Any]] = None, ttl: Optional[int] = None) -> str:
     now = int(time.time())
     payload = {
@@ -0,0 +1,55 @@
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+from app.db.base import Base
+
+# Регистрируем все модели в Base.metadata
+from app.models import (  # noqa: F401
+    room, user, membership, presence, message, event, crypto, recording, notification, upload, blob,
+    migration,
+)
+
+
+def sync_schema(conn: Connection) -> None:
+    """Создать недостающие таблицы и индексы.
+
+    create_all не трогает уже существующие таблицы, поэтому индексы,
+    добавленные в модели позже, докатываем отдельно (CREATE INDEX IF NOT EXISTS).
+    """
+    Base.metadata.create_all(conn)
+    _add_missing_columns(conn)
+    insp = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.unique and index.info.get("dedupe"):
+                _drop_duplicates(conn, table, index)
+            index.create(conn)
+
+
+def _drop_duplicates(conn: Connection, table, index) -> None:
+    """
+    Перед новым уникальным индексом оставить по одной (последней по id) строке
+    на ключ. Только для индексов с info={"dedupe": True}: лишние строки там —
+    повторы, а не данные.
+    """
+    cols = ", ".join(f'"{c.name}"' for c in index.columns)
+    conn.exec_driver_sql(
+        f'DELETE FROM "{table.name}" WHERE id NOT IN (SELECT MAX(id) FROM "{table.name}" GROUP BY {cols})'
+    )
+
+
+def _add_missing_columns(conn: Connection) -> None:
+    """Докатить новые nullable-колонки в существующие таблицы (ALTER TABLE ADD COLUMN)."""
+    insp = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"cannot add NOT NULL column {table.name}.{column.name} to existing table")
+            col_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}')
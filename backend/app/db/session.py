@@ -5,12 +5,15 @@ from sqlalchemy.ext.asyncio import (
     AsyncSession,
 )
 from app.core.config import settings
+from app.db.sql_stats import instrument
 
 engine: AsyncEngine = create_async_engine(
     settings.database_url,
     echo=False,
     future=True,
 )
+# учёт SQL-выражений и времени в БД по запросам и WS-сообщениям
+instrument(engine.sync_engine)
 
 SessionLocal = async_sessionmaker(
     bind=engine,
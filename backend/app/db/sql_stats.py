@@ -0,0 +1,74 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class SqlStats:
+    """Число SQL-выражений и суммарное время в БД в рамках одной единицы работы."""
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Текущая единица работы (HTTP-запрос, WS-сообщение). Sync-события движка
+# выполняются в greenlet, куда SQLAlchemy переносит контекст вызывающей задачи.
+_CURRENT: ContextVar[Optional[SqlStats]] = ContextVar("sql_stats", default=None)
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_started", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["sql_started"].pop()
+    stats = _CURRENT.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def instrument(sync_engine: Engine) -> None:
+    """Подключить учёт к движку (для async — engine.sync_engine)."""
+    if not event.contains(sync_engine, "before_cursor_execute", _before):
+        event.listen(sync_engine, "before_cursor_execute", _before)
+        event.listen(sync_engine, "after_cursor_execute", _after)
+
+
+@contextmanager
+def track() -> Iterator[SqlStats]:
+    """Считать выражения внутри блока (вложенный блок считает только своё)."""
+    stats = SqlStats()
+    token = _CURRENT.set(stats)
+    try:
+        yield stats
+    finally:
+        _CURRENT.reset(token)
+
+
+def begin() -> SqlStats:
+    """
+    Новая единица учёта в текущем контексте до следующего begin — для цикла
+    WS-сообщений, где with на каждую итерацию неудобен. Контекст задачи
+    свой у каждого соединения, поэтому сбрасывать не нужно.
+    """
+    stats = SqlStats()
+    _CURRENT.set(stats)
+    return stats
+
+
+@contextmanager
+def query_budget(max_statements: int) -> Iterator[SqlStats]:
+    """
+    Для тестов: AssertionError, если блок выполнил больше max_statements
+    выражений. Задачи asyncio.run внутри блока наследуют его контекст.
+    """
+    with track() as stats:
+        yield stats
+    if stats.statements > max_statements:
+        raise AssertionError(f"query budget exceeded: {stats.statements} > {max_statements}")
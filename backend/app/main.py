@@ -1,10 +1,12 @@
 # app/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse, RedirectResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.status import HTTP_503_SERVICE_UNAVAILABLE
 from pathlib import Path
 
 from app.core.config import settings
+from app.core.security import HasherBusy
 from app.api import rooms as rooms_api
 from app.api import users as users_api
 from app.api import participants as participants_api
@@ -19,8 +21,22 @@ from app.api import covers as covers_api
 from app.api import recordings as recordings_api
 from app.api import ws as ws_api
 from app.api import metrics as metrics_api
+from app.api import health as health_api
 from app.db.base import Base
-from app.db.session import engine
+from app.db.schema import sync_schema
+from app.db.session import engine, SessionLocal
+from app.repositories.presence_repo import PresenceRepository
+from app.repositories.room_repo import RoomRepository
+from app.services.covers import CoverService
+from app.services.presence_reaper import REAPER
+from app.services.images import IMAGES, ImagesBusy
+from app.services.blobs import BLOB_GC
+from app.services.crypto import KEY_WRAP, check_kek
+from app.services.key_delivery import KEY_DELIVERY
+from app.services.system_sampler import SAMPLER
+from app.services.loop_monitor import LOOP_MONITOR
+from app.services.health import HEALTH
+from app.utils.static import ImmutableStaticFiles
 from app.middleware.metrics_middleware import MetricsMiddleware  # Импортируем исправленный middleware
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import notifications
@@ -29,6 +45,8 @@ from app.api import rtc
 Path("static/avatars").mkdir(parents=True, exist_ok=True)
 Path("static/covers").mkdir(parents=True, exist_ok=True)
 Path("static/records").mkdir(parents=True, exist_ok=True)
+Path("static/img").mkdir(parents=True, exist_ok=True)
+Path("static/blobs").mkdir(parents=True, exist_ok=True)
 
 tags_meta = [
     {"name": "rooms", "description": "Создание, поиск и гостевой доступ в комнаты."},
@@ -44,6 +62,7 @@ tags_meta = [
     {"name": "covers", "description": "Обложки конференций (upload/get/delete)."},
     {"name": "recordings", "description": "Загрузка/список/удаление записей; раздача из /static/records."},
     {"name": "metrics", "description": "Метрики системы и мониторинг производительности."},
+    {"name": "health", "description": "Liveness/readiness для балансировщика."},
 ]
 
 app = FastAPI(
@@ -67,9 +86,50 @@ app.add_middleware(MetricsMiddleware)
 
 @app.on_event("startup")
 async def on_startup() -> None:
+    # без KEK вне dev не стартуем: иначе ключи комнат вскрываются знанием jwt_secret
+    check_kek()
     async with engine.begin() as conn:
         # await conn.run_sync(Base.metadata.drop_all) # Дропните если ошибки тип none is_private и т.д.
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(sync_schema)
+    # живой состав комнат: перенос активных членств из БД, созданной до таблицы presence
+    async with SessionLocal() as session:
+        prepo = PresenceRepository(session)
+        await prepo.backfill_from_memberships()
+        await session.commit()
+        # колесо неактивности: участники, чьи сокеты умерли вместе с прошлым процессом,
+        # истекут по last_seen и будут закрыты reaper'ом
+        await prepo.seed_tracker()
+        # обложки, лежавшие в static/covers до колонок cover_* в room (один раз, см. таблицу migration)
+        await CoverService(RoomRepository(session)).backfill_from_disk()
+        await session.commit()
+    REAPER.start()
+    BLOB_GC.start()
+    SAMPLER.start()
+    LOOP_MONITOR.start()
+    # первая проверка до приёма трафика: readiness сразу отражает состояние БД/диска
+    await HEALTH.check_once()
+    HEALTH.start()
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await REAPER.stop()
+    await BLOB_GC.stop()
+    await SAMPLER.stop()
+    await HEALTH.stop()
+    await LOOP_MONITOR.stop()
+    await KEY_DELIVERY.drain()
+    IMAGES.shutdown()
+    KEY_WRAP.shutdown()
+
+@app.exception_handler(HasherBusy)
+async def hasher_busy(request: Request, exc: HasherBusy):
+    # очередь bcrypt переполнена (логин/регистрация/смена пароля) — клиенту стоит повторить
+    return ORJSONResponse({"detail": "Server busy, retry later"}, status_code=HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+
+@app.exception_handler(ImagesBusy)
+async def images_busy(request: Request, exc: ImagesBusy):
+    # очередь ресайза аватаров/обложек переполнена — загрузку стоит повторить
+    return ORJSONResponse({"detail": "Server busy, retry later"}, status_code=HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
 
 @app.get("/", include_in_schema=False)
 def root():
@@ -93,11 +153,15 @@ app.include_router(crypto_api.router,       prefix="/api/crypto",       tags=["c
 app.include_router(covers_api.router,       prefix="/api/covers",       tags=["covers"])
 app.include_router(recordings_api.router,   prefix="/api/recordings",   tags=["recordings"])
 app.include_router(metrics_api.router,      prefix="/api/metrics",      tags=["metrics"])
+app.include_router(metrics_api.prom_router)
+app.include_router(health_api.router,        prefix="/health",          tags=["health"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["notifications"])
 app.include_router(rtc.router, prefix="/api/rtc", tags=["rtc"])
 
 # WebSocket
 app.include_router(ws_api.router)
 
-# Static files
+# Static files: производные изображения и блобы адресуются хэшем содержимого — с immutable-кэшем
+app.mount("/static/img", ImmutableStaticFiles(directory="static/img"), name="static-img")
+app.mount("/static/blobs", ImmutableStaticFiles(directory="static/blobs"), name="static-blobs")
 app.mount("/static", StaticFiles(directory="static"), name="static")
\ No newline at end of file
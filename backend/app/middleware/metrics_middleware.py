@@ -1,28 +1,68 @@
 # app/middleware/metrics_middleware.py
 import time
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.db.sql_stats import track
 from app.services.metrics import metrics_service  # Используем глобальный экземпляр
 
 
-class MetricsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+def _route_template(scope: Scope) -> str:
+    # шаблон маршрута выставляет роутер FastAPI; без него (404) — общий ключ,
+    # чтобы сырые пути не плодили гистограммы
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    return f"{scope['method']} {path}" if path else "unmatched"
 
-        try:
-            response = await call_next(request)
 
-            # Записываем время ответа
-            response_time = time.time() - start_time
-            metrics_service.record_response_time(response_time)
+class MetricsMiddleware:
+    """
+    Чистый ASGI: без задачи и потоков-посредников BaseHTTPMiddleware, тело
+    ответа (в т.ч. стриминговое) проходит как есть. Считает латентность по
+    шаблону маршрута, классы статусов, байты запроса/ответа, запросы в полёте
+    и SQL-выражения запроса (в debug — ещё и заголовком Server-Timing).
+    WebSocket и lifespan пропускаются без обёртки.
+    """
 
-            # Счетчик ошибок для статусов 5xx
-            if 500 <= response.status_code < 600:
-                metrics_service.increment_errors(f"http_{response.status_code}")
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-            return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        except Exception as e:
-            metrics_service.increment_errors(f"exception_{type(e).__name__}")
-            raise
\ No newline at end of file
+        started = time.perf_counter()
+        status = 500
+        bytes_in = 0
+        bytes_out = 0
+
+        async def receive_counted() -> Message:
+            nonlocal bytes_in
+            message = await receive()
+            if message["type"] == "http.request":
+                bytes_in += len(message.get("body", b""))
+            return message
+
+        async def send_counted(message: Message) -> None:
+            nonlocal status, bytes_out
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.debug:
+                    # учтено всё, что выполнено до отправки заголовков
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", f'db;dur={sql.seconds * 1000:.2f};desc="{sql.statements} queries"')
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+            await send(message)
+
+        metrics_service.http_request_started()
+        with track() as sql:
+            try:
+                await self.app(scope, receive_counted, send_counted)
+            except Exception as e:
+                metrics_service.increment_errors(f"exception_{type(e).__name__}")
+                raise
+            finally:
+                metrics_service.record_http_request(
+                    _route_template(scope), status, time.perf_counter() - started, bytes_in, bytes_out, sql)
@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import DateTime, String, Integer, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class Blob(Base):
+    """
+    Файл в content-addressed хранилище static/blobs: путь определяется sha256
+    содержимого, одинаковые загрузки делят один файл. refcount — число ссылок
+    из Recording.sha256, User.avatar_sha256 и Room.cover_sha256; блоб с нулём
+    ссылок дольше grace-периода удаляет фоновый сборщик.
+    """
+    __tablename__ = "blob"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    path: Mapped[str] = mapped_column(String(255))  # static/blobs/ab/<sha256><ext>
+    size: Mapped[int] = mapped_column(BigInteger)
+    content_type: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    refcount: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # когда ссылок стало ноль (NULL — на блоб ссылаются)
+    unreferenced_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
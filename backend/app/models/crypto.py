@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import DateTime, ForeignKey, String, Text
+from sqlalchemy import DateTime, ForeignKey, String, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
@@ -12,13 +12,23 @@ class RoomKey(Base):
     algo: Mapped[str] = mapped_column(String(50), default="AES-256-GCM")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     status: Mapped[str] = mapped_column(String(20), default="active")  # active|rotated|revoked
+    # AES-ключ комнаты, зашифрованный серверным KEK (AES-GCM, base64 nonce||ct):
+    # нужен, чтобы обернуть ключ для опоздавших, не пересоздавая доли всем
+    sealed_key: Mapped[str | None] = mapped_column(Text, nullable=True)
 
 class RoomKeyShare(Base):
     __tablename__ = "roomkeyshare"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    room_key_id: Mapped[int] = mapped_column(ForeignKey("roomkey.id", ondelete="CASCADE"), index=True)
-    room_id: Mapped[int] = mapped_column(index=True)
+    room_key_id: Mapped[int] = mapped_column(ForeignKey("roomkey.id", ondelete="CASCADE"))  # см. ux_roomkeyshare_key_user
+    room_id: Mapped[int] = mapped_column()  # см. ix_roomkeyshare_room_user
     user_id: Mapped[int] = mapped_column(index=True)
     wrapped_key_b64: Mapped[str] = mapped_column(Text)  # RSA-OAEP base64
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_roomkeyshare_room_user', 'room_id', 'user_id'),
+        # одна доля на участника и ключ: фоновая доставка и GET my_key могут обернуть одновременно
+        # старые БД могли накопить повторы — sync_schema оставит последнюю долю
+        Index('ux_roomkeyshare_key_user', 'room_key_id', 'user_id', unique=True, info={"dedupe": True}),
+    )
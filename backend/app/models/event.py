@@ -9,6 +9,7 @@ class EventLog(Base):
     id – это глобальный seq внутри БД, но мы храним room_id для выборок по комнате.
     """
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)  # seq
+    # ix_eventlog_room_id в SQLite хранит (room_id, rowid) — это и есть составной индекс под list_after
     room_id: Mapped[int] = mapped_column(ForeignKey("room.id", ondelete="CASCADE"), index=True)
     type: Mapped[str] = mapped_column(String(50))     # e.g. chat.message, state.changed
     payload: Mapped[str] = mapped_column(String)      # JSON (текст)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, DateTime, ForeignKey, Boolean
+from sqlalchemy import String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
@@ -26,3 +26,8 @@ class Membership(Base):
     # НОВОЕ: право выступления и принудительное выключение видео
     can_speak: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)       # guest по умолчанию не спикер
     admin_video_off: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False) # принудит. выключено видео
+
+    # Индексы под горячие запросы: get_active (room_id, user_id, status) на каждый WS-кадр
+    __table_args__ = (
+        Index('ix_membership_room_user_status', 'room_id', 'user_id', 'status'),
+    )
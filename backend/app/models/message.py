@@ -8,7 +8,7 @@ class Message(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     room_id: Mapped[int] = mapped_column(ForeignKey("room.id", ondelete="CASCADE"), index=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"))  # см. ix_message_user_created
     text: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -19,4 +19,5 @@ class Message(Base):
     # Индексы для оптимизации запросов
     __table_args__ = (
         Index('ix_message_room_created', 'room_id', 'created_at'),
+        Index('ix_message_user_created', 'user_id', 'created_at'),
     )
\ No newline at end of file
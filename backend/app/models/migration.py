@@ -0,0 +1,11 @@
+from datetime import datetime
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class Migration(Base):
+    """Выполненный разовый перенос данных при старте: повторно не запускается."""
+    __tablename__ = "migration"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
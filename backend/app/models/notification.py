@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, DateTime, Text, Integer, ForeignKey, Boolean
+from sqlalchemy import String, DateTime, Text, Integer, ForeignKey, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
@@ -13,4 +13,10 @@ class Notification(Base):
     message: Mapped[str] = mapped_column(Text, nullable=False)
     type: Mapped[str] = mapped_column(String(50), default="conference_created")
     is_read: Mapped[bool] = mapped_column(Boolean, default=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
\ No newline at end of file
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Индексы для ленты уведомлений и счётчика непрочитанных
+    __table_args__ = (
+        Index('ix_notification_user_created', 'user_id', 'created_at'),
+        Index('ix_notification_user_read', 'user_id', 'is_read'),
+    )
@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, ForeignKey, Boolean, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class Presence(Base):
+    """
+    Живое присутствие: одна строка на (room_id, user_id), пока участник в комнате.
+    История входов/выходов остаётся в Membership, здесь — только текущий состав.
+    """
+    __tablename__ = "presence"
+
+    room_id: Mapped[int] = mapped_column(ForeignKey("room.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    membership_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    role: Mapped[str] = mapped_column(String(20), default="guest")
+    hand_raised: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    mic_muted: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    cam_off: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
+    joined_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    last_seen: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
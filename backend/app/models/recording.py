@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import DateTime, ForeignKey, String, Integer
+from sqlalchemy import DateTime, ForeignKey, String, Integer, BigInteger
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
@@ -12,4 +12,7 @@ class Recording(Base):
     title: Mapped[str] = mapped_column(String(200))
     file_url: Mapped[str] = mapped_column(String(255))  # /static/records/<slug>/...
     duration_sec: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # для раздачи: размер и sha256 содержимого (strong ETag); у старых записей считаются лениво
+    size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, DateTime, Boolean, Integer
+from sqlalchemy import String, DateTime, Boolean, Integer, BigInteger, Text
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
@@ -11,7 +11,7 @@ class Room(Base):
     title: Mapped[str | None] = mapped_column(String(120), nullable=True)
 
     # приватный доступ по ключу-приглашению (если нужен)
-    invite_key: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    invite_key: Mapped[str | None] = mapped_column(String(120), nullable=True, index=True)
 
     # состояние комнаты
     topic: Mapped[str | None] = mapped_column(String(200), nullable=True)
@@ -22,6 +22,14 @@ class Room(Base):
     # NEW: индикатор активной записи (для UI и политики на фронте)
     recording_active: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
 
+    # обложка: метаданные хранятся в строке комнаты, чтобы списки и GET обложки
+    # не сканировали static/covers
+    cover_path: Mapped[str | None] = mapped_column(String(255), nullable=True)  # блоб static/blobs/..; старые — static/covers/<slug>.<ext>
+    cover_content_type: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    cover_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)  # ссылка на Blob
+    cover_size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    cover_variants: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON {ширина: URL} WebP-производных
+
     # автор/метаданные
     created_by: Mapped[int | None] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
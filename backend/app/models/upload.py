@@ -0,0 +1,31 @@
+from datetime import datetime
+from sqlalchemy import DateTime, ForeignKey, String, Integer, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class UploadSession(Base):
+    """
+    Возобновляемая загрузка записи: файл собирается кусками в
+    settings.upload_tmp_dir/<id>.part, при complete переезжает в static/records
+    и превращается в Recording.
+    """
+    __tablename__ = "upload_session"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)  # токен, он же имя .part-файла
+    room_id: Mapped[int] = mapped_column(ForeignKey("room.id", ondelete="CASCADE"), index=True)
+    uploader_user_id: Mapped[int] = mapped_column(Integer)
+    filename: Mapped[str] = mapped_column(String(255))
+    title: Mapped[str] = mapped_column(String(200))
+    duration_sec: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    total_size: Mapped[int] = mapped_column(BigInteger)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # последний принятый кусок; по нему сборщик удаляет брошенные загрузки
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class UploadChunk(Base):
+    """Принятый (полностью записанный на диск) диапазон [offset, offset + length)."""
+    __tablename__ = "upload_chunk"
+
+    upload_id: Mapped[str] = mapped_column(ForeignKey("upload_session.id", ondelete="CASCADE"), primary_key=True)
+    offset: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    length: Mapped[int] = mapped_column(BigInteger)
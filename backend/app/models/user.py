@@ -9,6 +9,8 @@ class User(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     nickname: Mapped[str] = mapped_column(String(80), unique=False, nullable=False)
     avatar_url: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    avatar_variants: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON {размер: URL} WebP-производных
+    avatar_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)  # оригинал: ссылка на Blob
     public_key_pem: Mapped[str | None] = mapped_column(Text, nullable=True)  # NEW: PEM публичный ключ
     email: Mapped[str | None] = mapped_column(String(255), unique=True, nullable=True)
     password_hash: Mapped[str | None] = mapped_column(String(255), nullable=True)
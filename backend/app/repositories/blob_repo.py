@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import select, update, delete, case
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.blob import Blob
+
+class BlobRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, sha256: str) -> Optional[Blob]:
+        return await self.session.get(Blob, sha256)
+
+    async def acquire(self, *, sha256: str, path: str, size: int, content_type: str | None) -> None:
+        """Создать блоб с одной ссылкой или добавить ссылку к существующему."""
+        stmt = sqlite_insert(Blob).values(sha256=sha256, path=path, size=size, content_type=content_type,
+                                          refcount=1, created_at=datetime.utcnow())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sha256"],
+            set_={"refcount": Blob.refcount + 1, "path": path, "unreferenced_at": None},
+        )
+        await self.session.execute(stmt)
+
+    async def release(self, sha256: str, when: datetime | None = None) -> bool:
+        """Снять ссылку; False — такого блоба нет."""
+        res = await self.session.execute(
+            update(Blob).where(Blob.sha256 == sha256, Blob.refcount > 0).values(
+                refcount=Blob.refcount - 1,
+                unreferenced_at=case((Blob.refcount <= 1, when or datetime.utcnow()), else_=Blob.unreferenced_at),
+            )
+        )
+        return res.rowcount > 0
+
+    async def list_garbage(self, *, older_than: datetime, limit: int) -> Sequence[Blob]:
+        q = await self.session.execute(
+            select(Blob).where(Blob.unreferenced_at < older_than, Blob.refcount <= 0)
+            .order_by(Blob.unreferenced_at).limit(limit)
+        )
+        return q.scalars().all()
+
+    async def delete_unreferenced(self, sha256s: List[str]) -> List[Tuple[str, str]]:
+        """Удалить строки, на которые так и не появилось ссылок; вернуть [(sha256, path)]."""
+        if not sha256s:
+            return []
+        res = await self.session.execute(
+            delete(Blob).where(Blob.sha256.in_(sha256s), Blob.refcount <= 0)
+            .returning(Blob.sha256, Blob.path)
+        )
+        return [tuple(row) for row in res.all()]
+
+    async def known(self, sha256s: List[str]) -> set[str]:
+        if not sha256s:
+            return set()
+        q = await self.session.execute(select(Blob.sha256).where(Blob.sha256.in_(sha256s)))
+        return set(q.scalars())
@@ -1,5 +1,6 @@
-from typing import Optional, Sequence
-from sqlalchemy import select, desc
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import select, desc, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.crypto import RoomKey, RoomKeyShare
 
@@ -7,13 +8,32 @@ class CryptoRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create_room_key(self, *, room_id: int, created_by: int, algo: str = "AES-256-GCM") -> RoomKey:
-        rk = RoomKey(room_id=room_id, created_by=created_by, algo=algo, status="active")
+    async def create_room_key(self, *, room_id: int, created_by: int, algo: str = "AES-256-GCM",
+                              sealed_key: str | None = None) -> RoomKey:
+        rk = RoomKey(room_id=room_id, created_by=created_by, algo=algo, status="active", sealed_key=sealed_key)
         self.session.add(rk)
         await self.session.flush()
         await self.session.refresh(rk)
         return rk
 
+    async def rotate_active(self, *, room_id: int) -> None:
+        await self.session.execute(
+            update(RoomKey).where(RoomKey.room_id == room_id, RoomKey.status == "active").values(status="rotated")
+        )
+
+    async def active_key(self, *, room_id: int) -> Optional[RoomKey]:
+        res = await self.session.execute(
+            select(RoomKey).where(RoomKey.room_id == room_id, RoomKey.status == "active")
+            .order_by(desc(RoomKey.id)).limit(1)
+        )
+        return res.scalar_one_or_none()
+
+    async def share_for_key(self, *, room_key_id: int, user_id: int) -> Optional[RoomKeyShare]:
+        res = await self.session.execute(
+            select(RoomKeyShare).where(RoomKeyShare.room_key_id == room_key_id, RoomKeyShare.user_id == user_id).limit(1)
+        )
+        return res.scalar_one_or_none()
+
     async def add_share(self, *, room_key_id: int, room_id: int, user_id: int, wrapped_key_b64: str) -> RoomKeyShare:
         sh = RoomKeyShare(room_key_id=room_key_id, room_id=room_id, user_id=user_id, wrapped_key_b64=wrapped_key_b64)
         self.session.add(sh)
@@ -21,6 +41,20 @@ class CryptoRepository:
         await self.session.refresh(sh)
         return sh
 
+    async def add_shares(self, *, room_key_id: int, room_id: int, shares: List[Tuple[int, str]]) -> int:
+        """
+        Вставить [(user_id, wrapped_key_b64)] одним executemany, без refresh на каждую строку.
+        Уже существующая доля (room_key_id, user_id) остаётся как есть.
+        """
+        if not shares:
+            return 0
+        stmt = sqlite_insert(RoomKeyShare).on_conflict_do_nothing(index_elements=["room_key_id", "user_id"])
+        await self.session.execute(stmt, [
+            {"room_key_id": room_key_id, "room_id": room_id, "user_id": user_id, "wrapped_key_b64": b64}
+            for user_id, b64 in shares
+        ])
+        return len(shares)
+
     async def latest_share_for_user(self, *, room_id: int, user_id: int) -> Optional[RoomKeyShare]:
         res = await self.session.execute(
             select(RoomKeyShare)
@@ -1,5 +1,5 @@
 from typing import Optional, Sequence
-from sqlalchemy import select, and_, asc
+from sqlalchemy import select, and_, asc, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.event import EventLog
 
@@ -10,10 +10,17 @@ class EventRepository:
     async def append(self, *, room_id: int, type_: str, payload_json: str) -> EventLog:
         e = EventLog(room_id=room_id, type=type_, payload=payload_json)
         self.session.add(e)
+        # id и created_at (python-default) заполнены после flush, refresh не нужен
         await self.session.flush()
-        await self.session.refresh(e)
         return e
 
+    async def append_many(self, rows: Sequence[tuple[int, str, str]]) -> list[EventLog]:
+        """Пачка событий (room_id, type, payload_json) одним flush."""
+        events = [EventLog(room_id=room_id, type=type_, payload=payload) for room_id, type_, payload in rows]
+        self.session.add_all(events)
+        await self.session.flush()
+        return events
+
     async def list_after(self, *, room_id: int, after_seq: int, limit: int = 200) -> Sequence[EventLog]:
         q = select(EventLog).where(
             and_(EventLog.room_id == room_id, EventLog.id > after_seq)
@@ -23,6 +30,6 @@ class EventRepository:
 
     async def next_seq(self) -> int:
         # Возвращаем "следующий" seq: максимум id + 1 (для информирования клиента).
-        q = await self.session.execute(select(EventLog).order_by(EventLog.id.desc()).limit(1))
-        last = q.scalar_one_or_none()
-        return (last.id + 1) if last else 1
+        q = await self.session.execute(select(func.max(EventLog.id)))
+        last_id = q.scalar_one_or_none()
+        return (last_id + 1) if last_id else 1
@@ -1,18 +1,34 @@
-from typing import Optional, Sequence
-from sqlalchemy import select
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select, update, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.membership import Membership
+from app.models.room import Room
+from app.models.user import User
+from app.models.event import EventLog
+from app.repositories.presence_repo import PresenceRepository, by_room_user
 
 class MembershipRepository:
+    """
+    Membership — журнал входов/выходов (история), живой состав комнаты ведёт
+    PresenceRepository: все изменения активного членства зеркалятся туда.
+    """
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.presence = PresenceRepository(session)
 
     async def create_active(self, *, room_id: int, user_id: int, role: str = "guest") -> Membership:
         m = Membership(room_id=room_id, user_id=user_id, role=role, status="active")
         self.session.add(m)
-        await self.session.flush(); await self.session.refresh(m)
+        # refresh не нужен: id и python-default поля (joined_at, флаги) уже в объекте после flush
+        await self.session.flush()
+        await self.presence.upsert(m)
         return m
 
+    async def sync_presence(self, m: Membership) -> None:
+        """Привести живой состав в соответствие с активным членством (повторный join)."""
+        await self.presence.upsert(m)
+
     async def get_active(self, *, room_id: int, user_id: int) -> Optional[Membership]:
         q = await self.session.execute(
             select(Membership).where(
@@ -23,33 +39,88 @@ class MembershipRepository:
         )
         return q.scalar_one_or_none()
 
+    async def get_join_context(
+        self, *, room_slug: str, user_id: int
+    ) -> Tuple[Optional[Room], bool, Optional[Membership], int]:
+        """
+        Всё, что нужно для входа в комнату, одним запросом:
+        (комната, существует ли пользователь, активное членство, последний seq журнала).
+        """
+        last_seq = select(func.max(EventLog.id)).scalar_subquery()
+        q = await self.session.execute(
+            select(Room, User.id, Membership, last_seq)
+            .select_from(Room)
+            .outerjoin(User, User.id == user_id)
+            .outerjoin(Membership, and_(
+                Membership.room_id == Room.id,
+                Membership.user_id == user_id,
+                Membership.status == "active",
+            ))
+            .where(Room.slug == room_slug)
+        )
+        row = q.first()
+        if row is None:
+            return None, False, None, 0
+        room, uid, membership, last_id = row
+        return room, uid is not None, membership, last_id or 0
+
     async def mark_left(self, *, room_id: int, user_id: int) -> Optional[Membership]:
         m = await self.get_active(room_id=room_id, user_id=user_id)
         if not m: return None
         from datetime import datetime
         m.status = "left"; m.left_at = datetime.utcnow()
         await self.session.flush(); await self.session.refresh(m)
+        await self.presence.remove(room_id=room_id, user_id=user_id)
         return m
 
+    async def mark_left_many(self, keys: List[Tuple[int, int]], when: Optional[datetime] = None) -> int:
+        """Закрыть активные членства пачки (room_id, user_id) одним UPDATE (reaper)."""
+        if not keys:
+            return 0
+        res = await self.session.execute(
+            update(Membership)
+            .where(
+                by_room_user(Membership, keys),
+                Membership.status == "active",
+            )
+            .values(status="left", left_at=when or datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await self.presence.remove_many(keys)
+        return res.rowcount or 0
+
     async def heartbeat(self, *, room_id: int, user_id: int) -> Optional[Membership]:
         m = await self.get_active(room_id=room_id, user_id=user_id)
         if not m: return None
         from datetime import datetime
         m.last_seen = datetime.utcnow()
         await self.session.flush(); await self.session.refresh(m)
+        self.presence.touch(room_id=room_id, user_id=user_id, when=m.last_seen)
         return m
 
     async def list_by_room(self, *, room_id: int, limit: int = 200) -> Sequence[Membership]:
+        """История членств комнаты (активные и вышедшие вперемешку)."""
         q = await self.session.execute(
             select(Membership).where(Membership.room_id == room_id).order_by(Membership.id.desc()).limit(limit)
         )
         return q.scalars().all()
 
+    # --- живой состав: O(активных), без прохода по истории ---
+    async def list_active(self, *, room_id: int) -> List[Dict[str, Any]]:
+        return await self.presence.list_by_room(room_id)
+
+    async def count_active(self, *, room_id: int) -> int:
+        return await self.presence.count(room_id)
+
+    async def hands_up(self, *, room_id: int) -> List[int]:
+        return await self.presence.hands_up(room_id)
+
     async def set_hand(self, *, room_id: int, user_id: int, raised: bool) -> Optional[Membership]:
         m = await self.get_active(room_id=room_id, user_id=user_id)
         if not m: return None
         m.hand_raised = raised
         await self.session.flush(); await self.session.refresh(m)
+        await self.presence.set_fields(room_id=room_id, user_id=user_id, hand_raised=bool(raised))
         return m
 
     async def set_media_flags(self, *, room_id: int, user_id: int,
@@ -59,6 +130,7 @@ class MembershipRepository:
         if mic_muted is not None: m.mic_muted = bool(mic_muted)
         if cam_off   is not None: m.cam_off   = bool(cam_off)
         await self.session.flush(); await self.session.refresh(m)
+        await self.presence.set_fields(room_id=room_id, user_id=user_id, mic_muted=m.mic_muted, cam_off=m.cam_off)
         return m
 
     # --- модерация существующая ---
@@ -67,6 +139,7 @@ class MembershipRepository:
         if not m: return None
         m.role = role
         await self.session.flush(); await self.session.refresh(m)
+        await self.presence.set_fields(room_id=room_id, user_id=user_id, role=role)
         return m
 
     async def set_admin_muted(self, *, room_id: int, user_id: int, muted: bool) -> Optional[Membership]:
@@ -75,6 +148,7 @@ class MembershipRepository:
         m.admin_muted = muted
         if muted: m.mic_muted = True
         await self.session.flush(); await self.session.refresh(m)
+        await self.presence.set_fields(room_id=room_id, user_id=user_id, mic_muted=m.mic_muted)
         return m
 
     async def kick(self, *, room_id: int, user_id: int) -> Optional[Membership]:
@@ -95,4 +169,5 @@ class MembershipRepository:
         if video_off:
             m.cam_off = True
         await self.session.flush(); await self.session.refresh(m)
+        await self.presence.set_fields(room_id=room_id, user_id=user_id, cam_off=m.cam_off)
         return m
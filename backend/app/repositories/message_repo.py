@@ -1,5 +1,5 @@
 from typing import List, Optional
-from sqlalchemy import select, desc, and_
+from sqlalchemy import select, desc, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.message import Message
 
@@ -36,7 +36,8 @@ class MessageRepository:
         if before_id:
             query = query.where(Message.id < before_id)
 
-        query = query.order_by(desc(Message.created_at)).limit(limit)
+        # keyset-пагинация по id: и фильтр, и сортировка идут по индексу (room_id, id)
+        query = query.order_by(desc(Message.id)).limit(limit)
 
         result = await self.session.execute(query)
         messages = result.scalars().all()
@@ -88,9 +89,9 @@ class MessageRepository:
     async def count_room_messages(self, room_id: int) -> int:
         """Посчитать количество сообщений в комнате (новая функция)"""
         result = await self.session.execute(
-            select(Message).where(Message.room_id == room_id)
+            select(func.count()).select_from(Message).where(Message.room_id == room_id)
         )
-        return len(result.scalars().all())
+        return int(result.scalar_one())
 
     # Алиасы для совместимости (если где-то использовались старые названия)
     get_message = get
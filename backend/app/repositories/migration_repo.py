@@ -0,0 +1,14 @@
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.migration import Migration
+
+class MigrationRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def is_applied(self, name: str) -> bool:
+        return await self.session.get(Migration, name) is not None
+
+    async def mark_applied(self, name: str) -> None:
+        stmt = sqlite_insert(Migration).values(name=name).on_conflict_do_nothing(index_elements=["name"])
+        await self.session.execute(stmt)
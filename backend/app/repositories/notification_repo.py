@@ -1,5 +1,5 @@
 from typing import List, Optional
-from sqlalchemy import select
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.notification import Notification
 
@@ -55,8 +55,9 @@ class NotificationRepository:
 
     async def get_unread_count(self, user_id: int) -> int:
         q = await self.session.execute(
-            select(Notification)
+            select(func.count())
+            .select_from(Notification)
             .where(Notification.user_id == user_id)
             .where(Notification.is_read == False)
         )
-        return len(q.scalars().all())
\ No newline at end of file
+        return int(q.scalar_one())
\ No newline at end of file
@@ -0,0 +1,219 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event, select, delete, update, insert, func, and_, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.presence import Presence
+from app.models.membership import Membership
+from app.core.config import settings
+from app.utils.timing_wheel import TimingWheel
+
+# room_id -> {user_id -> запись присутствия}. Заполняется лениво из таблицы presence
+# при первом обращении к комнате и дальше обновляется write-through из репозитория,
+# так что ростер/руки/онлайн читаются за O(активных) без запросов в БД.
+# Запись видна в кэше сразу (join читает ростер до commit), а откат транзакции
+# сбрасывает затронутые комнаты — следующее чтение перечитает их из таблицы.
+_LIVE: Dict[int, Dict[int, Dict[str, Any]]] = {}
+
+# (room_id, user_id) -> дедлайн неактивности; по истечении участника закрывает reaper
+TRACKER = TimingWheel(settings.presence_reap_after_seconds, settings.presence_tick_seconds)
+
+_FIELDS = ("membership_id", "role", "hand_raised", "mic_muted", "cam_off", "joined_at", "last_seen")
+
+
+def reset_live_cache() -> None:
+    """Сбросить in-memory кэш (тесты, смена БД)."""
+    _LIVE.clear()
+    TRACKER.clear()
+
+
+_UNDO = "presence_undo"
+
+
+def _undo(session: AsyncSession) -> Dict[str, Any]:
+    """Что вернуть в памяти, если транзакция сессии закончится без commit."""
+    info = session.sync_session.info
+    undo = info.get(_UNDO)
+    if undo is None:
+        undo = info[_UNDO] = {"rooms": set(), "tracked": {}}
+    return undo
+
+
+def _mark(session: AsyncSession, room_id: int, user_id: int) -> None:
+    undo = _undo(session)
+    undo["rooms"].add(room_id)
+    # было ли в колесе до первой записи в этой транзакции
+    undo["tracked"].setdefault((room_id, user_id), (room_id, user_id) in TRACKER)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    session.info.pop(_UNDO, None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session: Session, transaction) -> None:
+    # после commit отмену уже сняли; здесь — rollback или close без commit
+    if transaction.parent is not None:
+        return
+    undo = session.info.pop(_UNDO, None)
+    if undo is None:
+        return
+    for room_id in undo["rooms"]:
+        _LIVE.pop(room_id, None)
+    for key, was_tracked in undo["tracked"].items():
+        if was_tracked:
+            TRACKER.touch(key)  # прежний дедлайн не храним — даём полный срок
+        else:
+            TRACKER.discard(key)
+
+
+def _ts(when: Optional[datetime]) -> Optional[float]:
+    # в БД naive UTC (datetime.utcnow)
+    return when.replace(tzinfo=timezone.utc).timestamp() if when else None
+
+
+def _entry(p: Presence) -> Dict[str, Any]:
+    e = {"user_id": p.user_id}
+    for f in _FIELDS:
+        e[f] = getattr(p, f)
+    return e
+
+
+def by_room_user(model, keys: Iterable[Tuple[int, int]]):
+    """
+    WHERE для пачки (room_id, user_id): room_id = ? AND user_id IN (...) по каждой комнате.
+    Row-value IN ((?, ?), ...) SQLite выполняет полным сканом, а так идёт по индексу.
+    """
+    by_room: Dict[int, List[int]] = {}
+    for room_id, user_id in keys:
+        by_room.setdefault(room_id, []).append(user_id)
+    return or_(*(and_(model.room_id == r, model.user_id.in_(uids)) for r, uids in by_room.items()))
+
+
+class PresenceRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _room(self, room_id: int) -> Dict[int, Dict[str, Any]]:
+        live = _LIVE.get(room_id)
+        if live is None:
+            q = await self.session.execute(select(Presence).where(Presence.room_id == room_id))
+            live = {p.user_id: _entry(p) for p in q.scalars().all()}
+            _LIVE[room_id] = live
+        return live
+
+    async def upsert(self, m: Membership) -> Dict[str, Any]:
+        """Поставить участника в живой состав по его активному членству (один INSERT ... ON CONFLICT)."""
+        live = await self._room(m.room_id)
+        values = {
+            "membership_id": m.id,
+            "role": m.role,
+            "hand_raised": bool(m.hand_raised),
+            "mic_muted": bool(m.mic_muted),
+            "cam_off": bool(m.cam_off),
+            "joined_at": m.joined_at,
+            "last_seen": m.last_seen or datetime.utcnow(),
+        }
+        stmt = sqlite_insert(Presence).values(room_id=m.room_id, user_id=m.user_id, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=["room_id", "user_id"], set_=values)
+        await self.session.execute(stmt)
+        _mark(self.session, m.room_id, m.user_id)
+        e = {"user_id": m.user_id, **values}
+        live[m.user_id] = e
+        TRACKER.touch((m.room_id, m.user_id))
+        return e
+
+    async def remove(self, *, room_id: int, user_id: int) -> None:
+        await self.session.execute(
+            delete(Presence).where(Presence.room_id == room_id, Presence.user_id == user_id)
+        )
+        _mark(self.session, room_id, user_id)
+        self._forget(room_id, user_id)
+
+    async def remove_many(self, keys: Iterable[Tuple[int, int]]) -> None:
+        """Убрать пачку (room_id, user_id) из живого состава одним DELETE."""
+        keys = list(keys)
+        if not keys:
+            return
+        await self.session.execute(
+            delete(Presence).where(by_room_user(Presence, keys))
+        )
+        for room_id, user_id in keys:
+            _mark(self.session, room_id, user_id)
+            self._forget(room_id, user_id)
+
+    @staticmethod
+    def _forget(room_id: int, user_id: int) -> None:
+        TRACKER.discard((room_id, user_id))
+        live = _LIVE.get(room_id)
+        if live is not None:
+            live.pop(user_id, None)
+            if not live:
+                _LIVE.pop(room_id, None)
+
+    async def set_fields(self, *, room_id: int, user_id: int, **fields: Any) -> None:
+        if not fields:
+            return
+        await self.session.execute(
+            update(Presence)
+            .where(Presence.room_id == room_id, Presence.user_id == user_id)
+            .values(**fields)
+        )
+        _undo(self.session)["rooms"].add(room_id)
+        e = (await self._room(room_id)).get(user_id)
+        if e is not None:
+            e.update(fields)
+
+    def touch(self, *, room_id: int, user_id: int, when: Optional[datetime] = None) -> None:
+        """Обновить last_seen только в памяти: таблица хранит состав, а не пульс."""
+        when = when or datetime.utcnow()
+        TRACKER.touch((room_id, user_id), _ts(when))
+        live = _LIVE.get(room_id)
+        e = live.get(user_id) if live else None
+        if e is not None:
+            e["last_seen"] = when
+
+    async def list_by_room(self, room_id: int) -> List[Dict[str, Any]]:
+        return list((await self._room(room_id)).values())
+
+    async def count(self, room_id: int) -> int:
+        return len(await self._room(room_id))
+
+    async def hands_up(self, room_id: int) -> List[int]:
+        return [uid for uid, e in (await self._room(room_id)).items() if e["hand_raised"]]
+
+    async def seed_tracker(self) -> int:
+        """Засеять колесо неактивности из таблицы presence (старт процесса)."""
+        q = await self.session.execute(select(Presence.room_id, Presence.user_id, Presence.last_seen))
+        n = 0
+        for room_id, user_id, last_seen in q.all():
+            TRACKER.touch((room_id, user_id), _ts(last_seen))
+            n += 1
+        return n
+
+    async def backfill_from_memberships(self) -> int:
+        """Однократно заполнить presence из активных членств (БД до появления таблицы)."""
+        q = await self.session.execute(select(func.count()).select_from(Presence))
+        if q.scalar_one():
+            return 0
+        latest = (
+            select(func.max(Membership.id))
+            .where(Membership.status == "active")
+            .group_by(Membership.room_id, Membership.user_id)
+        )
+        src = select(
+            Membership.room_id, Membership.user_id, Membership.id, Membership.role,
+            Membership.hand_raised, Membership.mic_muted, Membership.cam_off,
+            Membership.joined_at, Membership.last_seen,
+        ).where(Membership.id.in_(latest))
+        res = await self.session.execute(
+            insert(Presence).from_select(
+                ["room_id", "user_id", "membership_id", "role",
+                 "hand_raised", "mic_muted", "cam_off", "joined_at", "last_seen"],
+                src,
+            )
+        )
+        reset_live_cache()
+        return res.rowcount or 0
@@ -7,8 +7,10 @@ class RecordingRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create(self, *, room_id: int, uploader_user_id: int, title: str, file_url: str, duration_sec: int | None = None) -> Recording:
-        rec = Recording(room_id=room_id, uploader_user_id=uploader_user_id, title=title, file_url=file_url, duration_sec=duration_sec)
+    async def create(self, *, room_id: int, uploader_user_id: int, title: str, file_url: str, duration_sec: int | None = None,
+                     size_bytes: int | None = None, sha256: str | None = None) -> Recording:
+        rec = Recording(room_id=room_id, uploader_user_id=uploader_user_id, title=title, file_url=file_url, duration_sec=duration_sec,
+                        size_bytes=size_bytes, sha256=sha256)
         self.session.add(rec); await self.session.flush(); await self.session.refresh(rec)
         return rec
 
@@ -1,4 +1,5 @@
-from typing import Optional, Sequence
+import json
+from typing import Dict, Optional, Sequence
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.room import Room
@@ -56,3 +57,27 @@ class RoomRepository:
         await self.session.flush()
         await self.session.refresh(room)
         return room
+
+    async def set_cover(self, room: Room, *, path: str, content_type: str | None, sha256: str, size: int,
+                        variants: Dict[str, str]) -> Room:
+        room.cover_path = path
+        room.cover_content_type = content_type
+        room.cover_sha256 = sha256
+        room.cover_size = size
+        room.cover_variants = json.dumps(variants) if variants else None
+        await self.session.flush()
+        return room
+
+    async def clear_cover(self, room: Room) -> Room:
+        room.cover_path = room.cover_content_type = room.cover_sha256 = None
+        room.cover_size = None
+        room.cover_variants = None
+        await self.session.flush()
+        return room
+
+    async def list_without_cover(self, slugs: Sequence[str]) -> Sequence[Room]:
+        """Комнаты из slugs без обложки."""
+        if not slugs:
+            return []
+        q = await self.session.execute(select(Room).where(Room.slug.in_(slugs), Room.cover_path.is_(None)))
+        return q.scalars().all()
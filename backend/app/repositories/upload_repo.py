@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import List, Optional, Sequence
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.upload import UploadSession, UploadChunk
+
+class UploadRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create(self, *, upload_id: str, room_id: int, uploader_user_id: int, filename: str,
+                     title: str, duration_sec: int | None, total_size: int) -> UploadSession:
+        up = UploadSession(id=upload_id, room_id=room_id, uploader_user_id=uploader_user_id, filename=filename,
+                           title=title, duration_sec=duration_sec, total_size=total_size)
+        self.session.add(up)
+        await self.session.flush()
+        return up
+
+    async def get(self, upload_id: str) -> Optional[UploadSession]:
+        return await self.session.get(UploadSession, upload_id)
+
+    async def add_chunk(self, *, upload_id: str, offset: int, length: int) -> None:
+        # повторная отправка того же куска — просто перезапись длины
+        stmt = sqlite_insert(UploadChunk).values(upload_id=upload_id, offset=offset, length=length)
+        stmt = stmt.on_conflict_do_update(index_elements=["upload_id", "offset"], set_={"length": length})
+        await self.session.execute(stmt)
+
+    async def list_chunks(self, upload_id: str) -> Sequence[UploadChunk]:
+        q = await self.session.execute(
+            select(UploadChunk).where(UploadChunk.upload_id == upload_id).order_by(UploadChunk.offset)
+        )
+        return q.scalars().all()
+
+    async def delete(self, upload_id: str) -> bool:
+        """Удалить сессию с кусками; False — её уже удалил (забрал) другой запрос."""
+        res = await self.session.execute(delete(UploadSession).where(UploadSession.id == upload_id))
+        await self.session.execute(delete(UploadChunk).where(UploadChunk.upload_id == upload_id))
+        return res.rowcount > 0
+
+    async def delete_stale(self, *, older_than: datetime, limit: int) -> List[str]:
+        """Удалить пачку сессий без активности с older_than; вернуть их id."""
+        stale = (
+            select(UploadSession.id).where(UploadSession.updated_at < older_than)
+            .order_by(UploadSession.updated_at).limit(limit)
+        )
+        res = await self.session.execute(
+            delete(UploadSession).where(UploadSession.id.in_(stale)).returning(UploadSession.id)
+        )
+        ids = list(res.scalars())
+        if ids:
+            await self.session.execute(delete(UploadChunk).where(UploadChunk.upload_id.in_(ids)))
+        return ids
+
+    async def known(self, upload_ids: List[str]) -> set[str]:
+        if not upload_ids:
+            return set()
+        q = await self.session.execute(select(UploadSession.id).where(UploadSession.id.in_(upload_ids)))
+        return set(q.scalars())
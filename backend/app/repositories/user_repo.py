@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Iterable, Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
@@ -24,6 +24,15 @@ class UserRepository:
     async def get(self, user_id: int) -> Optional[User]:
         q = await self.session.execute(select(User).where(User.id == user_id))
         return q.scalar_one_or_none()
+    async def get_public_keys(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        """{user_id: PEM} одним запросом; пользователи без ключа не попадают."""
+        ids = list(set(user_ids))
+        if not ids:
+            return {}
+        q = await self.session.execute(
+            select(User.id, User.public_key_pem).where(User.id.in_(ids), User.public_key_pem.is_not(None))
+        )
+        return dict(q.all())
     async def get_by_email(self, email: str) -> Optional[User]:
         q = await self.session.execute(select(User).where(User.email == email))
         return q.scalar_one_or_none()
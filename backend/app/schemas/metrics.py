@@ -32,4 +32,5 @@ class HealthCheck(BaseModel):
     status: str
     timestamp: datetime
     checks: Dict[str, Any]
-    overall_score: float
\ No newline at end of file
+    overall_score: float
+    ready: bool = True
\ No newline at end of file
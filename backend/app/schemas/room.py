@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
 class RoomCreate(BaseModel):
@@ -15,6 +15,9 @@ class RoomOut(BaseModel):
     is_private: bool
     invite_key: str | None = None
     invite_url: str | None = None
+    # обложка прямо в карточке: фронту не нужен отдельный GET /api/covers/{slug}
+    cover_url: str | None = None
+    cover_urls: Dict[str, str] | None = None  # {ширина px: URL}, content-hashed
 
 class RoomListItem(RoomOut):
     pass
@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+
+class UploadCreateIn(BaseModel):
+    uploader_user_id: int
+    filename: str = Field(min_length=1, max_length=255)
+    size: int = Field(gt=0, description="Полный размер файла в байтах")
+    title: str = "Recording"
+    duration_sec: int | None = None
+
+class UploadStatusOut(BaseModel):
+    upload_id: str
+    size: int
+    offset: int = Field(description="Принято подряд с начала файла; отсюда продолжать последовательную загрузку")
+    received: int = Field(description="Всего принято байт (с учётом параллельных кусков)")
+    missing: list[tuple[int, int]] = Field(description="Недостающие диапазоны [start, end)")
+    chunk_size: int
+    complete: bool
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Dict, Optional
 
 class UserCreate(BaseModel):
     nickname: str
@@ -21,5 +21,6 @@ class UserOut(BaseModel):
     id: int
     nickname: str
     avatar_url: Optional[str] = None
+    avatar_urls: Optional[Dict[str, str]] = None  # {размер px: URL}, content-hashed
     public_key_pem: Optional[str] = None
     email: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import mimetypes
+import os
+import secrets
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.repositories.blob_repo import BlobRepository
+from app.repositories.upload_repo import UploadRepository
+from app.services.uploads import save_upload, safe_filename, file_digest
+
+log = logging.getLogger(__name__)
+
+BLOB_DIR = Path("static/blobs")
+TMP_DIR = BLOB_DIR / "tmp"
+
+# Публикация файла (проверка/rename) и удаление сборщиком не должны
+# перемежаться: иначе сборщик может удалить только что переиспользованный файл
+_PUBLISH = asyncio.Lock()
+
+
+def blob_path(sha256: str, ext: str) -> Path:
+    return BLOB_DIR / sha256[:2] / f"{sha256}{ext.lower()}"
+
+
+def is_blob(path: str | Path) -> bool:
+    return Path(path).parts[:2] == BLOB_DIR.parts
+
+
+class BlobStore:
+    """
+    Content-addressed хранилище загрузок: имя файла — sha256 содержимого,
+    поэтому повторная загрузка тех же байт не занимает места, а коллизия имён
+    невозможна. Ссылки считаются в таблице blob в той же транзакции, что и
+    запись, которая на блоб ссылается.
+    """
+
+    def __init__(self, repo: BlobRepository):
+        self.repo = repo
+
+    async def stage_upload(self, file: UploadFile, *, max_bytes: int, kind: str) -> Tuple[Path, int, str]:
+        """
+        Записать загрузку во временный файл хранилища, считая sha256 на лету.
+        Возвращает (временный путь, размер, sha256). ValueError("file_too_large").
+        БД не трогает: долгую обработку (ресайз) делаем до publish, не держа запись в SQLite.
+        """
+        tmp = TMP_DIR / secrets.token_hex(16)
+        size, sha256 = await save_upload(file, tmp, max_bytes=max_bytes, kind=kind)
+        return tmp, size, sha256
+
+    async def put_upload(self, file: UploadFile, *, max_bytes: int, kind: str) -> Tuple[str, int, str]:
+        """stage_upload + publish: (путь, размер, sha256)."""
+        tmp, size, sha256 = await self.stage_upload(file, max_bytes=max_bytes, kind=kind)
+        return await self.publish(tmp, size, sha256, file.filename, file.content_type), size, sha256
+
+    async def adopt(self, src: Path, *, filename: str) -> Tuple[str, int, str]:
+        """Забрать готовый файл (собранную возобновляемую загрузку) в хранилище."""
+        size, sha256 = await run_in_threadpool(file_digest, src)
+        return await self.publish(src, size, sha256, filename), size, sha256
+
+    async def publish(self, src: Path, size: int, sha256: str, filename: str | None,
+                      content_type: str | None = None) -> str:
+        """Переместить src на место блоба (или выбросить как дубликат) и взять ссылку; вернуть путь."""
+        ext = Path(safe_filename(filename)).suffix
+        content_type = content_type or mimetypes.guess_type(f"x{ext}")[0]
+        async with _PUBLISH:
+            blob = await self.repo.get(sha256)
+            if blob and Path(blob.path).is_file():
+                # такие байты уже есть — дубликат не храним
+                await run_in_threadpool(src.unlink, True)
+                path = Path(blob.path)
+            else:
+                path = blob_path(sha256, ext)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # rename, если src на том же томе (data/uploads обычно там же)
+                await run_in_threadpool(_move_fresh, src, path)
+            await self.repo.acquire(sha256=sha256, path=path.as_posix(), size=size, content_type=content_type)
+        return path.as_posix()
+
+    async def release(self, sha256: str | None, path: str | None) -> List[Path]:
+        """
+        Снять ссылку. Файлы, сохранённые до хранилища (static/records, static/covers,
+        static/avatars), принадлежали одной записи — возвращаем их: вызывающий
+        удаляет их через discard() после коммита, пока строка ещё может откатиться.
+        """
+        if path and not is_blob(path):
+            return [Path(path)]
+        if sha256:
+            await self.repo.release(sha256)
+        return []
+
+
+class BlobCollector:
+    """
+    Фоновая сборка мусора: блобы без ссылок дольше grace-периода, файлы в
+    static/blobs без строки в БД (упавшая транзакция, краш между rename и commit)
+    и брошенные возобновляемые загрузки — сессия и её .part в upload_tmp_dir.
+    """
+
+    def __init__(self, session_factory=SessionLocal,
+                 interval_seconds: float = settings.blob_gc_interval_seconds,
+                 grace_seconds: int = settings.blob_gc_grace_seconds,
+                 batch_size: int = settings.blob_gc_batch,
+                 upload_ttl_seconds: float = settings.upload_ttl_hours * 3600,
+                 upload_dir: Path = Path(settings.upload_tmp_dir)):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self.upload_ttl_seconds = upload_ttl_seconds
+        self.upload_dir = upload_dir
+        self._task: Optional[asyncio.Task] = None
+
+    async def collect_once(self, now: Optional[float] = None) -> int:
+        """Удалить мусор, вернуть число удалённых файлов."""
+        now = time.time() if now is None else now
+        cutoff = datetime.fromtimestamp(now - self.grace_seconds, timezone.utc).replace(tzinfo=None)
+        removed = 0
+        while True:
+            async with _PUBLISH:
+                async with self.session_factory() as session:
+                    repo = BlobRepository(session)
+                    garbage = await repo.list_garbage(older_than=cutoff, limit=self.batch_size)
+                    # условный DELETE: ссылка, взятая после SELECT, блоб спасает
+                    gone = await repo.delete_unreferenced([b.sha256 for b in garbage])
+                    await session.commit()
+                for _, path in gone:
+                    Path(path).unlink(missing_ok=True)
+            removed += len(gone)
+            if len(garbage) < self.batch_size:
+                break
+        removed += await self._sweep_orphans(now - self.grace_seconds)
+        return removed + await self.expire_uploads(now)
+
+    async def expire_uploads(self, now: Optional[float] = None) -> int:
+        """
+        Удалить загрузки без новых кусков дольше TTL и .part-файлы без сессии
+        (create_upload упал после allocate); вернуть число удалённых файлов.
+        """
+        now = time.time() if now is None else now
+        older_than = now - self.upload_ttl_seconds
+        cutoff = datetime.fromtimestamp(older_than, timezone.utc).replace(tzinfo=None)
+        removed = 0
+        while True:
+            async with self.session_factory() as session:
+                ids = await UploadRepository(session).delete_stale(older_than=cutoff, limit=self.batch_size)
+                await session.commit()
+            for upload_id in ids:
+                (self.upload_dir / f"{upload_id}.part").unlink(missing_ok=True)
+            removed += len(ids)
+            if len(ids) < self.batch_size:
+                break
+
+        parts = await run_in_threadpool(_old_files_in, self.upload_dir, "*.part", older_than)
+        if parts:
+            async with self.session_factory() as session:
+                repo = UploadRepository(session)
+                for i in range(0, len(parts), self.batch_size):
+                    chunk = parts[i:i + self.batch_size]
+                    known = await repo.known([p.stem for p in chunk])
+                    for p in chunk:
+                        if p.stem not in known:
+                            p.unlink(missing_ok=True)
+                            removed += 1
+        return removed
+
+    async def _sweep_orphans(self, older_than: float) -> int:
+        files = await run_in_threadpool(_old_files, older_than)
+        if not files:
+            return 0
+        removed = 0
+        async with _PUBLISH:
+            async with self.session_factory() as session:
+                repo = BlobRepository(session)
+                for i in range(0, len(files), self.batch_size):
+                    chunk = files[i:i + self.batch_size]
+                    known = await repo.known([p.name.split(".")[0] for p in chunk])
+                    for p in chunk:
+                        if p.parent == TMP_DIR or p.name.split(".")[0] not in known:
+                            p.unlink(missing_ok=True)
+                            removed += 1
+        return removed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                n = await self.collect_once()
+                if n:
+                    log.info("blob gc: removed %d files", n)
+            except Exception:
+                log.exception("blob gc failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="blob-gc")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def discard(paths: Iterable[Path]) -> None:
+    """Удалить файлы, на которые больше не ссылается закоммиченная строка."""
+    paths = list(paths)
+    if paths:
+        await run_in_threadpool(_unlink_all, paths)
+
+
+def _unlink_all(paths: List[Path]) -> None:
+    for p in paths:
+        p.unlink(missing_ok=True)
+
+
+def _move_fresh(src: Path, dst: Path) -> None:
+    """
+    Переместить и обновить mtime: rename сохраняет время .part-файла, и до
+    commit ссылки сборщик принял бы свежий блоб за старую сироту.
+    """
+    shutil.move(src, dst)
+    os.utime(dst)
+
+
+def _old_files(older_than: float) -> List[Path]:
+    """Файлы static/blobs старше older_than (mtime) — кандидаты в сироты."""
+    return _old_files_in(BLOB_DIR, "*/*", older_than)
+
+
+def _old_files_in(root: Path, pattern: str, older_than: float) -> List[Path]:
+    if not root.is_dir():
+        return []
+    out = []
+    for p in root.glob(pattern):
+        try:
+            if p.is_file() and p.stat().st_mtime < older_than:
+                out.append(p)
+        except FileNotFoundError:
+            pass
+    return out
+
+
+BLOB_GC = BlobCollector()
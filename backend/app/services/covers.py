@@ -0,0 +1,141 @@
+import json
+import mimetypes
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.room import Room
+from app.repositories.room_repo import RoomRepository
+from app.repositories.blob_repo import BlobRepository
+from app.repositories.migration_repo import MigrationRepository
+from app.services.blobs import BlobStore
+from app.services.images import IMAGES, IMG_DIR, ImagesBusy, stale_variants, variant_files
+from app.services.uploads import file_digest
+
+COVERS_DIR = Path("static/covers")
+BACKFILL_MIGRATION = "covers_from_disk"
+BACKFILL_BATCH = 500  # slug'ов в одном IN (...)
+
+
+def _variants(room: Room) -> Dict[str, str]:
+    return json.loads(room.cover_variants) if room.cover_variants else {}
+
+
+def cover_payload(room: Room) -> Optional[dict]:
+    """URL обложки из метаданных комнаты (None — обложки нет)."""
+    if not room.cover_path:
+        return None
+    variants = _variants(room)
+    return {
+        # обложки, загруженные до появления производных, отдаём как есть
+        "cover_url": variants.get("960", f"/{room.cover_path}"),
+        "cover_urls": variants or None,
+        "content_type": room.cover_content_type,
+        "sha256": room.cover_sha256,
+        "size": room.cover_size,
+    }
+
+
+class CoverCache:
+    """
+    slug -> payload обложки (или None, если у существующей комнаты её нет).
+    Запись сбрасывается после коммита загрузки/удаления; счётчик версий не даёт
+    запросу, прочитавшему строку до коммита, положить в кэш устаревшее значение.
+    """
+
+    def __init__(self):
+        self._items: Dict[str, Optional[dict]] = {}
+        self._version = 0
+
+    async def get(self, rrepo: RoomRepository, slug: str) -> Optional[dict]:
+        """payload обложки; ValueError("room_not_found") — комнаты нет."""
+        if slug in self._items:
+            return self._items[slug]
+        version = self._version
+        room = await rrepo.get_by_slug(slug)
+        if not room:
+            raise ValueError("room_not_found")
+        payload = cover_payload(room)
+        if version == self._version:
+            self._items[slug] = payload
+        return payload
+
+    def invalidate(self, slug: str) -> None:
+        self._version += 1
+        self._items.pop(slug, None)
+
+    def clear(self) -> None:
+        self._version += 1
+        self._items.clear()
+
+
+COVERS = CoverCache()
+
+
+class CoverService:
+    def __init__(self, rrepo: RoomRepository):
+        self.rrepo = rrepo
+        self.blobs = BlobStore(BlobRepository(rrepo.session))
+
+    async def upload(self, room: Room, file: UploadFile) -> Tuple[dict, List[Path]]:
+        """
+        Сохранить обложку и WebP-производные, записать метаданные в комнату.
+        ValueError("file_too_large" | "bad_image"), ImagesBusy. Возвращает
+        (payload, устаревшие файлы — производные заменяемой обложки из строки
+        комнаты и старый оригинал вне хранилища): их удаление (discard) и сброс
+        кэша — на вызывающем после коммита.
+        """
+        tmp, size, sha256 = await self.blobs.stage_upload(
+            file, max_bytes=settings.upload_max_cover_mb * 1024 * 1024, kind="cover")
+        # карточкам комнат отдаём WebP-производные с хэшем в имени, а не оригинал
+        try:
+            variants = await IMAGES.cover(tmp, room.slug)
+        except (ValueError, ImagesBusy):
+            tmp.unlink(missing_ok=True)
+            raise
+        # оригинал — в content-addressed хранилище, ссылку на старый снимаем
+        path = await self.blobs.publish(tmp, size, sha256, file.filename, file.content_type)
+        stale = stale_variants(_variants(room), variants)
+        stale += await self.blobs.release(room.cover_sha256, room.cover_path)
+        content_type = file.content_type or mimetypes.guess_type(path)[0]
+        await self.rrepo.set_cover(room, path=path, content_type=content_type,
+                                   sha256=sha256, size=size, variants=variants)
+        return cover_payload(room), stale
+
+    async def delete(self, room: Room) -> List[Path]:
+        """Снять обложку; вернуть файлы (старый оригинал, производные), которые вызывающий удалит после коммита."""
+        stale = stale_variants(_variants(room))
+        if room.cover_path:
+            stale += await self.blobs.release(room.cover_sha256, room.cover_path)
+        await self.rrepo.clear_cover(room)
+        return stale
+
+    async def backfill_from_disk(self) -> int:
+        """
+        Однократно перенести в БД обложки, загруженные до колонок cover_*.
+        Новые обложки в static/covers не пишутся, поэтому после первого прохода
+        отметка в таблице migration выключает перенос на следующих стартах.
+        """
+        migrations = MigrationRepository(self.rrepo.session)
+        if await migrations.is_applied(BACKFILL_MIGRATION):
+            return 0
+        files = sorted(p for p in COVERS_DIR.iterdir() if p.is_file()) if COVERS_DIR.is_dir() else []
+        found = 0
+        for i in range(0, len(files), BACKFILL_BATCH):
+            chunk = files[i:i + BACKFILL_BATCH]
+            # только комнаты, для которых есть файл, а не все комнаты без обложки
+            rooms = {r.slug: r for r in await self.rrepo.list_without_cover([p.stem for p in chunk])}
+            for p in chunk:
+                room = rooms.pop(p.stem, None)
+                if room is None:
+                    continue
+                size, sha256 = await run_in_threadpool(file_digest, p)
+                variants = {w: f"/{v.as_posix()}" for w, v in variant_files(IMG_DIR / "covers", room.slug).items()}
+                await self.rrepo.set_cover(room, path=p.as_posix(), content_type=mimetypes.guess_type(p.name)[0],
+                                           sha256=sha256, size=size, variants=variants)
+                found += 1
+        await migrations.mark_applied(BACKFILL_MIGRATION)
+        return found
@@ -1,11 +1,155 @@
-import os, base64
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from app.core.config import settings
+from app.models.crypto import RoomKeyShare
 from app.repositories.crypto_repo import CryptoRepository
 from app.repositories.room_repo import RoomRepository
 from app.repositories.membership_repo import MembershipRepository
 from app.repositories.user_repo import UserRepository
 
+log = logging.getLogger(__name__)
+
+OAEP = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+
+
+def _kek() -> bytes:
+    if settings.crypto_kek:
+        return base64.b64decode(settings.crypto_kek)
+    if settings.app_env != "dev":
+        raise RuntimeError("APP_CRYPTO_KEK is required outside dev")
+    # только для разработки: кто знает jwt_secret, тот вскроет и sealed_key
+    return hashlib.sha256(b"axenix-room-kek:" + settings.jwt_secret.encode("utf-8")).digest()
+
+
+def check_kek() -> None:
+    """
+    Проверка при старте. Вне dev KEK обязателен и не зависит от jwt_secret;
+    в dev без него — громкое предупреждение.
+    """
+    if settings.crypto_kek:
+        try:
+            key = base64.b64decode(settings.crypto_kek, validate=True)
+        except ValueError:
+            key = b""
+        if len(key) != 32:
+            raise RuntimeError("APP_CRYPTO_KEK must be 32 bytes, base64-encoded")
+        return
+    if settings.app_env != "dev":
+        raise RuntimeError("APP_CRYPTO_KEK is required outside dev: room keys must not be derived from jwt_secret")
+    log.warning("APP_CRYPTO_KEK is not set: room keys are sealed with a dev key derived from jwt_secret. "
+                "Set APP_CRYPTO_KEK before storing real data.")
+
+
+def seal_room_key(aes_key: bytes, room_id: int) -> str:
+    """Зашифровать ключ комнаты серверным KEK; room_id — в AAD, чужой комнате не подойдёт."""
+    nonce = os.urandom(12)
+    ct = AESGCM(_kek()).encrypt(nonce, aes_key, f"room:{room_id}".encode())
+    return base64.b64encode(nonce + ct).decode("ascii")
+
+
+def open_room_key(sealed: str, room_id: int) -> bytes:
+    raw = base64.b64decode(sealed)
+    return AESGCM(_kek()).decrypt(raw[:12], raw[12:], f"room:{room_id}".encode())
+
+
+class PublicKeyCache:
+    """
+    LRU разобранных публичных ключей по отпечатку (sha256 PEM): разбор PEM
+    стоит столько же, сколько само шифрование, а ключи пользователей меняются
+    редко. Сменился PEM — сменился отпечаток, инвалидировать нечего.
+    Некорректный ключ кэшируется как None.
+    """
+
+    def __init__(self, maxsize: int = settings.crypto_pubkey_cache_size):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[bytes, object]" = OrderedDict()
+
+    def get(self, pem: str):
+        data = pem.encode("utf-8")
+        fp = hashlib.sha256(data).digest()
+        if fp in self._items:
+            self._items.move_to_end(fp)
+            return self._items[fp]
+        try:
+            key = serialization.load_pem_public_key(data)
+        except Exception:
+            key = None
+        self._items[fp] = key
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        return key
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# в каждом процессе пула свой кэш: воркеры живут долго, ключи повторяются
+PUBKEYS = PublicKeyCache()
+
+
+def _wrap_chunk(aes_key: bytes, items: List[Tuple[int, str]]) -> List[Tuple[int, str]]:
+    """Выполняется в дочернем процессе: [(user_id, PEM)] -> [(user_id, base64 RSA-OAEP(aes_key))]."""
+    out = []
+    for user_id, pem in items:
+        pub = PUBKEYS.get(pem)
+        if pub is None:
+            continue  # некорректный публичный ключ пользователя — пропускаем
+        try:
+            wrapped = pub.encrypt(aes_key, OAEP)
+        except Exception:
+            continue  # не RSA-ключ
+        out.append((user_id, base64.b64encode(wrapped).decode("ascii")))
+    return out
+
+
+class KeyWrapPool:
+    """
+    Пул процессов для RSA-OAEP: cryptography держит GIL на операциях с ключом,
+    поэтому в потоках обёртка для сотен участников всё равно отнимала бы
+    время у event loop. Пачки по crypto_wrap_chunk идут в воркеры параллельно.
+    """
+
+    def __init__(self, workers: int = settings.crypto_workers):
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def wrap(self, aes_key: bytes, pems: Dict[int, str]) -> List[Tuple[int, str]]:
+        """[(user_id, wrapped_key_b64)] для всех пользователей с корректным ключом."""
+        items = sorted(pems.items())
+        if not items:
+            return []
+        step = settings.crypto_wrap_chunk
+        loop = asyncio.get_running_loop()
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(self._executor(), _wrap_chunk, aes_key, items[i:i + step])
+            for i in range(0, len(items), step)
+        ))
+        return [share for part in parts for share in part]
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+KEY_WRAP = KeyWrapPool()
+
+
 class CryptoService:
     def __init__(self, rrepo: RoomRepository, mrepo: MembershipRepository, urepo: UserRepository, crepo: CryptoRepository):
         self.rrepo = rrepo
@@ -28,36 +172,49 @@ class CryptoService:
 
         # 32 байта AES ключа
         aes_key = os.urandom(32)
-        rk = await self.crepo.create_room_key(room_id=room.id, created_by=actor_user_id, algo="AES-256-GCM")
-
-        participants = await self.mrepo.list_by_room(room_id=room.id, limit=500)
-        wrapped_count = 0
-        for mem in participants:
-            user = await self.urepo.get(mem.user_id)
-            if not user or not user.public_key_pem:
-                continue
-            try:
-                pub = serialization.load_pem_public_key(user.public_key_pem.encode("utf-8"))
-                wrapped = pub.encrypt(
-                    aes_key,
-                    padding.OAEP(
-                        mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                        algorithm=hashes.SHA256(),
-                        label=None,
-                    ),
-                )
-                b64 = base64.b64encode(wrapped).decode("ascii")
-                await self.crepo.add_share(room_key_id=rk.id, room_id=room.id, user_id=user.id, wrapped_key_b64=b64)
-                wrapped_count += 1
-            except Exception:
-                # некорректный публичный ключ пользователя — пропускаем
-                continue
-
-        return {"room_key_id": rk.id, "algo": rk.algo, "distributed": wrapped_count}
+        # предыдущий ключ больше не раздаём опоздавшим
+        await self.crepo.rotate_active(room_id=room.id)
+        rk = await self.crepo.create_room_key(room_id=room.id, created_by=actor_user_id, algo="AES-256-GCM",
+                                              sealed_key=seal_room_key(aes_key, room.id))
+
+        participants = await self.mrepo.list_active(room_id=room.id)
+        # один запрос за ключами вместо get() на участника, RSA — в пуле, вставка — одним executemany
+        pems = await self.urepo.get_public_keys(mem["user_id"] for mem in participants)
+        shares = await KEY_WRAP.wrap(aes_key, pems)
+        wrapped_count = await self.crepo.add_shares(room_key_id=rk.id, room_id=room.id, shares=shares)
+
+        return {"room_key_id": rk.id, "room_id": room.id, "algo": rk.algo, "distributed": wrapped_count}
+
+    async def deliver_to(self, *, room_id: int, user_id: int) -> RoomKeyShare | None:
+        """
+        Обернуть активный ключ комнаты для одного участника (опоздавшего): стоимость —
+        одна RSA-операция, а не повторная раздача всем. None — нет активного
+        ключа, участник не активен, нет публичного ключа или он некорректен.
+        """
+        rk = await self.crepo.active_key(room_id=room_id)
+        if not rk or not rk.sealed_key:
+            return None  # ключи, созданные до sealed_key, переинициализирует админ
+        existing = await self.crepo.share_for_key(room_key_id=rk.id, user_id=user_id)
+        if existing:
+            return existing
+        if not await self.mrepo.get_active(room_id=room_id, user_id=user_id):
+            return None
+        pems = await self.urepo.get_public_keys([user_id])
+        if not pems:
+            return None
+        shares = await KEY_WRAP.wrap(open_room_key(rk.sealed_key, room_id), pems)
+        if not shares:
+            return None
+        await self.crepo.add_shares(room_key_id=rk.id, room_id=room_id, shares=shares)
+        return await self.crepo.share_for_key(room_key_id=rk.id, user_id=user_id)
 
     async def get_my_wrapped_key(self, *, room_slug: str, user_id: int) -> dict | None:
         room = await self._room_ctx(room_slug)
         sh = await self.crepo.latest_share_for_user(room_id=room.id, user_id=user_id)
+        rk = await self.crepo.active_key(room_id=room.id)
+        if rk and (not sh or sh.room_key_id != rk.id):
+            # фоновая доставка после join ещё не успела (или ключ ротировали) — обернём сейчас
+            sh = await self.deliver_to(room_id=room.id, user_id=user_id) or sh
         if not sh:
             return None
-        return {"algo": "AES-256-GCM", "wrapped_key_b64": sh.wrapped_key_b64}
+        return {"algo": "AES-256-GCM", "room_key_id": sh.room_key_id, "wrapped_key_b64": sh.wrapped_key_b64}
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.db.session import engine as default_engine
+from app.services.metrics import MetricsService, metrics_service
+
+log = logging.getLogger(__name__)
+
+RECORDS_DIR = Path("static/records")
+_SCORE = {"ok": 100, "warning": 30, "fail": 0}
+
+
+def _level(value: Optional[float], warn: float, fail: float) -> str:
+    if value is None or value >= fail:
+        return "fail"
+    return "warning" if value >= warn else "ok"
+
+
+class HealthMonitor:
+    """
+    Проверки здоровья в фоне раз в interval секунд; эндпоинты отдают последний
+    результат и ничего не пересчитывают.
+
+    К проверкам в памяти (WS-хаб, CPU/память сэмплера, задержка loop) добавляются
+    замеры: round-trip до БД, ожидание блокировки записи (SQLite: BEGIN IMMEDIATE
+    ждёт текущего писателя) и свободное место под записи. Статус проверки —
+    ok / warning / fail; воркер не готов (readiness 503), если хоть одна в fail
+    или результат устарел — балансировщик выводит его из ротации. В fail ведут
+    только проблемы самого воркера (ошибка/таймаут пробы, лаг loop, диск):
+    блокировка записи SQLite общая, и долгий писатель иначе снял бы все воркеры
+    разом — её ожидание для readiness не хуже warning.
+    """
+
+    def __init__(self, engine: AsyncEngine = default_engine, metrics: MetricsService = metrics_service,
+                 interval_seconds: float = settings.health_interval_seconds,
+                 records_dir: Path = RECORDS_DIR):
+        self.engine = engine
+        self.metrics = metrics
+        self.interval_seconds = interval_seconds
+        self.records_dir = records_dir
+        self._last: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0  # monotonic
+        self._started_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe_db(self) -> Dict[str, Any]:
+        timeout = settings.health_db_fail_ms / 1000 * 2
+        out: Dict[str, Any] = {"response_time_ms": None, "write_lock_wait_ms": None}
+        try:
+            async with self.engine.connect() as conn:
+                started = time.perf_counter()
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout)
+                out["response_time_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                if conn.dialect.name == "sqlite":
+                    out["write_lock_wait_ms"] = await self._probe_write_lock(conn)
+        except Exception as e:
+            out["error"] = type(e).__name__
+            out["status"] = "fail"
+            return out
+        levels = [_level(out["response_time_ms"], settings.health_db_warn_ms, settings.health_db_fail_ms)]
+        if self.engine.dialect.name == "sqlite":
+            lock = _level(out["write_lock_wait_ms"], settings.health_lock_warn_ms, settings.health_lock_fail_ms)
+            out["write_lock_status"] = lock  # как есть — для мониторинга
+            levels.append("warning" if lock == "fail" else lock)
+        out["status"] = min(levels, key=_SCORE.get)  # худший из замеров
+        return out
+
+    @staticmethod
+    async def _probe_write_lock(conn) -> Optional[float]:
+        """
+        Сколько ждать блокировку записи SQLite; None — не дождались за порог fail.
+        Ожидание ограничивает сам SQLite (busy_timeout на время пробы): отмена
+        из asyncio не прервала бы вызов в потоке драйвера.
+        """
+        prev = (await conn.exec_driver_sql("PRAGMA busy_timeout")).scalar()
+        await conn.exec_driver_sql(f"PRAGMA busy_timeout = {int(settings.health_lock_fail_ms)}")
+        started = time.perf_counter()
+        try:
+            await conn.exec_driver_sql("BEGIN IMMEDIATE")
+        except OperationalError:
+            return None  # database is locked
+        finally:
+            waited = round((time.perf_counter() - started) * 1000, 2)
+            await conn.exec_driver_sql(f"PRAGMA busy_timeout = {int(prev)}")
+        await conn.exec_driver_sql("ROLLBACK")
+        return waited
+
+    def _probe_disk(self) -> Dict[str, Any]:
+        path = self.records_dir if self.records_dir.exists() else Path(".")
+        try:
+            free_mb = shutil.disk_usage(path).free / 1024 / 1024
+        except OSError as e:
+            return {"status": "fail", "path": str(path), "error": type(e).__name__}
+        min_mb = settings.health_disk_min_free_mb
+        status = "fail" if free_mb < min_mb else "warning" if free_mb < min_mb * 5 else "ok"
+        return {"status": status, "path": str(path), "free_mb": round(free_mb, 1)}
+
+    async def check_once(self) -> Dict[str, Any]:
+        base = self.metrics.get_health_status()  # хаб, CPU/память, loop — из памяти
+        checks = dict(base["checks"])
+        checks["database"] = await self._probe_db()
+        checks["disk"] = self._probe_disk()
+        lag_ms = checks["event_loop"]["recent_max_lag_ms"]
+        if lag_ms >= settings.health_loop_fail_ms:
+            checks["event_loop"]["status"] = "fail"
+
+        statuses = [c["status"] for c in checks.values()]
+        result = {
+            "status": "healthy" if all(s == "ok" for s in statuses) else "degraded",
+            "ready": "fail" not in statuses,
+            "timestamp": datetime.utcnow(),
+            "checks": checks,
+            "overall_score": round(sum(_SCORE[s] for s in statuses) / len(statuses), 1),
+        }
+        self._last = result
+        self._checked_at = time.monotonic()
+        return result
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Последний результат (None — ещё не проверяли)."""
+        return self._last
+
+    def readiness(self) -> Dict[str, Any]:
+        """{"ready": bool, "reason": ...} по закэшированному результату."""
+        if self._last is None:
+            return {"ready": False, "reason": "starting"}
+        age = time.monotonic() - self._checked_at
+        if age > self.interval_seconds * 3:
+            return {"ready": False, "reason": "stale", "age_seconds": round(age, 1)}
+        if not self._last["ready"]:
+            failed = [k for k, c in self._last["checks"].items() if c["status"] == "fail"]
+            return {"ready": False, "reason": "failed_checks", "failed": failed}
+        return {"ready": True, "status": self._last["status"]}
+
+    def uptime_seconds(self) -> float:
+        return time.monotonic() - self._started_at
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.check_once()
+            except Exception:
+                log.exception("health check failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="health-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+HEALTH = HealthMonitor()
@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from app.core.config import settings
+
+# Производные размеры (px): аватар — квадрат, обложка — ширина с сохранением пропорций
+AVATAR_SIZES = (64, 128, 256)
+COVER_SIZES = (480, 960, 1600)
+
+# Каталог content-hashed файлов: раздаётся с Cache-Control: immutable (см. main.py)
+IMG_DIR = Path("static/img")
+
+
+def variant_files(out_dir: Path, stem: str) -> Dict[str, Path]:
+    """Производные ровно этого stem ({размер: путь}); glob по префиксу задел бы «slug-2»."""
+    pattern = re.compile(rf"^{re.escape(stem)}-(\d+)-[0-9a-f]{{16}}\.webp$")
+    out: Dict[str, Path] = {}
+    if out_dir.is_dir():
+        for p in out_dir.iterdir():
+            m = pattern.match(p.name)
+            if m:
+                out[m.group(1)] = p
+    return out
+
+
+def stale_variants(old: Optional[Dict[str, str]], new: Optional[Dict[str, str]] = None) -> List[Path]:
+    """
+    Файлы производных, на которые ссылалась заменяемая строка (old — {размер: URL}),
+    кроме тех, что остались в new. Берём из строки, а не из каталога: файлы
+    параллельной загрузки того же владельца в каталоге уже есть, но не наши.
+    """
+    keep = set((new or {}).values())
+    prefix = f"/{IMG_DIR.as_posix()}/"
+    out = []
+    for url in (old or {}).values():
+        if url in keep or not url.startswith(prefix) or ".." in url:
+            continue
+        out.append(Path(url.lstrip("/")))
+    return out
+
+
+def _render(src: str, out_dir: str, stem: str, sizes: Sequence[int], square: bool,
+            quality: int, max_pixels: int) -> Dict[str, str]:
+    """
+    Выполняется в дочернем процессе: декодировать исходник, нарезать размеры,
+    закодировать в WebP и записать под именем <stem>-<size>-<hash>.webp.
+    Возвращает {size: имя файла}. Старые производные не трогает: их удаляет
+    вызывающий после коммита (stale_variants + blobs.discard).
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with Image.open(src) as im:
+            im = ImageOps.exif_transpose(im)
+            im = im.convert("RGBA" if im.mode in ("RGBA", "LA", "P") else "RGB")
+    except Exception:
+        # Image.DecompressionBombError — тоже сюда
+        raise ValueError("bad_image")
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    names: Dict[str, str] = {}
+    for size in sizes:
+        if square:
+            variant = ImageOps.fit(im, (size, size), method=Image.Resampling.LANCZOS)
+        else:
+            variant = im.copy()
+            variant.thumbnail((size, size * 4), Image.Resampling.LANCZOS)  # не увеличиваем
+        buf = io.BytesIO()
+        variant.save(buf, format="WEBP", quality=quality, method=4)
+        data = buf.getvalue()
+        name = f"{stem}-{size}-{hashlib.sha256(data).hexdigest()[:16]}.webp"
+        dest = out / name
+        if not dest.exists():
+            tmp = out / f".{name}.{os.getpid()}.part"
+            tmp.write_bytes(data)
+            os.replace(tmp, dest)
+        names[str(size)] = name
+    return names
+
+
+class ImagesBusy(RuntimeError):
+    """Очередь обработки изображений переполнена — API отвечает 503 с Retry-After."""
+
+
+class ImagePipeline:
+    """
+    Ограниченный пул процессов для декодирования/ресайза: Pillow держит GIL на
+    тяжёлых операциях, поэтому поток не спасает event loop — нужен процесс.
+    Сверх max_pending (выполняются + ждут) задачи не принимаются (ImagesBusy),
+    чтобы пачка загрузок не раздувала память и очередь.
+    """
+
+    def __init__(self, workers: int = settings.image_workers, max_pending: int = settings.image_max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def _run(self, src: Path, kind: str, stem: str, sizes: Sequence[int], square: bool) -> Dict[str, str]:
+        if self._pending >= self.max_pending:
+            raise ImagesBusy("images_busy")
+        out_dir = IMG_DIR / kind
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            names = await loop.run_in_executor(
+                self._executor(), _render, str(src), str(out_dir), stem, tuple(sizes), square,
+                settings.image_quality, settings.image_max_pixels,
+            )
+        finally:
+            self._pending -= 1
+        return {size: f"/{out_dir.as_posix()}/{name}" for size, name in names.items()}
+
+    async def avatar(self, src: Path, user_id: int) -> Dict[str, str]:
+        """{размер: URL} квадратных WebP-аватаров."""
+        return await self._run(src, "avatars", f"user_{user_id}", AVATAR_SIZES, square=True)
+
+    async def cover(self, src: Path, room_slug: str) -> Dict[str, str]:
+        """{ширина: URL} WebP-обложек."""
+        return await self._run(src, "covers", room_slug, COVER_SIZES, square=False)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+IMAGES = ImagePipeline()
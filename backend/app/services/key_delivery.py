@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Dict, Set, Tuple
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.repositories.crypto_repo import CryptoRepository
+from app.repositories.membership_repo import MembershipRepository
+from app.repositories.room_repo import RoomRepository
+from app.repositories.user_repo import UserRepository
+from app.services.crypto import CryptoService
+from app.services.ws_hub import HUB, WsHub
+
+log = logging.getLogger(__name__)
+
+
+class KeyDelivery:
+    """
+    Доставка ключа комнаты опоздавшим: после коммита join планируется задача,
+    которая в своей сессии оборачивает активный ключ только для этого участника
+    (RSA — в пуле процессов KEY_WRAP) и шлёт ему room_key.ready по WS.
+    Повторный join того же участника, пока задача не закончилась, не дублирует работу.
+    Комнаты без ключа запоминаются, чтобы join в них не открывал лишнюю сессию.
+    """
+
+    def __init__(self, session_factory=SessionLocal, hub: WsHub = HUB,
+                 concurrency: int = settings.crypto_delivery_concurrency):
+        self.session_factory = session_factory
+        self.hub = hub
+        self._sem = asyncio.Semaphore(concurrency)
+        self._pending: Set[Tuple[int, int]] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._keyed: Dict[int, bool] = {}  # room_id -> есть активный ключ с sealed_key
+
+    def mark_keyed(self, room_id: int) -> None:
+        """Вызывать после коммита init_room_key."""
+        self._keyed[room_id] = True
+
+    def schedule(self, *, room_slug: str, room_id: int, user_id: int) -> None:
+        """Вызывать после коммита членства."""
+        key = (room_id, user_id)
+        if self._keyed.get(room_id) is False or key in self._pending:
+            return
+        self._pending.add(key)
+        task = asyncio.create_task(self._run(room_slug, room_id, user_id), name="room-key-delivery")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, room_slug: str, room_id: int, user_id: int) -> None:
+        try:
+            async with self._sem:
+                async with self.session_factory() as session:
+                    crepo = CryptoRepository(session)
+                    if room_id not in self._keyed:
+                        rk = await crepo.active_key(room_id=room_id)
+                        self._keyed.setdefault(room_id, bool(rk and rk.sealed_key))
+                        if not self._keyed[room_id]:
+                            return
+                    svc = CryptoService(RoomRepository(session), MembershipRepository(session),
+                                        UserRepository(session), crepo)
+                    share = await svc.deliver_to(room_id=room_id, user_id=user_id)
+                    await session.commit()
+            if share:
+                await self.hub.send_to(room_slug, user_id, {"type": "room_key.ready", "room_key_id": share.room_key_id})
+        except Exception:
+            # не доставили — клиент получит ключ при GET my_key
+            log.exception("room key delivery failed: room=%s user=%s", room_id, user_id)
+        finally:
+            self._pending.discard((room_id, user_id))
+
+    async def drain(self) -> None:
+        """Дождаться запланированных доставок (остановка приложения, тесты)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+KEY_DELIVERY = KeyDelivery()
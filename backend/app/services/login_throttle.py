@@ -0,0 +1,77 @@
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional
+
+from app.core.config import settings
+
+
+class LoginThrottle:
+    """
+    Скользящее окно в памяти: неудачные входы на пару (аккаунт, IP) и все
+    попытки с IP. Проверка идёт до bcrypt, поэтому перебор пароля или флуд
+    с одного адреса упирается в 429, а не в CPU. Неудачи считаются по паре,
+    а не по аккаунту: иначе любой, кто знает email, заблокировал бы вход
+    владельцу. Ключей не больше max_keys — давно не трогавшиеся вытесняются первыми.
+    """
+
+    def __init__(self, window_seconds: int = settings.login_window_seconds,
+                 max_failures: int = settings.login_max_failures_per_account,
+                 max_attempts_ip: int = settings.login_max_attempts_per_ip,
+                 max_keys: int = settings.login_throttle_max_keys,
+                 clock=time.monotonic):
+        self.window = window_seconds
+        self.max_failures = max_failures
+        self.max_attempts_ip = max_attempts_ip
+        self.max_keys = max_keys
+        self.clock = clock
+        self._hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def _recent(self, key: str, now: float) -> Deque[float]:
+        hits = self._hits.get(key)
+        if hits is None:
+            return deque()
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        if not hits:
+            del self._hits[key]
+        return hits
+
+    def _add(self, key: str, now: float) -> None:
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = self._hits[key] = deque()
+            if len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        else:
+            self._hits.move_to_end(key)
+        hits.append(now)
+
+    @staticmethod
+    def _account_key(account: str, ip: Optional[str]) -> str:
+        return f"acct:{account.lower()}|{ip or '-'}"
+
+    def _retry_after(self, hits: Deque[float], now: float) -> int:
+        return max(1, math.ceil(hits[0] + self.window - now))
+
+    def check(self, *, account: str, ip: Optional[str]) -> Optional[int]:
+        """None — можно проверять пароль (попытка с IP засчитана), иначе Retry-After в секундах."""
+        now = self.clock()
+        failures = self._recent(self._account_key(account, ip), now)
+        if len(failures) >= self.max_failures:
+            return self._retry_after(failures, now)
+        if ip:
+            attempts = self._recent(f"ip:{ip}", now)
+            if len(attempts) >= self.max_attempts_ip:
+                return self._retry_after(attempts, now)
+            self._add(f"ip:{ip}", now)
+        return None
+
+    def failure(self, account: str, ip: Optional[str]) -> None:
+        self._add(self._account_key(account, ip), self.clock())
+
+    def success(self, account: str, ip: Optional[str]) -> None:
+        self._hits.pop(self._account_key(account, ip), None)
+
+
+LOGIN_THROTTLE = LoginThrottle()
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Optional
+
+from app.core.config import settings
+from app.utils.histogram import LogHistogram
+
+log = logging.getLogger(__name__)
+
+STACK_FRAMES = 20  # сколько верхних кадров стека сохранять в отчёте о зависании
+
+
+class LoopMonitor:
+    """
+    Задержка планирования event loop и поиск виновников зависаний.
+
+    Проба в loop спит interval и пишет в гистограмму, насколько позже она
+    проснулась. Сторожевой поток раз в interval смотрит на отметку пробы: если
+    loop не отвечает дольше stall_threshold, он снимает стек потока loop
+    (sys._current_frames) — в отчёт попадает код, который блокирует loop прямо
+    сейчас (синхронный I/O, bcrypt, RSA...). Один отчёт на зависание; его
+    длительность уточняет проба, когда loop оживает.
+    """
+
+    def __init__(self, interval_seconds: float = settings.loop_probe_interval_seconds,
+                 stall_threshold_seconds: float = settings.loop_stall_threshold_seconds,
+                 history: int = settings.loop_stall_history):
+        self.interval = interval_seconds
+        self.stall_threshold = stall_threshold_seconds
+        self.lag = LogHistogram()
+        self._recent: Deque[float] = deque(maxlen=max(1, int(5 / interval_seconds)))  # ~5 с
+        self.stalls: Deque[dict] = deque(maxlen=history)
+        self.stall_count = 0
+        self._beat = 0.0
+        self._current: Optional[dict] = None  # зависание, которое сейчас видит сторож
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def recent_max_lag(self) -> float:
+        """Максимальная задержка за последние ~5 секунд."""
+        return max(self._recent, default=0.0)
+
+    async def _probe(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - started - self.interval)
+            self._beat = now
+            self.lag.record(lag)
+            self._recent.append(lag)
+            cur = self._current
+            if cur is not None:
+                cur["duration_ms"] = max(cur["duration_ms"], round(lag * 1000, 1))
+                self._current = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            if not beat or self._current is not None:
+                continue
+            stalled = time.perf_counter() - beat - self.interval
+            if stalled < self.stall_threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = traceback.format_stack(frame)[-STACK_FRAMES:] if frame is not None else []
+            report = {"at": time.time(), "duration_ms": round(stalled * 1000, 1), "stack": "".join(stack)}
+            self.stalls.append(report)
+            self.stall_count += 1
+            self._current = report
+            log.warning("event loop stalled for %.0f ms:\n%s", stalled * 1000, report["stack"])
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._loop_thread = threading.get_ident()
+            self._beat = time.perf_counter()
+            self._task = asyncio.create_task(self._probe(), name="loop-monitor")
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self._beat = 0.0
+
+
+LOOP_MONITOR = LoopMonitor()
@@ -1,93 +1,260 @@
 # app/services/metrics.py
 import time
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
-from collections import defaultdict, deque
-import psutil
-import os
+from typing import Dict, Any, Iterator, Optional
+from datetime import datetime
+from collections import defaultdict
+from app.db.sql_stats import SqlStats
+from app.services.loop_monitor import LOOP_MONITOR, LoopMonitor
+from app.services.room_activity import RoomActivity
+from app.services.system_sampler import SAMPLER, SystemSampler
+from app.services.ws_hub import HUB, WsHub
+from app.utils.counters import RateCounter
+from app.utils.histogram import LogHistogram
+from app.utils import prometheus as prom
+
+# Значений метки (маршрут, тип события/ошибки) не больше — остальное в "other"
+MAX_LABEL_VALUES = 200
 
 
 class MetricsService:
-    def __init__(self):
+    def __init__(self, sampler: SystemSampler = SAMPLER, hub: WsHub = HUB, loop: LoopMonitor = LOOP_MONITOR):
+        # CPU/память снимает фоновый сэмплер, здесь только чтение последнего замера
+        self._sampler = sampler
+        # живые WS-показатели — из счётчиков хаба
+        self._hub = hub
+        # задержка event loop и отчёты о зависаниях
+        self._loop = loop
         # In-memory storage for real-time metrics
         self._message_counter = 0
         self._join_counter = 0
         self._ws_events_counter = 0
         self._error_counter = 0
-
-        # Time series data (last hour)
-        self._message_history = deque(maxlen=3600)
-        self._join_history = deque(maxlen=3600)
-        self._ws_history = deque(maxlen=3600)
-
-        # Room-specific metrics
-        self._room_activity = defaultdict(lambda: {
-            'messages': 0,
-            'participants': 0,
-            'last_activity': datetime.utcnow(),
-            'media_streams': 0
+        self._ws_events_by_type: Dict[str, int] = {}
+        self._errors_by_type: Dict[str, int] = {}
+
+        # Скользящие окна за последний час: посекундные корзины, rate за O(1)
+        self._message_history = RateCounter(3600)
+        self._join_history = RateCounter(3600)
+        self._ws_history = RateCounter(3600)
+
+        # Активность комнат: простаивающие вытесняются по TTL, топ-K поддерживается на лету
+        self._room_activity = RoomActivity()
+
+        # Латентности: потоковые гистограммы, HTTP и WS раздельно
+        self._response_times = LogHistogram()  # все HTTP-запросы
+        self._http_latency: Dict[str, LogHistogram] = {}  # "GET /api/rooms/{slug}" -> гистограмма
+        self._ws_latency: Dict[str, LogHistogram] = {}  # тип WS-сообщения -> обработка
+        self._ws_connection_times = LogHistogram()  # длительность WS-соединений
+        # HTTP: ответы по классам статусов, байты, запросы в полёте
+        self._http_status = {'1xx': 0, '2xx': 0, '3xx': 0, '4xx': 0, '5xx': 0}
+        self._http_bytes = {'in': 0, 'out': 0}
+        self._http_in_flight = 0
+        # SQL по единицам работы: ключ -> [единиц, выражений, секунд в БД]
+        self._http_sql: Dict[str, list] = {}
+        self._ws_sql: Dict[str, list] = {}
+        self._join_times = LogHistogram()  # латентность WS join (сек)
+
+        # Загрузки файлов по видам (recording/cover/avatar)
+        self._uploads = defaultdict(lambda: {
+            'count': 0,
+            'bytes': 0,
+            'seconds': 0.0,
+            'rejected': 0,
+            'last_mb_per_s': 0.0,
         })
-
-        # Performance metrics
-        self._response_times = deque(maxlen=1000)
+        # Проверка токенов: попадания в кэш, полные проверки JWT, отказы
+        self._auth = {'cache_hits': 0, 'verified': 0, 'failed': 0}
+        self._token_verify_times = LogHistogram()  # полная проверка (сек)
         self._start_time = datetime.utcnow()
 
     def increment_message_count(self, room_slug: str, encrypted: bool = False):
         """Увеличить счетчик сообщений"""
         self._message_counter += 1
-        self._message_history.append((datetime.utcnow(), 1))
-        self._room_activity[room_slug]['messages'] += 1
-        self._room_activity[room_slug]['last_activity'] = datetime.utcnow()
+        self._message_history.add()
+        self._room_activity.message(room_slug)
 
     def increment_join_count(self, room_slug: str):
         """Увеличить счетчик присоединений"""
         self._join_counter += 1
-        self._join_history.append((datetime.utcnow(), 1))
+        self._join_history.add()
 
     def increment_ws_events(self, event_type: str):
         """Увеличить счетчик WebSocket событий"""
         self._ws_events_counter += 1
-        self._ws_history.append((datetime.utcnow(), 1))
+        self._ws_history.add()
+        self._bump(self._ws_events_by_type, event_type)
 
     def increment_errors(self, error_type: str = "unknown"):
         """Увеличить счетчик ошибок"""
         self._error_counter += 1
+        self._bump(self._errors_by_type, error_type)
+
+    @staticmethod
+    def _bump(table: Dict[str, int], key: str):
+        key = str(key)
+        if key not in table and len(table) >= MAX_LABEL_VALUES:
+            key = "other"
+        table[key] = table.get(key, 0) + 1
+
+    @staticmethod
+    def _keyed(table: Dict[str, LogHistogram], key: str) -> LogHistogram:
+        h = table.get(key)
+        if h is None:
+            if len(table) >= MAX_LABEL_VALUES:
+                key = "other"
+                h = table.get(key)
+            if h is None:
+                h = table[key] = LogHistogram()
+        return h
+
+    def record_response_time(self, response_time: float, route: Optional[str] = None):
+        """Записать время HTTP-ответа (route — шаблон маршрута, не сырой путь)"""
+        self._response_times.record(response_time)
+        if route:
+            self._keyed(self._http_latency, route).record(response_time)
+
+    def http_request_started(self):
+        """HTTP-запрос принят (парный вызов — record_http_request)"""
+        self._http_in_flight += 1
+
+    @staticmethod
+    def _add_sql(table: Dict[str, list], key: str, sql: SqlStats):
+        row = table.get(key)
+        if row is None:
+            if len(table) >= MAX_LABEL_VALUES:
+                key = "other"
+                row = table.get(key)
+            if row is None:
+                row = table[key] = [0, 0, 0.0]
+        row[0] += 1
+        row[1] += sql.statements
+        row[2] += sql.seconds
+
+    def record_http_request(self, route: str, status: int, seconds: float, bytes_in: int, bytes_out: int,
+                            sql: Optional[SqlStats] = None):
+        """HTTP-запрос завершён: латентность по маршруту, класс статуса, байты, SQL"""
+        self._http_in_flight -= 1
+        self.record_response_time(seconds, route)
+        if sql is not None:
+            self._add_sql(self._http_sql, route, sql)
+        cls = f"{status // 100}xx"
+        if cls in self._http_status:
+            self._http_status[cls] += 1
+        self._http_bytes['in'] += bytes_in
+        self._http_bytes['out'] += bytes_out
+        if status >= 500:
+            self.increment_errors(f"http_{status}")
+
+    def get_http_metrics(self) -> Dict[str, Any]:
+        """Ответы по классам статусов, трафик и запросы в полёте"""
+        return {
+            "in_flight": self._http_in_flight,
+            "responses": dict(self._http_status),
+            "bytes_in": self._http_bytes['in'],
+            "bytes_out": self._http_bytes['out'],
+        }
 
-    def record_response_time(self, response_time: float):
-        """Записать время ответа"""
-        self._response_times.append(response_time)
+    def record_ws_message_time(self, mtype: str, seconds: float, sql: Optional[SqlStats] = None):
+        """Записать время обработки WS-сообщения по типу (и его SQL)"""
+        self._keyed(self._ws_latency, str(mtype)).record(seconds)
+        if sql is not None:
+            self._add_sql(self._ws_sql, str(mtype), sql)
+
+    def get_sql_metrics(self) -> Dict[str, Any]:
+        """Число SQL-выражений и время в БД по HTTP-маршрутам и типам WS-сообщений"""
+        def rows(table):
+            return {k: {
+                "count": n,
+                "statements": st,
+                "avg_statements": st / n if n else 0.0,
+                "db_ms": sec * 1000,
+                "avg_db_ms": sec * 1000 / n if n else 0.0,
+            } for k, (n, st, sec) in sorted(table.items())}
+        return {"http": rows(self._http_sql), "ws": rows(self._ws_sql)}
+
+    def record_ws_connection_duration(self, seconds: float):
+        """Записать длительность WS-соединения (в латентность ответов не входит)"""
+        self._ws_connection_times.record(seconds)
+
+    def record_join_time(self, join_time: float):
+        """Записать латентность присоединения по WS (от accept до кадра joined)"""
+        self._join_times.record(join_time)
+
+    def get_latency_metrics(self) -> Dict[str, Any]:
+        """Квантили латентности по HTTP-маршрутам и типам WS-сообщений"""
+        return {
+            "http": {k: h.snapshot_ms() for k, h in sorted(self._http_latency.items())},
+            "ws": {k: h.snapshot_ms() for k, h in sorted(self._ws_latency.items())},
+            "ws_join": self._join_times.snapshot_ms(),
+            "ws_connection": self._ws_connection_times.snapshot_ms(),
+        }
+
+    def record_upload(self, kind: str, size_bytes: int, seconds: float):
+        """Записать завершённую загрузку файла"""
+        u = self._uploads[kind]
+        u['count'] += 1
+        u['bytes'] += size_bytes
+        u['seconds'] += seconds
+        u['last_mb_per_s'] = size_bytes / 1024 / 1024 / seconds if seconds > 0 else 0.0
+
+    def increment_upload_rejected(self, kind: str):
+        """Загрузка отклонена (превышен лимит размера)"""
+        self._uploads[kind]['rejected'] += 1
+
+    def get_upload_metrics(self) -> Dict[str, Any]:
+        """Пропускная способность загрузок по видам"""
+        out = {}
+        for kind, u in self._uploads.items():
+            out[kind] = {
+                "count": u['count'],
+                "rejected": u['rejected'],
+                "total_mb": u['bytes'] / 1024 / 1024,
+                "avg_mb_per_s": u['bytes'] / 1024 / 1024 / u['seconds'] if u['seconds'] > 0 else 0.0,
+                "last_mb_per_s": u['last_mb_per_s'],
+            }
+        return out
+
+    def record_token_check(self, cached: bool, seconds: float, ok: bool):
+        """Проверка токена: из кэша или полная (HMAC + разбор), успешная или нет"""
+        if cached:
+            self._auth['cache_hits'] += 1
+            return
+        self._auth['verified' if ok else 'failed'] += 1
+        self._token_verify_times.record(seconds)
+
+    def get_auth_metrics(self) -> Dict[str, Any]:
+        """Стоимость проверки токенов и доля попаданий в кэш"""
+        total = self._auth['cache_hits'] + self._auth['verified'] + self._auth['failed']
+        h = self._token_verify_times
+        p95, = h.quantiles(0.95)
+        return {
+            **self._auth,
+            "cache_hit_ratio": self._auth['cache_hits'] / total if total else 0.0,
+            "avg_verify_us": h.sum / h.count * 1e6 if h.count else 0.0,
+            "p95_verify_us": p95 * 1e6,
+        }
 
     def update_room_participants(self, room_slug: str, participant_count: int):
         """Обновить количество участников в комнате"""
-        self._room_activity[room_slug]['participants'] = participant_count
-        self._room_activity[room_slug]['last_activity'] = datetime.utcnow()
+        self._room_activity.participants(room_slug, participant_count)
 
     def update_media_streams(self, room_slug: str, stream_count: int):
         """Обновить количество медиа-стримов"""
-        self._room_activity[room_slug]['media_streams'] = stream_count
-
-    def _calculate_rate(self, history: deque, window_seconds: int = 60) -> float:
-        """Рассчитать rate за указанное окно"""
-        now = datetime.utcnow()
-        window_start = now - timedelta(seconds=window_seconds)
+        self._room_activity.media_streams(room_slug, stream_count)
 
-        count = sum(1 for timestamp, _ in history
-                    if timestamp >= window_start)
-        return count / (window_seconds / 60) if window_seconds > 0 else 0
+    def _calculate_rate(self, history: RateCounter, window_seconds: int = 60) -> float:
+        """Рассчитать rate (в минуту) за указанное окно"""
+        return history.per_minute(window_seconds)
 
     def get_system_stats(self) -> Dict[str, Any]:
         """Получить системную статистику"""
-        # Активные комнаты (с активностью за последние 5 минут)
-        active_rooms_threshold = datetime.utcnow() - timedelta(minutes=5)
-        active_rooms = sum(1 for room_data in self._room_activity.values()
-                           if room_data['last_activity'] >= active_rooms_threshold)
-
+        hub = self._hub.gauges()
         return {
             "total_rooms": len(self._room_activity),
             "total_users": 0,  # Можно добавить позже из базы
-            "active_rooms": active_rooms,
-            "active_users": 0,  # Можно добавить позже из WebSocket hub
-            "ws_connections": 0,
+            "active_rooms": self._room_activity.active_count(),  # активность за последние 5 минут
+            "active_users": hub["connections"],  # участники с открытым сокетом (по комнатам)
+            "ws_connections": hub["connections"],
             "message_rate": self._calculate_rate(self._message_history),
             "participant_rate": self._calculate_rate(self._join_history),
         }
@@ -95,25 +262,22 @@ class MetricsService:
     def get_performance_metrics(self) -> Dict[str, Any]:
         """Получить метрики производительности"""
         try:
-            process = psutil.Process(os.getpid())
-            system_memory = psutil.virtual_memory()
+            sample = self._sampler.latest()
 
-            response_times = list(self._response_times)
-            avg_response_time = sum(response_times) / len(response_times) if response_times else 0
-
-            p95_response_time = 0
-            if response_times:
-                sorted_times = sorted(response_times)
-                p95_index = int(len(sorted_times) * 0.95)
-                p95_response_time = sorted_times[p95_index] if p95_index < len(sorted_times) else sorted_times[-1]
+            http = self._response_times.snapshot_ms()
+            join = self._join_times.snapshot_ms()
 
             return {
-                "process_cpu_percent": process.cpu_percent(),
-                "process_memory_mb": process.memory_info().rss / 1024 / 1024,
-                "system_memory_percent": system_memory.percent,
-                "system_memory_available_gb": system_memory.available / 1024 / 1024 / 1024,
-                "avg_response_time_ms": avg_response_time * 1000,
-                "p95_response_time_ms": p95_response_time * 1000,
+                "process_cpu_percent": sample["process_cpu_percent"],
+                "process_memory_mb": sample["process_memory_mb"],
+                "system_memory_percent": sample["system_memory_percent"],
+                "system_memory_available_gb": sample["system_memory_available_gb"],
+                "avg_response_time_ms": http["avg_ms"],
+                "p50_response_time_ms": http["p50_ms"],
+                "p95_response_time_ms": http["p95_ms"],
+                "p99_response_time_ms": http["p99_ms"],
+                "avg_join_time_ms": join["avg_ms"],
+                "p95_join_time_ms": join["p95_ms"],
                 "uptime_seconds": (datetime.utcnow() - self._start_time).total_seconds(),
             }
         except Exception:
@@ -123,13 +287,17 @@ class MetricsService:
                 "system_memory_percent": 0,
                 "system_memory_available_gb": 0,
                 "avg_response_time_ms": 0,
+                "p50_response_time_ms": 0,
                 "p95_response_time_ms": 0,
+                "p99_response_time_ms": 0,
+                "avg_join_time_ms": 0,
+                "p95_join_time_ms": 0,
                 "uptime_seconds": (datetime.utcnow() - self._start_time).total_seconds(),
             }
 
     def get_room_metrics(self, room_slug: str) -> Dict[str, Any]:
         """Получить метрики конкретной комнаты"""
-        room_data = self._room_activity.get(room_slug, {})
+        room_data = self._room_activity.get(room_slug)
         if not room_data:
             return {}
 
@@ -137,9 +305,9 @@ class MetricsService:
             "slug": room_slug,
             "total_messages": room_data.get('messages', 0),
             "current_participants": room_data.get('participants', 0),
-            "peak_participants": room_data.get('participants', 0),
+            "peak_participants": room_data.get('peak_participants', 0),
             "media_streams": room_data.get('media_streams', 0),
-            "last_activity": room_data.get('last_activity', datetime.utcnow()).isoformat(),
+            "last_activity": datetime.utcfromtimestamp(room_data['last_activity']).isoformat(),
             "is_locked": False,
             "is_private": False,
             "recording_active": False,
@@ -150,19 +318,14 @@ class MetricsService:
         system_stats = self.get_system_stats()
         performance_metrics = self.get_performance_metrics()
 
-        # Собрать топ комнат по активности
-        active_rooms = []
-        for room_slug, data in self._room_activity.items():
-            if data.get('last_activity', datetime.utcnow()) >= datetime.utcnow() - timedelta(minutes=30):
-                active_rooms.append({
-                    'slug': room_slug,
-                    'message_count': data.get('messages', 0),
-                    'participant_count': data.get('participants', 0),
-                    'media_streams': data.get('media_streams', 0),
-                    'last_activity': data.get('last_activity', datetime.utcnow()).isoformat()
-                })
-
-        active_rooms.sort(key=lambda x: x.get('message_count', 0), reverse=True)
+        # Топ комнат по активности (простаивающие дольше TTL уже вытеснены)
+        active_rooms = [{
+            'slug': room_slug,
+            'message_count': data['messages'],
+            'participant_count': data['participants'],
+            'media_streams': data['media_streams'],
+            'last_activity': datetime.utcfromtimestamp(data['last_activity']).isoformat()
+        } for room_slug, data in self._room_activity.top()]
 
         return {
             "system": system_stats,
@@ -172,34 +335,144 @@ class MetricsService:
                 "total_joins": self._join_counter,
                 "total_ws_events": self._ws_events_counter,
                 "total_errors": self._error_counter,
+                "ws_events_by_type": dict(self._ws_events_by_type),
+                "errors_by_type": dict(self._errors_by_type),
             },
-            "top_rooms": active_rooms[:10],
+            "top_rooms": active_rooms,
+            "uploads": self.get_upload_metrics(),
+            "auth": self.get_auth_metrics(),
+            "latency": self.get_latency_metrics(),
+            "http": self.get_http_metrics(),
+            "event_loop": self.get_loop_metrics(with_stacks=False),
+            "sql": self.get_sql_metrics(),
             "timestamp": datetime.utcnow().isoformat(),
         }
 
+    def get_loop_metrics(self, with_stacks: bool = True) -> Dict[str, Any]:
+        """Задержка event loop и последние зависания со стеком виновника"""
+        return {
+            "lag": self._loop.lag.snapshot_ms(),
+            "recent_max_lag_ms": self._loop.recent_max_lag() * 1000,
+            "stall_threshold_ms": self._loop.stall_threshold * 1000,
+            "stalls_total": self._loop.stall_count,
+            "recent_stalls": [s if with_stacks else {k: v for k, v in s.items() if k != "stack"}
+                              for s in reversed(self._loop.stalls)],
+        }
+
+    def get_hub_metrics(self) -> Dict[str, Any]:
+        """Показатели WS-хаба и число сокетов по комнатам"""
+        return {**self._hub.gauges(), "members_per_room": self._hub.members_per_room()}
+
+    def prometheus_families(self) -> Iterator[str]:
+        """
+        Текст для /metrics по семействам. Всё — из уже накопленных счётчиков и
+        гистограмм: число серий ограничено MAX_LABEL_VALUES, а не числом комнат.
+        """
+        yield prom.family("axenix_messages_total", "counter", "Chat messages sent.",
+                          [({}, self._message_counter)])
+        yield prom.family("axenix_joins_total", "counter", "WebSocket room joins.",
+                          [({}, self._join_counter)])
+        yield prom.family("axenix_ws_events_total", "counter", "WebSocket events by type.",
+                          [({"type": k}, v) for k, v in self._ws_events_by_type.items()])
+        yield prom.family("axenix_errors_total", "counter", "Errors by type.",
+                          [({"type": k}, v) for k, v in self._errors_by_type.items()])
+        yield prom.family("axenix_http_responses_total", "counter", "HTTP responses by status class.",
+                          [({"code": k}, v) for k, v in self._http_status.items()])
+        yield prom.family("axenix_http_requests_in_flight", "gauge", "HTTP requests being processed.",
+                          [({}, self._http_in_flight)])
+        yield prom.family("axenix_http_request_bytes_total", "counter", "HTTP request body bytes.",
+                          [({}, self._http_bytes['in'])])
+        yield prom.family("axenix_http_response_bytes_total", "counter", "HTTP response body bytes.",
+                          [({}, self._http_bytes['out'])])
+        hub = self._hub.gauges()
+        yield prom.family("axenix_ws_connections", "gauge", "Open WebSocket connections in the hub.",
+                          [({}, hub["connections"])])
+        yield prom.family("axenix_hub_rooms", "gauge", "Rooms with a hub in this process.",
+                          [({}, hub["rooms"])])
+        yield prom.family("axenix_hub_active_rooms", "gauge", "Hub rooms with at least one connection.",
+                          [({}, hub["active_rooms"])])
+        yield prom.family("axenix_hub_send_failures_total", "counter", "Failed WebSocket sends.",
+                          [({}, hub["send_failures"])])
+        yield prom.family("axenix_rooms_tracked", "gauge", "Rooms with recorded activity.",
+                          [({}, len(self._room_activity))])
+        yield prom.family("axenix_rooms_active", "gauge", "Rooms with activity in the last 5 minutes.",
+                          [({}, self._room_activity.active_count())])
+        yield prom.family("axenix_uploads_total", "counter", "Completed uploads by kind.",
+                          [({"kind": k}, u['count']) for k, u in self._uploads.items()])
+        yield prom.family("axenix_upload_bytes_total", "counter", "Uploaded bytes by kind.",
+                          [({"kind": k}, u['bytes']) for k, u in self._uploads.items()])
+        yield prom.family("axenix_uploads_rejected_total", "counter", "Rejected uploads by kind.",
+                          [({"kind": k}, u['rejected']) for k, u in self._uploads.items()])
+        yield prom.family("axenix_token_checks_total", "counter", "Token checks by result.",
+                          [({"result": k}, v) for k, v in self._auth.items()])
+
+        def route_labels(key):
+            method, _, route = key.partition(" ")
+            return {"method": method, "route": route} if route else {"method": "", "route": key}
+
+        yield prom.histogram("axenix_http_request_duration_seconds", "HTTP request latency by route template.",
+                             [(route_labels(k), h) for k, h in self._http_latency.items()])
+        yield prom.family("axenix_http_sql_statements_total", "counter", "SQL statements by HTTP route template.",
+                          [(route_labels(k), r[1]) for k, r in self._http_sql.items()])
+        yield prom.family("axenix_http_sql_seconds_total", "counter", "Time in the database by HTTP route template.",
+                          [(route_labels(k), r[2]) for k, r in self._http_sql.items()])
+        yield prom.family("axenix_ws_sql_statements_total", "counter", "SQL statements by WebSocket message type.",
+                          [({"type": k}, r[1]) for k, r in self._ws_sql.items()])
+        yield prom.family("axenix_ws_sql_seconds_total", "counter", "Time in the database by WebSocket message type.",
+                          [({"type": k}, r[2]) for k, r in self._ws_sql.items()])
+        yield prom.histogram("axenix_ws_message_duration_seconds", "WebSocket message handling time by type.",
+                             [({"type": k}, h) for k, h in self._ws_latency.items()])
+        yield prom.histogram("axenix_ws_join_duration_seconds", "WebSocket join latency.",
+                             [({}, self._join_times)])
+        yield prom.histogram("axenix_ws_connection_duration_seconds", "WebSocket connection lifetime.",
+                             [({}, self._ws_connection_times)])
+        yield prom.histogram("axenix_event_loop_lag_seconds", "Event loop scheduling delay.",
+                             [({}, self._loop.lag)])
+        yield prom.family("axenix_event_loop_stalls_total", "counter", "Event loop stalls over the threshold.",
+                          [({}, self._loop.stall_count)])
+        yield prom.histogram("axenix_token_verify_duration_seconds", "Full JWT verification time.",
+                             [({}, self._token_verify_times)])
+        sample = self._sampler.latest()
+        yield prom.family("axenix_process_cpu_percent", "gauge", "Process CPU usage over the last sample interval.",
+                          [({}, sample["process_cpu_percent"])])
+        yield prom.family("axenix_process_resident_memory_bytes", "gauge", "Process resident memory.",
+                          [({}, int(sample["process_memory_mb"] * 1024 * 1024))])
+        yield prom.family("axenix_process_open_fds", "gauge", "Open file descriptors.",
+                          [({}, sample["process_open_fds"])])
+        yield prom.family("axenix_system_memory_percent", "gauge", "System memory in use.",
+                          [({}, sample["system_memory_percent"])])
+        yield prom.family("axenix_uptime_seconds", "gauge", "Seconds since process start.",
+                          [({}, (datetime.utcnow() - self._start_time).total_seconds())])
+
     def get_health_status(self) -> Dict[str, Any]:
         """Получить статус здоровья системы"""
         system_stats = self.get_system_stats()
         performance = self.get_performance_metrics()
 
+        # БД и диск замеряет HealthMonitor (app/services/health.py), здесь — только память процесса
         checks = {
-            "database": {"status": "ok", "response_time_ms": 0},
             "websocket": {"status": "ok", "connections": system_stats.get('ws_connections', 0)},
             "memory": {"status": "ok", "usage_percent": performance.get('system_memory_percent', 0)},
-            "cpu": {"status": "ok", "usage_percent": performance.get('process_cpu_percent', 0)}
+            "cpu": {"status": "ok", "usage_percent": performance.get('process_cpu_percent', 0)},
+            "event_loop": {"status": "ok", "recent_max_lag_ms": round(self._loop.recent_max_lag() * 1000, 1),
+                           "stalls_total": self._loop.stall_count},
         }
 
         # Простая проверка здоровья
         memory_ok = performance.get('system_memory_percent', 0) < 90
         cpu_ok = performance.get('process_cpu_percent', 0) < 80
+        # loop за последние секунды зависал дольше порога
+        loop_ok = self._loop.recent_max_lag() < self._loop.stall_threshold
 
-        is_healthy = memory_ok and cpu_ok
-        overall_score = ((100 if memory_ok else 30) + (100 if cpu_ok else 30)) / 2
+        is_healthy = memory_ok and cpu_ok and loop_ok
+        overall_score = ((100 if memory_ok else 30) + (100 if cpu_ok else 30) + (100 if loop_ok else 30)) / 3
 
         if not memory_ok:
             checks["memory"]["status"] = "warning"
         if not cpu_ok:
             checks["cpu"]["status"] = "warning"
+        if not loop_ok:
+            checks["event_loop"]["status"] = "warning"
 
         return {
             "status": "healthy" if is_healthy else "degraded",
@@ -3,8 +3,9 @@ from app.repositories.membership_repo import MembershipRepository
 from app.repositories.room_repo import RoomRepository
 from app.repositories.user_repo import UserRepository
 from app.models.membership import Membership
+from app.core.config import settings
 
-ONLINE_TTL_SECONDS = 45
+ONLINE_TTL_SECONDS = settings.presence_online_ttl_seconds
 
 class ParticipantService:
     def __init__(self, m_repo: MembershipRepository, r_repo: RoomRepository, u_repo: UserRepository):
@@ -12,16 +13,8 @@ class ParticipantService:
         self.r_repo = r_repo  # room_repo
         self.u_repo = u_repo  # user_repo
 
-    async def join(self, room_slug: str, user_id: int, invite_key: str | None = None) -> Membership:
-        # ИСПРАВЛЕННЫЕ НАЗВАНИЯ АТРИБУТОВ:
-        room = await self.r_repo.get_by_slug(room_slug)  # было: self.room_repo
-        if not room:
-            raise ValueError("room_not_found")
-
-        user = await self.u_repo.get(user_id)  # было: self.user_repo
-        if not user:
-            raise ValueError("user_not_found")
-
+    def _check_access(self, room, user_id: int, invite_key: str | None) -> bool:
+        """Проверить право входа; вернуть True, если пользователь — создатель комнаты."""
         # ПРОВЕРЯЕМ, ЯВЛЯЕТСЯ ЛИ ПОЛЬЗОВАТЕЛЬ СОЗДАТЕЛЕМ КОМНАТЫ
         is_creator = room.created_by == user_id
 
@@ -39,33 +32,55 @@ class ParticipantService:
                 if not invite_key or invite_key != room.invite_key:
                     print(f"DEBUG: invalid invite - expected: {room.invite_key}, got: {invite_key}")
                     raise ValueError("invite_required_or_invalid")
+        return is_creator
+
+    async def _join(self, room_slug: str, user_id: int, invite_key: str | None):
+        # комната, пользователь, активное членство и позиция журнала — одним SELECT
+        room, user_exists, existing, last_seq = await self.m_repo.get_join_context(
+            room_slug=room_slug, user_id=user_id
+        )
+        if not room:
+            raise ValueError("room_not_found")
+        if not user_exists:
+            raise ValueError("user_not_found")
+
+        is_creator = self._check_access(room, user_id, invite_key)
 
-        # Проверяем, не присоединен ли уже пользователь
-        existing = await self.m_repo.get_active(room_id=room.id, user_id=user_id)  # было: self.membership_repo
         if existing:
             # Обновляем last_seen если уже присоединен
             existing.last_seen = datetime.utcnow()
-            # Используем session из репозитория для flush
-            await self.m_repo.session.flush()  # было: self.db
-            await self.m_repo.session.refresh(existing)
-            return existing
+            await self.m_repo.session.flush()
+            await self.m_repo.sync_presence(existing)
+            return room, existing, last_seq
 
-        # Создаем новое членство
-        membership = Membership(
+        # Создаем новое членство (и запись в живом составе)
+        membership = await self.m_repo.create_active(
             room_id=room.id,
             user_id=user_id,
             role="owner" if is_creator else "participant",  # Создатель становится owner
-            status="active",
-            last_seen=datetime.utcnow(),
         )
 
-        self.m_repo.session.add(membership)  # было: self.db
-        await self.m_repo.session.flush()    # было: self.db
-        await self.m_repo.session.refresh(membership)  # было: self.db
-
         print(f"DEBUG: user {user_id} joined room {room_slug} as {membership.role}")
+        return room, membership, last_seq
+
+    async def join(self, room_slug: str, user_id: int, invite_key: str | None = None) -> Membership:
+        _, membership, _ = await self._join(room_slug, user_id, invite_key)
         return membership
 
+    async def join_bundle(self, *, room_slug: str, user_id: int, invite_key: str | None = None) -> dict:
+        """
+        Вход в комнату для WS: членство плюс всё, что клиенту нужно сразу после входа
+        (комната, ростер, позиция синхронизации), без повторных запросов.
+        """
+        room, membership, last_seq = await self._join(room_slug, user_id, invite_key)
+        live = await self.m_repo.list_active(room_id=room.id)
+        return {
+            "room": room,
+            "membership": membership,
+            "participants": self._roster(room, live),
+            "next_seq": last_seq + 1,
+        }
+
     async def leave(self, *, room_slug: str, user_id: int) -> Membership | None:
         room = await self.r_repo.get_by_slug(room_slug)
         if not room:
@@ -78,25 +93,31 @@ class ParticipantService:
             return None
         return await self.m_repo.heartbeat(room_id=room.id, user_id=user_id)
 
-    async def list(self, *, room_slug: str) -> list[dict]:
-        room = await self.r_repo.get_by_slug(room_slug)
-        if not room:
-            raise ValueError("room_not_found")
-        ms = await self.m_repo.list_by_room(room_id=room.id)
+    @staticmethod
+    def _roster(room, live: list[dict]) -> list[dict]:
+        ttl = timedelta(seconds=ONLINE_TTL_SECONDS)
         now = datetime.utcnow()
         res: list[dict] = []
-        for m in ms:
-            is_online = (m.status == "active") and (now - m.last_seen <= timedelta(seconds=ONLINE_TTL_SECONDS))
+        for e in live:
+            is_online = now - e["last_seen"] <= ttl
             res.append({
-                "membership_id": m.id,
+                "membership_id": e["membership_id"],
                 "room_slug": room.slug,
-                "user_id": m.user_id,
-                "role": m.role,
-                "status": m.status if is_online else "left" if m.status == "left" else "offline",
-                "last_seen": m.last_seen,
+                "user_id": e["user_id"],
+                "role": e["role"],
+                "status": "active" if is_online else "offline",
+                "last_seen": e["last_seen"],
                 "is_online": is_online,
-                "mic_muted": m.mic_muted,
-                "cam_off": m.cam_off,
-                "hand_raised": m.hand_raised,
+                "mic_muted": e["mic_muted"],
+                "cam_off": e["cam_off"],
+                "hand_raised": e["hand_raised"],
             })
-        return res
\ No newline at end of file
+        return res
+
+    async def list(self, *, room_slug: str) -> list[dict]:
+        room = await self.r_repo.get_by_slug(room_slug)
+        if not room:
+            raise ValueError("room_not_found")
+        # ростер берём из живого состава, история членств сюда не попадает
+        live = await self.m_repo.list_active(room_id=room.id)
+        return self._roster(room, live)
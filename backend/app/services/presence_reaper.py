@@ -0,0 +1,113 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.room import Room
+from app.repositories import presence_repo
+from app.repositories.membership_repo import MembershipRepository
+from app.repositories.event_repo import EventRepository
+from app.services.ws_hub import HUB, WsHub
+
+log = logging.getLogger(__name__)
+
+
+class PresenceReaper:
+    """
+    Фоновая уборка «зависших» участников: сокет умер без _cleanup_connection
+    (краш, kill воркера), а членство осталось active. Кандидатов отдаёт колесо
+    presence_repo.TRACKER, закрытие — пачками: один UPDATE membership, один DELETE
+    presence и одна вставка событий member.left на пачку.
+    """
+
+    def __init__(self, session_factory=SessionLocal, hub: WsHub = HUB,
+                 tick_seconds: float = settings.presence_tick_seconds,
+                 batch_size: int = settings.presence_reap_batch):
+        self.session_factory = session_factory
+        self.hub = hub
+        self.tick_seconds = tick_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def reap_once(self, now: Optional[float] = None) -> int:
+        """Закрыть истёкших участников, вернуть число закрытых членств."""
+        expired: List[Tuple[int, int]] = presence_repo.TRACKER.advance(now)
+        if not expired:
+            return 0
+        reaped = 0
+        for i in range(0, len(expired), self.batch_size):
+            chunk = expired[i:i + self.batch_size]
+            try:
+                reaped += await self._reap_batch(chunk)
+            except Exception:
+                # колесо их уже отдало — вернём, чтобы не потерять до следующей попытки
+                for key in chunk:
+                    presence_repo.TRACKER.touch(key)
+                raise
+        return reaped
+
+    async def _reap_batch(self, keys: List[Tuple[int, int]]) -> int:
+        async with self.session_factory() as session:
+            q = await session.execute(
+                select(Room.id, Room.slug).where(Room.id.in_({room_id for room_id, _ in keys}))
+            )
+            slugs: Dict[int, str] = dict(q.all())
+
+            batch = []
+            for room_id, user_id in keys:
+                slug = slugs.get(room_id)
+                # сокет жив (клиент просто молчит) — продлеваем, не выкидываем;
+                # вернулся, пока мы ждали БД, — в колесе уже новый дедлайн
+                if slug and self.hub.is_connected(slug, user_id):
+                    presence_repo.TRACKER.touch((room_id, user_id))
+                    continue
+                if (room_id, user_id) in presence_repo.TRACKER:
+                    continue
+                batch.append((room_id, user_id))
+            if not batch:
+                return 0
+
+            mrepo = MembershipRepository(session)
+            closed = await mrepo.mark_left_many(batch, when=datetime.utcnow())
+            events = await EventRepository(session).append_many([
+                (room_id, "member.left", json.dumps({"user_id": user_id, "reason": "timeout"}))
+                for room_id, user_id in batch if room_id in slugs
+            ])
+            await session.commit()
+
+        for ev in events:
+            payload = json.loads(ev.payload)
+            await self.hub.broadcast(slugs[ev.room_id], {"type": "member.left", "seq": ev.id, **payload})
+        return closed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                n = await self.reap_once()
+                if n:
+                    log.info("presence reaper: closed %d stale memberships", n)
+            except Exception:
+                # уборка не должна ронять процесс — повторим на следующем тике
+                log.exception("presence reaper failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="presence-reaper")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+REAPER = PresenceReaper()
@@ -1,14 +1,28 @@
+import secrets
+import time
+from datetime import datetime
 from pathlib import Path
-import shutil
-from typing import Sequence, Optional
+from typing import AsyncIterator, List, Sequence, Optional, Tuple
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.metrics import metrics_service
+from app.services.uploads import safe_filename, allocate, write_stream_at, coverage, file_digest
+from app.services.blobs import BlobStore, is_blob
 from app.repositories.room_repo import RoomRepository
 from app.repositories.recording_repo import RecordingRepository
 from app.repositories.membership_repo import MembershipRepository
+from app.repositories.upload_repo import UploadRepository
+from app.repositories.blob_repo import BlobRepository
 
 class RecordingService:
-    def __init__(self, rrepo: RoomRepository, mrepo: MembershipRepository, rec_repo: RecordingRepository):
+    def __init__(self, rrepo: RoomRepository, mrepo: MembershipRepository, rec_repo: RecordingRepository,
+                 up_repo: UploadRepository | None = None):
         self.rrepo = rrepo; self.mrepo = mrepo; self.rec_repo = rec_repo
+        self.up_repo = up_repo or UploadRepository(rec_repo.session)
+        self.blobs = BlobStore(BlobRepository(rec_repo.session))
         self.base_dir = Path("static/records")
+        self.tmp_dir = Path(settings.upload_tmp_dir)
 
     async def _room(self, slug: str):
         room = await self.rrepo.get_by_slug(slug)
@@ -23,26 +37,164 @@ class RecordingService:
         m = await self.mrepo.get_active(room_id=room_id, user_id=user_id)
         return bool(m and m.role in ("owner", "admin"))
 
-    async def save_file(self, *, room_slug: str, uploader_user_id: int, filename: str, file_obj, title: str, duration_sec: int | None) -> dict:
+    async def save_file(self, *, room_slug: str, uploader_user_id: int, file: UploadFile, title: str, duration_sec: int | None) -> dict:
         room = await self._room(room_slug)
         if not await self.can_upload(room.id, uploader_user_id):
             raise PermissionError("forbidden")
-        target_dir = self.base_dir / room.slug
-        target_dir.mkdir(parents=True, exist_ok=True)
-        dest = target_dir / filename
-        with dest.open("wb") as out:
-            shutil.copyfileobj(file_obj, out)
-        file_url = f"/static/records/{room.slug}/{dest.name}"
-        rec = await self.rec_repo.create(room_id=room.id, uploader_user_id=uploader_user_id, title=title, file_url=file_url, duration_sec=duration_sec)
-        return {"id": rec.id, "title": rec.title, "file_url": rec.file_url, "duration_sec": rec.duration_sec}
+        # файл в content-addressed хранилище: имя — sha256, повторная загрузка не дублирует байты
+        path, size, sha256 = await self.blobs.put_upload(
+            file, max_bytes=settings.upload_max_recording_mb * 1024 * 1024, kind="recording")
+        return await self._create_record(room, uploader_user_id, path, title, duration_sec, size, sha256)
+
+    async def _create_record(self, room, uploader_user_id: int, path: str, title: str, duration_sec: int | None,
+                             size_bytes: int, sha256: str) -> dict:
+        file_url = f"/{path}"
+        rec = await self.rec_repo.create(room_id=room.id, uploader_user_id=uploader_user_id, title=title, file_url=file_url,
+                                         duration_sec=duration_sec, size_bytes=size_bytes, sha256=sha256)
+        return self._out(room, rec)
+
+    @staticmethod
+    def _out(room, r) -> dict:
+        return {
+            "id": r.id,
+            "title": r.title,
+            "file_url": r.file_url,
+            "media_url": f"/api/recordings/{room.slug}/{r.id}/media",
+            "duration_sec": r.duration_sec,
+            "size_bytes": r.size_bytes,
+        }
+
+    # --- возобновляемая загрузка: create -> PUT кусков по offset -> complete ---
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.tmp_dir / f"{upload_id}.part"
+
+    async def _upload(self, room_slug: str, upload_id: str, user_id: int):
+        room = await self._room(room_slug)
+        up = await self.up_repo.get(upload_id)
+        if not up or up.room_id != room.id:
+            raise ValueError("upload_not_found")
+        if up.uploader_user_id != user_id:
+            raise PermissionError("forbidden")
+        return room, up
+
+    async def _status(self, up) -> dict:
+        chunks = await self.up_repo.list_chunks(up.id)
+        offset, received, missing = coverage(((c.offset, c.length) for c in chunks), up.total_size)
+        return {
+            "upload_id": up.id,
+            "size": up.total_size,
+            "offset": offset,
+            "received": received,
+            "missing": missing,
+            "chunk_size": settings.upload_resumable_chunk_mb * 1024 * 1024,
+            "complete": not missing,
+        }
+
+    async def create_upload(self, *, room_slug: str, uploader_user_id: int, filename: str, size: int,
+                            title: str, duration_sec: int | None) -> dict:
+        room = await self._room(room_slug)
+        if not await self.can_upload(room.id, uploader_user_id):
+            raise PermissionError("forbidden")
+        if size > settings.upload_max_recording_mb * 1024 * 1024:
+            raise ValueError("file_too_large")
+        upload_id = secrets.token_hex(16)
+        await run_in_threadpool(allocate, self._part_path(upload_id), size)
+        up = await self.up_repo.create(
+            upload_id=upload_id, room_id=room.id, uploader_user_id=uploader_user_id,
+            filename=safe_filename(filename, default="recording"), title=title,
+            duration_sec=duration_sec, total_size=size,
+        )
+        return await self._status(up)
+
+    async def put_chunk(self, *, room_slug: str, upload_id: str, user_id: int, offset: int,
+                        length: int | None, body: AsyncIterator[bytes]) -> dict:
+        """
+        Принять кусок [offset, offset + length). Кусок засчитывается, только если
+        тело дошло целиком; оборванный запрос клиент просто повторяет с тем же offset.
+        """
+        _, up = await self._upload(room_slug, upload_id, user_id)
+        if offset < 0 or offset >= up.total_size:
+            raise ValueError("chunk_out_of_range")
+        max_len = up.total_size - offset
+        if length is not None and (length <= 0 or length > max_len):
+            raise ValueError("chunk_out_of_range")
+        started = time.perf_counter()
+        written = await write_stream_at(self._part_path(up.id), offset, body, length or max_len)
+        if length is not None and written != length:
+            raise ValueError("chunk_incomplete")
+        if written:
+            await self.up_repo.add_chunk(upload_id=up.id, offset=offset, length=written)
+            metrics_service.record_upload("recording_chunk", written, time.perf_counter() - started)
+        up.updated_at = datetime.utcnow()
+        return await self._status(up)
+
+    async def upload_status(self, *, room_slug: str, upload_id: str, user_id: int) -> dict:
+        _, up = await self._upload(room_slug, upload_id, user_id)
+        return await self._status(up)
+
+    async def complete_upload(self, *, room_slug: str, upload_id: str, user_id: int) -> dict:
+        room, up = await self._upload(room_slug, upload_id, user_id)
+        status = await self._status(up)
+        if not status["complete"]:
+            raise ValueError("upload_incomplete")
+        # сначала забираем сессию: из двух параллельных complete .part переносит
+        # только тот, чей DELETE удалил строку, второй получает upload_not_found
+        if not await self.up_repo.delete(up.id):
+            raise ValueError("upload_not_found")
+        # куски приходили в произвольном порядке — хэш считаем по собранному файлу;
+        # upload_tmp_dir на том же томе, что и static, поэтому переезд — это rename
+        try:
+            path, size, sha256 = await self.blobs.adopt(self._part_path(up.id), filename=up.filename)
+        except FileNotFoundError:
+            # .part уже перенесён (откатившийся complete) или удалён сборщиком
+            raise ValueError("upload_part_missing")
+        return await self._create_record(room, up.uploader_user_id, path, up.title, up.duration_sec, size, sha256)
+
+    async def abort_upload(self, *, room_slug: str, upload_id: str, user_id: int) -> bool:
+        _, up = await self._upload(room_slug, upload_id, user_id)
+        await self.up_repo.delete(up.id)
+        self._part_path(up.id).unlink(missing_ok=True)
+        return True
 
     async def list(self, *, room_slug: str, limit: int = 100) -> list[dict]:
         room = await self._room(room_slug)
         items = await self.rec_repo.list_for_room(room_id=room.id, limit=limit)
-        return [{"id": r.id, "title": r.title, "file_url": r.file_url, "duration_sec": r.duration_sec, "created_at": r.created_at.isoformat()+"Z"} for r in items]
+        return [{**self._out(room, r), "created_at": r.created_at.isoformat()+"Z"} for r in items]
+
+    async def media_file(self, *, room_slug: str, rec_id: int):
+        """Файл записи для раздачи: (путь, запись). sha256 старых записей досчитывается один раз."""
+        room = await self._room(room_slug)
+        rec = await self.rec_repo.get(rec_id=rec_id)
+        if not rec or rec.room_id != room.id:
+            raise ValueError("recording_not_found")
+        path = self._file_path(room, rec)
+        if path is None:
+            raise ValueError("recording_not_found")
+        if not path.is_file():
+            raise ValueError("recording_file_missing")
+        if not rec.sha256:
+            rec.size_bytes, rec.sha256 = await run_in_threadpool(file_digest, path)
+        return path, rec
+
+    def _file_path(self, room, rec) -> Optional[Path]:
+        """Путь файла записи: блоб хранилища или (старые записи) static/records/<slug>/."""
+        path = Path(rec.file_url.lstrip("/"))
+        if is_blob(path) and ".." not in path.parts:
+            return path
+        prefix = f"/static/records/{room.slug}/"
+        if rec.file_url.startswith(prefix):
+            return self.base_dir / room.slug / safe_filename(rec.file_url[len(prefix):])
+        return None
 
-    async def delete(self, *, room_slug: str, rec_id: int, actor_user_id: int) -> bool:
+    async def delete(self, *, room_slug: str, rec_id: int, actor_user_id: int) -> Tuple[bool, List[Path]]:
+        """(удалена ли запись, файлы для discard после коммита)."""
         room = await self._room(room_slug)
         if not await self.can_delete(room.id, actor_user_id):
             raise PermissionError("forbidden")
-        return await self.rec_repo.delete(rec_id=rec_id)
+        rec = await self.rec_repo.get(rec_id=rec_id)
+        if not rec or rec.room_id != room.id:
+            return False, []
+        path = self._file_path(room, rec)
+        stale = await self.blobs.release(rec.sha256, path.as_posix() if path else None)
+        return await self.rec_repo.delete(rec_id=rec_id), stale
@@ -0,0 +1,118 @@
+import heapq
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+class RoomActivity:
+    """
+    Активность комнат для метрик с ограниченной памятью.
+
+    Комнаты лежат в OrderedDict в порядке последней активности: простаивающие
+    дольше ttl (или лишние сверх max_rooms) снимаются с головы — O(1) на
+    событие, без обходов. Второй такой же порядок по окну active_window даёт
+    число активных комнат без перебора. Топ-K по сообщениям поддерживается
+    при каждом событии за O(K); пересчитывается целиком, только если из топа
+    вытеснили простаивающую комнату.
+    """
+
+    def __init__(self, ttl_seconds: int = settings.metrics_room_ttl_seconds,
+                 max_rooms: int = settings.metrics_max_rooms,
+                 top_k: int = settings.metrics_top_rooms,
+                 active_window_seconds: int = 300, clock=time.time):
+        self.ttl = ttl_seconds
+        self.max_rooms = max_rooms
+        self.top_k = top_k
+        self.active_window = active_window_seconds
+        self.clock = clock
+        self._rooms: "OrderedDict[str, dict]" = OrderedDict()
+        self._active: "OrderedDict[str, float]" = OrderedDict()  # slug -> last_activity в окне
+        self._top: Dict[str, int] = {}  # slug -> messages
+        self._top_stale = False
+
+    def __len__(self) -> int:
+        self._expire(self.clock())
+        return len(self._rooms)
+
+    def _expire(self, now: float) -> None:
+        rooms, active = self._rooms, self._active
+        while rooms:
+            slug, r = next(iter(rooms.items()))
+            if r['last_activity'] > now - self.ttl and len(rooms) <= self.max_rooms:
+                break
+            rooms.popitem(last=False)
+            active.pop(slug, None)
+            if self._top.pop(slug, None) is not None:
+                self._top_stale = True
+        while active:
+            slug, ts = next(iter(active.items()))
+            if ts > now - self.active_window:
+                break
+            active.popitem(last=False)
+
+    def _offer_top(self, slug: str, messages: int) -> None:
+        top = self._top
+        if slug in top:
+            top[slug] = messages
+        elif self._top_stale:
+            return  # топ всё равно пересоберём при чтении
+        elif len(top) < self.top_k:
+            top[slug] = messages
+        else:
+            low = min(top, key=top.get)
+            if messages > top[low]:
+                del top[low]
+                top[slug] = messages
+
+    def _touch(self, slug: str) -> dict:
+        now = self.clock()
+        r = self._rooms.get(slug)
+        if r is None:
+            r = self._rooms[slug] = {
+                'messages': 0, 'participants': 0, 'peak_participants': 0,
+                'media_streams': 0, 'last_activity': now,
+            }
+        else:
+            self._rooms.move_to_end(slug)
+            r['last_activity'] = now
+        self._active[slug] = now
+        self._active.move_to_end(slug)
+        self._expire(now)
+        return r
+
+    def message(self, slug: str) -> None:
+        r = self._touch(slug)
+        r['messages'] += 1
+        self._offer_top(slug, r['messages'])
+
+    def participants(self, slug: str, count: int) -> None:
+        r = self._touch(slug)
+        r['participants'] = count
+        r['peak_participants'] = max(r['peak_participants'], count)
+        self._offer_top(slug, r['messages'])
+
+    def media_streams(self, slug: str, count: int) -> None:
+        r = self._touch(slug)
+        r['media_streams'] = count
+        self._offer_top(slug, r['messages'])
+
+    def get(self, slug: str) -> Optional[dict]:
+        self._expire(self.clock())
+        return self._rooms.get(slug)
+
+    def active_count(self) -> int:
+        """Комнаты с активностью за последние active_window секунд."""
+        self._expire(self.clock())
+        return len(self._active)
+
+    def top(self) -> List[Tuple[str, dict]]:
+        """До top_k комнат по числу сообщений среди не вытесненных."""
+        self._expire(self.clock())
+        if self._top_stale:
+            best = heapq.nlargest(self.top_k, self._rooms.items(), key=lambda kv: kv[1]['messages'])
+            self._top = {slug: r['messages'] for slug, r in best}
+            self._top_stale = False
+        return sorted(((slug, self._rooms[slug]) for slug in self._top),
+                      key=lambda kv: kv[1]['messages'], reverse=True)
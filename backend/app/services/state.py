@@ -11,10 +11,13 @@ class StateService:
         room = await self.rrepo.get_by_slug(room_slug)
         if not room:
             raise ValueError("room_not_found")
+        return await self.snapshot_for(room)
 
-        # соберём счётчики рук (если используешь их в UI)
-        members = await self.mrepo.list_by_room(room_id=room.id, limit=500)
-        hands_up = [m.user_id for m in members if m.hand_raised]
+    async def snapshot_for(self, room) -> Dict[str, Any]:
+        """Снимок по уже загруженной комнате: руки и онлайн — из живого состава, без SQL."""
+        # соберём счётчики рук (если используешь их в UI) — из живого состава, без истории
+        hands_up = await self.mrepo.hands_up(room_id=room.id)
+        online_count = await self.mrepo.count_active(room_id=room.id)
 
         return {
             "room_slug": room.slug,
@@ -24,6 +27,7 @@ class StateService:
             # NEW:
             "recording_active": bool(room.recording_active),
             "hands_up": hands_up,
+            "online_count": online_count,
         }
 
     async def set_topic(self, room_slug: str, topic: str | None) -> Dict[str, Any]:
@@ -17,8 +17,11 @@ class SyncService:
 
     async def append(self, *, room_slug: str, type_: str, payload: dict) -> EventLog:
         room_id = await self._room_id(room_slug)
-        ev = await self.e_repo.append(room_id=room_id, type_=type_, payload_json=json.dumps(payload, ensure_ascii=False))
-        return ev
+        return await self.append_for_room(room_id=room_id, type_=type_, payload=payload)
+
+    async def append_for_room(self, *, room_id: int, type_: str, payload: dict) -> EventLog:
+        """То же, что append, когда комната уже загружена (без повторного get_by_slug)."""
+        return await self.e_repo.append(room_id=room_id, type_=type_, payload_json=json.dumps(payload, ensure_ascii=False))
 
     async def list_after(self, *, room_slug: str, after_seq: int, limit: int = 200) -> list[dict]:
         room_id = await self._room_id(room_slug)
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+import psutil
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+
+class SystemSampler:
+    """
+    Фоновый сбор CPU/памяти процесса и системы раз в interval секунд в кольцо
+    последних history замеров. Эндпоинты метрик читают готовый замер и не
+    трогают psutil. Объект Process живёт всё время: cpu_percent(None) считает
+    загрузку с прошлого вызова, на новом объекте он всегда возвращает 0.
+    """
+
+    def __init__(self, interval_seconds: float = settings.metrics_sample_interval_seconds,
+                 history: int = settings.metrics_sample_history, clock=time.time):
+        self.interval_seconds = interval_seconds
+        self.clock = clock
+        self._process = psutil.Process(os.getpid())
+        self._samples: Deque[dict] = deque(maxlen=history)
+        self._task: Optional[asyncio.Task] = None
+        # первый вызов cpu_percent только запоминает точку отсчёта
+        self._process.cpu_percent(None)
+        psutil.cpu_percent(None)
+
+    def sample(self) -> dict:
+        """Снять замер и положить в кольцо."""
+        p = self._process
+        with p.oneshot():
+            cpu = p.cpu_percent(None)
+            rss = p.memory_info().rss
+            threads = p.num_threads()
+            fds = p.num_fds() if hasattr(p, "num_fds") else 0
+        vm = psutil.virtual_memory()
+        s = {
+            "ts": self.clock(),
+            "process_cpu_percent": cpu,
+            "process_memory_mb": rss / 1024 / 1024,
+            "process_threads": threads,
+            "process_open_fds": fds,
+            "system_cpu_percent": psutil.cpu_percent(None),
+            "system_memory_percent": vm.percent,
+            "system_memory_available_gb": vm.available / 1024 / 1024 / 1024,
+        }
+        self._samples.append(s)
+        return s
+
+    def latest(self) -> dict:
+        """Последний замер; до запуска фоновой задачи снимается по требованию."""
+        return self._samples[-1] if self._samples else self.sample()
+
+    def history(self, seconds: Optional[float] = None) -> List[dict]:
+        if seconds is None:
+            return list(self._samples)
+        since = self.clock() - seconds
+        return [s for s in self._samples if s["ts"] >= since]
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except Exception:
+                log.exception("system sampler failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="system-sampler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+SAMPLER = SystemSampler()
@@ -0,0 +1,65 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import decode_token
+from app.services.metrics import metrics_service
+
+
+class TokenVerifier:
+    """
+    Проверка JWT с LRU уже проверенных токенов: sha256(token) -> (user_id, exp).
+    После деплоя все клиенты переподключаются с теми же токенами — HMAC и разбор
+    JSON делаем один раз на токен, а не на каждое подключение. Запись живёт
+    не дольше exp самого токена; сам токен в памяти не хранится.
+    """
+
+    def __init__(self, maxsize: int = settings.auth_token_cache_size, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._items: "OrderedDict[bytes, Tuple[int, int]]" = OrderedDict()
+
+    def user_id(self, token: str) -> int:
+        """user_id из токена; ValueError — токен невалиден или истёк."""
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        hit = self._items.get(key)
+        if hit is not None:
+            uid, exp = hit
+            if exp > self.clock():
+                self._items.move_to_end(key)
+                metrics_service.record_token_check(cached=True, seconds=0.0, ok=True)
+                return uid
+            del self._items[key]
+
+        started = time.perf_counter()
+        try:
+            uid, exp = self._verify(token)
+        except Exception:
+            metrics_service.record_token_check(cached=False, seconds=time.perf_counter() - started, ok=False)
+            raise ValueError("invalid_token")
+        metrics_service.record_token_check(cached=False, seconds=time.perf_counter() - started, ok=True)
+        if exp is not None:
+            self._items[key] = (uid, exp)
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return uid
+
+    @staticmethod
+    def _verify(token: str) -> Tuple[int, Optional[int]]:
+        data = decode_token(token)
+        uid = data.get("uid")
+        if not isinstance(uid, int):
+            uid = int(str(uid))  # на всякий случай поддержим строку
+        exp = data.get("exp")
+        return uid, int(exp) if exp is not None else None  # без exp не кэшируем
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+TOKENS = TokenVerifier()
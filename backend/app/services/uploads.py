@@ -0,0 +1,157 @@
+import hashlib
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Iterable, List, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.metrics import metrics_service
+
+CHUNK_SIZE = settings.upload_chunk_kb * 1024
+
+
+def _copy_atomic(src: BinaryIO, dest: Path, max_bytes: int) -> Tuple[int, str]:
+    """
+    Скопировать поток в dest кусками по CHUNK_SIZE: пишем во временный файл рядом
+    с dest и переименовываем (os.replace атомарен в пределах каталога), так что
+    читатели никогда не видят недописанный файл. Попутно считаем sha256.
+    Выполняется в потоке.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{secrets.token_hex(4)}.part")
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        with tmp.open("wb") as out:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ValueError("file_too_large")
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return written, digest.hexdigest()
+
+
+async def save_upload(file: UploadFile, dest: Path, *, max_bytes: int, kind: str) -> Tuple[int, str]:
+    """
+    Сохранить загруженный файл в dest, не блокируя event loop.
+    ValueError("file_too_large") — если больше max_bytes (dest при этом не трогаем).
+    Возвращает (число записанных байт, sha256 содержимого).
+    """
+    # размер уже известен (multipart спулит тело во временный файл) — отказываем сразу
+    if file.size is not None and file.size > max_bytes:
+        metrics_service.increment_upload_rejected(kind)
+        raise ValueError("file_too_large")
+    started = time.perf_counter()
+    try:
+        await file.seek(0)
+        size, sha256 = await run_in_threadpool(_copy_atomic, file.file, dest, max_bytes)
+    except ValueError:
+        metrics_service.increment_upload_rejected(kind)
+        raise
+    metrics_service.record_upload(kind, size, time.perf_counter() - started)
+    return size, sha256
+
+
+def file_digest(path: Path) -> Tuple[int, str]:
+    """(размер, sha256) файла потоковым чтением — вызывать в потоке."""
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            digest.update(chunk)
+    return size, digest.hexdigest()
+
+
+def safe_filename(filename: str | None, default: str = "file") -> str:
+    """Имя файла от клиента без каталогов (../, абсолютные пути)."""
+    name = Path(filename or "").name.strip()
+    return name if name not in ("", ".", "..") else default
+
+
+# --- возобновляемые загрузки: куски пишутся сразу на своё место в .part-файле ---
+
+def allocate(path: Path, size: int) -> None:
+    """Создать файл нужного размера (разреженный там, где ФС умеет)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        f.truncate(size)
+
+
+def _write_at(f: BinaryIO, offset: int, data: bytes) -> None:
+    f.seek(offset)
+    f.write(data)
+
+
+def _sync_close(f: BinaryIO) -> None:
+    try:
+        f.flush()
+        os.fsync(f.fileno())
+    finally:
+        f.close()
+
+
+async def write_stream_at(path: Path, offset: int, stream: AsyncIterator[bytes], max_len: int) -> int:
+    """
+    Записать тело запроса в path начиная с offset, буферизуя до CHUNK_SIZE.
+    У каждого вызова свой дескриптор и своя позиция, поэтому параллельные
+    куски одного файла не мешают друг другу. Память — O(CHUNK_SIZE).
+    ValueError("chunk_out_of_range") — если тело длиннее max_len.
+    """
+    f = await run_in_threadpool(path.open, "r+b")
+    buf = bytearray()
+    pos = offset
+    written = 0
+    try:
+        async for piece in stream:
+            written += len(piece)
+            if written > max_len:
+                raise ValueError("chunk_out_of_range")
+            buf += piece
+            if len(buf) >= CHUNK_SIZE:
+                await run_in_threadpool(_write_at, f, pos, bytes(buf))
+                pos += len(buf)
+                buf.clear()
+        if buf:
+            await run_in_threadpool(_write_at, f, pos, bytes(buf))
+    finally:
+        await run_in_threadpool(_sync_close, f)
+    return written
+
+
+def coverage(chunks: Iterable[Tuple[int, int]], size: int) -> Tuple[int, int, List[Tuple[int, int]]]:
+    """
+    По принятым (offset, length) посчитать: сплошной префикс, сколько байт
+    принято всего и недостающие диапазоны [start, end).
+    """
+    received = 0
+    missing: List[Tuple[int, int]] = []
+    cursor = 0
+    for offset, length in sorted(chunks):
+        end = min(offset + length, size)
+        if offset > cursor:
+            missing.append((cursor, offset))
+        if end > cursor:
+            received += end - max(offset, cursor)
+            cursor = end
+    if cursor < size:
+        missing.append((cursor, size))
+    prefix = missing[0][0] if missing else size
+    return prefix, received, missing
@@ -1,21 +1,43 @@
 from __future__ import annotations
 import asyncio
-from typing import Dict, Set
+from typing import Dict, Optional, Set
 from fastapi import WebSocket
 
+
+class HubStats:
+    """
+    Счётчики хаба, которые ведутся при каждом add/remove/отправке. Всё в одном
+    потоке event loop, поэтому метрики читают их без блокировок хаба.
+    """
+    __slots__ = ("connections", "active_rooms", "send_failures")
+
+    def __init__(self) -> None:
+        self.connections = 0     # открытые сокеты во всех комнатах
+        self.active_rooms = 0    # комнаты хотя бы с одним сокетом
+        self.send_failures = 0   # неудачные send_json (клиент отвалился)
+
+
 class RoomHub:
     """Хранит WebSocket-подключения в одной комнате."""
-    def __init__(self) -> None:
+    def __init__(self, stats: Optional[HubStats] = None) -> None:
         self._lock = asyncio.Lock()
         self.members: Dict[int, WebSocket] = {}  # user_id -> ws
+        self.stats = stats or HubStats()
 
     async def add(self, user_id: int, ws: WebSocket) -> None:
         async with self._lock:
+            if user_id not in self.members:
+                self.stats.connections += 1
+                if not self.members:
+                    self.stats.active_rooms += 1
             self.members[user_id] = ws
 
     async def remove(self, user_id: int) -> None:
         async with self._lock:
-            self.members.pop(user_id, None)
+            if self.members.pop(user_id, None) is not None:
+                self.stats.connections -= 1
+                if not self.members:
+                    self.stats.active_rooms -= 1
 
     async def send_to(self, user_id: int, data: dict) -> None:
         ws = self.members.get(user_id)
@@ -25,6 +47,7 @@ class RoomHub:
             await ws.send_json(data)
         except Exception:
             # клиент мог отвалиться
+            self.stats.send_failures += 1
             await self.remove(user_id)
 
     async def broadcast(self, data: dict, exclude: Set[int] | None = None) -> None:
@@ -35,19 +58,21 @@ class RoomHub:
                     continue
                 targets.append(ws)
         # отправляем параллельно
-        await asyncio.gather(*[t.send_json(data) for t in targets], return_exceptions=True)
+        results = await asyncio.gather(*[t.send_json(data) for t in targets], return_exceptions=True)
+        self.stats.send_failures += sum(1 for r in results if isinstance(r, BaseException))
 
 class WsHub:
     """Держит хабы всех комнат, ленивая выдача."""
     def __init__(self) -> None:
         self._lock = asyncio.Lock()
         self.rooms: Dict[str, RoomHub] = {}
+        self.stats = HubStats()
 
     async def _get_room(self, room_slug: str) -> RoomHub:
         async with self._lock:
             hub = self.rooms.get(room_slug)
             if not hub:
-                hub = RoomHub()
+                hub = RoomHub(self.stats)
                 self.rooms[room_slug] = hub
             return hub
 
@@ -59,6 +84,27 @@ class WsHub:
         hub = await self._get_room(room_slug)
         await hub.remove(user_id)
 
+    def get_connection(self, room_slug: str, user_id: int) -> Optional[WebSocket]:
+        hub = self.rooms.get(room_slug)
+        return hub.members.get(user_id) if hub else None
+
+    def gauges(self) -> Dict[str, int]:
+        """Живые значения для метрик: O(1), без блокировок."""
+        return {
+            "connections": self.stats.connections,
+            "rooms": len(self.rooms),
+            "active_rooms": self.stats.active_rooms,
+            "send_failures": self.stats.send_failures,
+        }
+
+    def members_per_room(self) -> Dict[str, int]:
+        """Число сокетов по непустым комнатам (обход без блокировок — снимок между await)."""
+        return {slug: len(h.members) for slug, h in self.rooms.items() if h.members}
+
+    def is_connected(self, room_slug: str, user_id: int) -> bool:
+        hub = self.rooms.get(room_slug)
+        return bool(hub and user_id in hub.members)
+
     async def send_to(self, room_slug: str, to_user_id: int, data: dict) -> None:
         hub = await self._get_room(room_slug)
         await hub.send_to(to_user_id, data)
@@ -0,0 +1,54 @@
+import time
+from array import array
+from typing import Callable
+
+
+class RateCounter:
+    """
+    Счётчик событий за скользящее окно на кольце посекундных корзин.
+
+    В кольце хранится не число событий за секунду, а накопленный итог на конец
+    секунды, поэтому count(window) = total - cum[now - window] — O(1) для
+    любого окна до horizon, без обхода истории. add — O(1) амортизированно:
+    пропущенные секунды дозаполняются итогом при следующем обращении (не больше
+    размера кольца). Массив array('q') выделяется один раз, на событие
+    ничего не аллоцируется. Время — монотонное.
+    """
+
+    def __init__(self, horizon_seconds: int = 3600, clock: Callable[[], float] = time.monotonic):
+        if horizon_seconds <= 0:
+            raise ValueError("horizon_must_be_positive")
+        self.horizon = horizon_seconds
+        self.clock = clock
+        self._size = horizon_seconds + 1
+        self._cum = array("q", bytes(8 * self._size))
+        self._total = 0
+        self._sec = int(clock())
+
+    def _advance(self, sec: int) -> None:
+        if sec <= self._sec:
+            return
+        cum, size, total = self._cum, self._size, self._total
+        for s in range(max(self._sec + 1, sec - size + 1), sec + 1):
+            cum[s % size] = total
+        self._sec = sec
+
+    def add(self, n: int = 1) -> None:
+        sec = int(self.clock())
+        if sec != self._sec:
+            self._advance(sec)
+        self._total += n
+        self._cum[self._sec % self._size] = self._total
+
+    def count(self, window_seconds: int = 60) -> int:
+        """События за последние window_seconds секунд (включая текущую неполную)."""
+        self._advance(int(self.clock()))
+        w = min(max(int(window_seconds), 1), self.horizon)
+        return self._total - self._cum[(self._sec - w) % self._size]
+
+    def per_minute(self, window_seconds: int = 60) -> float:
+        return self.count(window_seconds) / (window_seconds / 60) if window_seconds > 0 else 0.0
+
+    @property
+    def total(self) -> int:
+        return self._total
@@ -0,0 +1,112 @@
+import math
+from typing import Dict, List
+
+
+class LogHistogram:
+    """
+    Потоковая гистограмма длительностей (секунды) с логарифмическими корзинами
+    в духе HDR: границы растут в growth раз, поэтому относительная ошибка
+    квантиля не больше ~(growth - 1) / 2 на всём диапазоне от min_value до
+    max_value. record — O(1), квантили — один проход по корзинам без
+    сортировки, гистограммы с одинаковыми параметрами складываются (merge).
+    Значения вне диапазона попадают в крайние корзины; min/max точные.
+    """
+
+    __slots__ = ("min_value", "max_value", "growth", "_log_growth", "counts",
+                 "count", "sum", "min", "max")
+
+    def __init__(self, min_value: float = 1e-6, max_value: float = 3600.0, growth: float = 1.04):
+        if not (0 < min_value < max_value) or growth <= 1:
+            raise ValueError("bad_histogram_params")
+        self.min_value = min_value
+        self.max_value = max_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        # [0] — меньше min_value, [-1] — больше max_value
+        n = math.ceil(math.log(max_value / min_value) / self._log_growth) + 2
+        self.counts: List[int] = [0] * n
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value < self.min_value:
+            return 0
+        return min(int(math.log(value / self.min_value) / self._log_growth) + 1, len(self.counts) - 1)
+
+    def _estimate(self, i: int) -> float:
+        if i == 0:
+            return self.min
+        if i == len(self.counts) - 1:
+            return self.max
+        # геометрическая середина корзины [min*g^(i-1), min*g^i)
+        mid = self.min_value * self.growth ** (i - 0.5)
+        return min(max(mid, self.min), self.max)
+
+    def record(self, value: float) -> None:
+        if value < 0:
+            value = 0.0
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantiles(self, *qs: float) -> List[float]:
+        """Квантили (0..1) за один проход; на пустой гистограмме — нули."""
+        if not self.count:
+            return [0.0] * len(qs)
+        order = sorted(range(len(qs)), key=lambda k: qs[k])
+        targets = [max(1, math.ceil(qs[k] * self.count)) for k in order]
+        out = [0.0] * len(qs)
+        seen, j = 0, 0
+        for i, c in enumerate(self.counts):
+            if not c:
+                continue
+            seen += c
+            while j < len(order) and seen >= targets[j]:
+                out[order[j]] = self._estimate(i)
+                j += 1
+            if j == len(order):
+                break
+        return out
+
+    def cumulative(self, bounds: List[float]) -> List[int]:
+        """
+        Накопленные счётчики для границ le (по возрастанию) — для экспорта в
+        Prometheus. Корзина, в которую попадает граница, считается целиком.
+        """
+        out: List[int] = []
+        seen, i = 0, 0
+        for b in bounds:
+            last = self._index(b)
+            while i <= last:
+                seen += self.counts[i]
+                i += 1
+            out.append(seen)
+        return out
+
+    def merge(self, other: "LogHistogram") -> None:
+        if (other.min_value, other.max_value, other.growth) != (self.min_value, self.max_value, self.growth):
+            raise ValueError("histogram_mismatch")
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def snapshot_ms(self) -> Dict[str, float]:
+        p50, p95, p99 = self.quantiles(0.5, 0.95, 0.99)
+        return {
+            "count": self.count,
+            "avg_ms": self.sum / self.count * 1000 if self.count else 0.0,
+            "p50_ms": p50 * 1000,
+            "p95_ms": p95 * 1000,
+            "p99_ms": p99 * 1000,
+            "max_ms": self.max * 1000,
+        }
@@ -0,0 +1,64 @@
+from typing import Dict, Iterable, List, Tuple
+
+from app.utils.histogram import LogHistogram
+
+# text exposition format 0.0.4 — понимают Prometheus, VictoriaMetrics и OpenMetrics-скрейперы
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы le для экспортируемых гистограмм (секунды). Внутренние корзины мельче;
+# наружу отдаём фиксированный набор, чтобы число серий не зависело от распределения.
+LATENCY_BOUNDS: List[float] = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+_LE = [repr(b) for b in LATENCY_BOUNDS]
+
+Labels = Dict[str, str]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def family(name: str, kind: str, help_: str, samples: Iterable[Tuple[Labels, float]]) -> str:
+    """Одно семейство counter/gauge одним куском текста."""
+    lines = [f"# HELP {name} {help_}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_labels(labels)} {_num(v)}" for labels, v in samples)
+    return "\n".join(lines) + "\n"
+
+
+# (семейство, метки) -> (count на момент рендера, текст серии): гистограммы,
+# в которые с прошлого скрейпа ничего не записали, заново не форматируются
+_rendered: Dict[Tuple[str, int, Tuple[Tuple[str, str], ...]], Tuple[int, str]] = {}
+
+
+def _histogram_series(name: str, labels: Labels, h: LogHistogram) -> str:
+    key = (name, id(h), tuple(labels.items()))
+    hit = _rendered.get(key)
+    if hit is not None and hit[0] == h.count:
+        return hit[1]
+    base = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+    sep = "," if base else ""
+    lines = [f'{name}_bucket{{{base}{sep}le="{le}"}} {c}'
+             for le, c in zip(_LE, h.cumulative(LATENCY_BOUNDS))]
+    lines.append(f'{name}_bucket{{{base}{sep}le="+Inf"}} {h.count}')
+    lines.append(f"{name}_sum{_labels(labels)} {h.sum!r}")
+    lines.append(f"{name}_count{_labels(labels)} {h.count}")
+    text = "\n".join(lines)
+    _rendered[key] = (h.count, text)
+    return text
+
+
+def histogram(name: str, help_: str, series: Iterable[Tuple[Labels, LogHistogram]]) -> str:
+    """Семейство histogram: _bucket по LATENCY_BOUNDS, _sum, _count."""
+    lines = [f"# HELP {name} {help_}", f"# TYPE {name} histogram"]
+    lines.extend(_histogram_series(name, labels, h) for labels, h in series)
+    return "\n".join(lines) + "\n"
+
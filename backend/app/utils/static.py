@@ -0,0 +1,12 @@
+from starlette.staticfiles import StaticFiles
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Статика с content-hashed именами: содержимое по URL не меняется, кэшируем навсегда."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE
+        return response
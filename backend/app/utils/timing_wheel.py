@@ -0,0 +1,77 @@
+import math
+import time
+from typing import Dict, Hashable, List, Optional
+
+
+class TimingWheel:
+    """
+    Колесо таймеров для истечения по неактивности.
+
+    touch/discard — O(1): ключ лежит в слоте своего дедлайна, перенос = удалить
+    из одного dict и положить в другой. advance проходит только слоты тиков,
+    прошедших с прошлого вызова, и отдаёт ключи с истёкшим дедлайном.
+    Время — wall clock (time.time()), чтобы можно было засеять колесо из last_seen в БД.
+    """
+
+    def __init__(self, timeout: float, tick: float = 1.0, now: Optional[float] = None):
+        if timeout <= 0 or tick <= 0:
+            raise ValueError("timeout_and_tick_must_be_positive")
+        self.tick = tick
+        self.timeout_ticks = max(1, math.ceil(timeout / tick))
+        # +1 слот: дедлайн «сейчас + timeout» никогда не попадает в текущий слот
+        self._slots: List[Dict[Hashable, int]] = [{} for _ in range(self.timeout_ticks + 1)]
+        self._where: Dict[Hashable, int] = {}  # ключ -> индекс слота
+        self._cursor = self._tick_of(time.time() if now is None else now)
+
+    def _tick_of(self, t: float) -> int:
+        return int(t // self.tick)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def clear(self, now: Optional[float] = None) -> None:
+        for slot in self._slots:
+            slot.clear()
+        self._where.clear()
+        self._cursor = self._tick_of(time.time() if now is None else now)
+
+    def touch(self, key: Hashable, now: Optional[float] = None) -> None:
+        """Продлить ключ: дедлайн = now + timeout."""
+        t = self._tick_of(time.time() if now is None else now)
+        # засев «из прошлого» (или отставший курсор) — истечёт на ближайшем advance
+        deadline = max(t + self.timeout_ticks, self._cursor + 1)
+        idx = deadline % len(self._slots)
+        old = self._where.get(key)
+        if old is not None and old != idx:
+            self._slots[old].pop(key, None)
+        self._slots[idx][key] = deadline
+        self._where[key] = idx
+
+    def discard(self, key: Hashable) -> None:
+        idx = self._where.pop(key, None)
+        if idx is not None:
+            self._slots[idx].pop(key, None)
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """Сдвинуть курсор до now, вернуть (и забыть) истёкшие ключи."""
+        t = self._tick_of(time.time() if now is None else now)
+        if t <= self._cursor:
+            return []
+        expired: List[Hashable] = []
+        # дольше полного оборота не было вызовов — достаточно одного прохода по всем слотам
+        start = max(self._cursor + 1, t - len(self._slots) + 1)
+        for c in range(start, t + 1):
+            slot = self._slots[c % len(self._slots)]
+            if not slot:
+                continue
+            # в слоте могут лежать ключи следующего оборота — их оставляем
+            due = [k for k, deadline in slot.items() if deadline <= t]
+            for k in due:
+                del slot[k]
+                del self._where[k]
+            expired.extend(due)
+        self._cursor = t
+        return expired
@@ -0,0 +1,79 @@
+# bench/bench_http_middleware.py
+"""
+Накладные расходы метрик на HTTP-запрос: без middleware, прежний
+BaseHTTPMiddleware и текущий чистый ASGI MetricsMiddleware. Приложение
+вызывается напрямую через ASGI (без сети), так что видна только цена обёртки.
+
+Запуск: cd backend && python bench/bench_http_middleware.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app.middleware.metrics_middleware import MetricsMiddleware  # noqa: E402
+from app.services.metrics import metrics_service  # noqa: E402
+
+
+class OldMetricsMiddleware(BaseHTTPMiddleware):
+    """Как было до перехода на ASGI: только время ответа."""
+
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        metrics_service.record_response_time(time.time() - start_time)
+        return response
+
+
+def make_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+    if middleware:
+        app.add_middleware(middleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    return app
+
+
+async def run(app, n: int) -> float:
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/items/1", "raw_path": b"/items/1", "root_path": "",
+             "query_string": b"", "headers": [(b"host", b"bench")], "server": ("bench", 80),
+             "client": ("127.0.0.1", 1)}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # прогрев
+        await app(dict(scope), receive, send)
+    started = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / n
+
+
+def best_of(mw, n: int, repeat: int = 5) -> float:
+    return min(asyncio.run(run(make_app(mw), n)) for _ in range(repeat))
+
+
+def main():
+    n = 10_000
+    base = best_of(None, n)
+    for name, mw in (("no middleware", None), ("BaseHTTPMiddleware", OldMetricsMiddleware),
+                     ("ASGI MetricsMiddleware", MetricsMiddleware)):
+        per = base if mw is None else best_of(mw, n)
+        print(f"{name:<24} {per * 1e6:8.1f} us/request  (+{(per - base) * 1e6:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# bench/bench_rate_counter.py
+"""
+Микробенчмарк счётчиков скользящего окна: старая схема (deque кортежей
+(datetime, 1) и обход при каждом чтении) против RateCounter.
+
+Запуск: cd backend && python bench/bench_rate_counter.py
+"""
+import sys
+import timeit
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.counters import RateCounter  # noqa: E402
+
+
+def old_add(history: deque):
+    history.append((datetime.utcnow(), 1))
+
+
+def old_rate(history: deque, window_seconds: int = 60) -> float:
+    window_start = datetime.utcnow() - timedelta(seconds=window_seconds)
+    return sum(1 for ts, _ in history if ts >= window_start) / (window_seconds / 60)
+
+
+def main():
+    n = 200_000
+    history = deque(maxlen=3600)
+    counter = RateCounter(3600)
+    for _ in range(3600):
+        old_add(history)
+        counter.add()
+
+    rows = [
+        ("add, deque", timeit.timeit(lambda: old_add(history), number=n) / n),
+        ("add, RateCounter", timeit.timeit(counter.add, number=n) / n),
+        ("rate 60s, deque(3600)", timeit.timeit(lambda: old_rate(history), number=2000) / 2000),
+        ("rate 60s, RateCounter", timeit.timeit(lambda: counter.per_minute(60), number=n) / n),
+        ("rate 3600s, RateCounter", timeit.timeit(lambda: counter.per_minute(3600), number=n) / n),
+    ]
+    for name, sec in rows:
+        print(f"{name:<26} {sec * 1e9:>12.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# bench/ws_load.py
+"""
+Нагрузочный прогон WebSocket: создаёт комнаты и пользователей через REST,
+открывает rooms × users соединений к /ws/rooms/{slug} и гоняет смесь
+сообщений (chat.message, ice, offer/answer, chat.typing, media.self,
+hand.raise/lower) с пуассоновскими интервалами.
+
+Отчёт: пропускная способность, латентность присоединения, латентность
+доставки чата всем участникам (fan-out) и пересылки сигналинга, ошибки.
+--json сохраняет отчёт как baseline, --max-fanout-p95-ms / --max-error-rate
+завершают процесс с кодом 1 — для проверки регрессий в CI.
+
+Запуск (сервер уже поднят):
+  cd backend && uvicorn app.main:app --port 8090
+  python bench/ws_load.py --base http://127.0.0.1:8090 --rooms 10 --users 8 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.histogram import LogHistogram  # noqa: E402
+
+DEFAULT_MIX = "chat.message=30,ice=25,offer=5,answer=5,chat.typing=20,media.self=10,hand=5"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.join = LogHistogram()
+        self.fanout = LogHistogram()   # chat.message: отправка -> получение каждым участником
+        self.relay = LogHistogram()    # offer/answer/ice: отправка -> получение адресатом
+        self.sent: Counter = Counter()
+        self.received: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.connect_failed = 0
+        self.disconnected = 0
+
+
+class Client:
+    def __init__(self, stats: Stats, base_ws: str, slug: str, user_id: int, token: str) -> None:
+        self.stats = stats
+        self.url = f"{base_ws}/ws/rooms/{slug}?token={token}"
+        self.user_id = user_id
+        self.peers: List[int] = []
+        self.ws = None
+        self.hand_up = False
+
+    async def connect(self) -> bool:
+        started = time.perf_counter()
+        try:
+            self.ws = await websockets.connect(self.url, max_queue=None, open_timeout=30)
+            while True:
+                msg = json.loads(await asyncio.wait_for(self.ws.recv(), 30))
+                if msg.get("type") == "joined":
+                    self.stats.join.record(time.perf_counter() - started)
+                    return True
+                if msg.get("type") == "error":
+                    self.stats.errors[f"join:{msg.get('reason')}"] += 1
+                    return False
+        except Exception as e:
+            self.stats.errors[f"connect:{type(e).__name__}"] += 1
+            return False
+
+    def _message(self, kind: str) -> dict:
+        now = time.perf_counter()
+        if kind == "chat.message":
+            return {"type": "chat.message", "text": f"lg {now!r} {self.user_id}"}
+        if kind in ("ice", "offer", "answer"):
+            to = random.choice(self.peers) if self.peers else self.user_id
+            body = {"candidate": "candidate:0 1 UDP 2122252543 10.0.0.1 50000 typ host"} if kind == "ice" \
+                else {"sdp": "v=0\r\no=- 0 0 IN IP4 127.0.0.1\r\n" + "a=x\r\n" * 40}
+            return {"type": kind, "to": to, "t": now, **body}
+        if kind == "chat.typing":
+            return {"type": "chat.typing", "is_typing": random.random() < 0.5}
+        if kind == "media.self":
+            return {"type": "media.self", "mic_muted": random.random() < 0.5, "cam_off": random.random() < 0.3}
+        if kind == "hand":
+            self.hand_up = not self.hand_up
+            return {"type": "hand.raise" if self.hand_up else "hand.lower"}
+        raise ValueError(f"unknown message kind: {kind}")
+
+    async def send_loop(self, mix: Dict[str, float], rate: float, until: float) -> None:
+        kinds, weights = list(mix), list(mix.values())
+        while time.perf_counter() < until:
+            await asyncio.sleep(random.expovariate(rate))
+            msg = self._message(random.choices(kinds, weights)[0])
+            try:
+                await self.ws.send(json.dumps(msg))
+            except Exception:
+                self.stats.disconnected += 1
+                return
+            self.stats.sent[msg["type"]] += 1
+
+    async def recv_loop(self) -> None:
+        try:
+            async for raw in self.ws:
+                now = time.perf_counter()
+                msg = json.loads(raw)
+                mtype = msg.get("type")
+                self.stats.received[mtype] += 1
+                if mtype == "chat.message":
+                    parts = str(msg.get("text", "")).split(" ")
+                    if len(parts) == 3 and parts[0] == "lg":
+                        self.stats.fanout.record(now - float(parts[1]))
+                elif mtype in ("ice", "offer", "answer") and isinstance(msg.get("t"), float):
+                    self.stats.relay.record(now - msg["t"])
+                elif mtype == "error":
+                    self.stats.errors[str(msg.get("reason"))] += 1
+        except websockets.ConnectionClosed:
+            pass
+
+    async def close(self) -> None:
+        if self.ws is not None:
+            await self.ws.close()
+
+
+async def setup(http: httpx.AsyncClient, rooms: int, users: int) -> List[dict]:
+    """Комнаты и пользователи с гостевыми токенами через REST."""
+    out = []
+    run = int(time.time())
+    for r in range(rooms):
+        room = (await http.post("/api/rooms", json={"title": f"load {run}-{r}"})).raise_for_status().json()
+        members = []
+        for u in range(users):
+            user = (await http.post("/api/users", json={"nickname": f"load{run}-{r}-{u}"})).raise_for_status().json()
+            tok = (await http.post("/api/auth/token/guest", json={"user_id": user["id"]})).raise_for_status().json()
+            members.append((user["id"], tok["access_token"]))
+        out.append({"slug": room["slug"], "members": members})
+    return out
+
+
+def summarize(stats: Stats, connections: int, seconds: float) -> dict:
+    def lat(h: LogHistogram) -> dict:
+        snap = h.snapshot_ms()
+        return {k: round(v, 2) if isinstance(v, float) else v for k, v in snap.items()}
+
+    sent = sum(stats.sent.values())
+    errors = sum(stats.errors.values()) + stats.connect_failed
+    return {
+        "connections": connections,
+        "connect_failed": stats.connect_failed,
+        "duration_s": round(seconds, 1),
+        "sent": dict(stats.sent),
+        "sent_per_s": round(sent / seconds, 1) if seconds else 0.0,
+        "received_per_s": round(sum(stats.received.values()) / seconds, 1) if seconds else 0.0,
+        "join": lat(stats.join),
+        "fanout_chat": lat(stats.fanout),
+        "relay_signaling": lat(stats.relay),
+        "errors": dict(stats.errors),
+        "error_rate": round(errors / max(sent + connections, 1), 4),
+        "disconnected": stats.disconnected,
+    }
+
+
+async def main(args) -> int:
+    mix = parse_mix(args.mix)
+    random.seed(args.seed)
+    base_ws = args.base.replace("http", "ws", 1)
+    stats = Stats()
+
+    async with httpx.AsyncClient(base_url=args.base, timeout=30) as http:
+        rooms = await setup(http, args.rooms, args.users)
+
+    clients = []
+    for room in rooms:
+        ids = [uid for uid, _ in room["members"]]
+        for uid, tok in room["members"]:
+            c = Client(stats, base_ws, room["slug"], uid, tok)
+            c.peers = [p for p in ids if p != uid]
+            clients.append(c)
+
+    # разгон: не больше connect_concurrency одновременных рукопожатий
+    sem = asyncio.Semaphore(args.connect_concurrency)
+
+    async def connect(c: Client) -> Optional[Client]:
+        async with sem:
+            return c if await c.connect() else None
+
+    connected = [c for c in await asyncio.gather(*(connect(c) for c in clients)) if c]
+    stats.connect_failed = len(clients) - len(connected)
+    print(f"connected {len(connected)}/{len(clients)}; join p95 {stats.join.snapshot_ms()['p95_ms']:.1f} ms",
+          file=sys.stderr)
+
+    started = time.perf_counter()
+    until = started + args.duration
+    receivers = [asyncio.create_task(c.recv_loop()) for c in connected]
+    await asyncio.gather(*(c.send_loop(mix, args.rate, until) for c in connected))
+    await asyncio.sleep(args.drain)  # догоняем доставку последних сообщений
+    elapsed = time.perf_counter() - started
+    for c in connected:
+        await c.close()
+    await asyncio.gather(*receivers, return_exceptions=True)
+
+    report = summarize(stats, len(clients), elapsed)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+    failed = False
+    if args.max_fanout_p95_ms is not None and report["fanout_chat"]["p95_ms"] > args.max_fanout_p95_ms:
+        print(f"FAIL: fan-out p95 {report['fanout_chat']['p95_ms']} ms > {args.max_fanout_p95_ms}", file=sys.stderr)
+        failed = True
+    if args.max_error_rate is not None and report["error_rate"] > args.max_error_rate:
+        print(f"FAIL: error rate {report['error_rate']} > {args.max_error_rate}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--base", default="http://127.0.0.1:8090")
+    p.add_argument("--rooms", type=int, default=5)
+    p.add_argument("--users", type=int, default=6, help="участников в каждой комнате")
+    p.add_argument("--duration", type=float, default=20.0, help="секунд нагрузки")
+    p.add_argument("--rate", type=float, default=2.0, help="сообщений в секунду на клиента")
+    p.add_argument("--mix", default=DEFAULT_MIX, help="веса типов: chat.message=30,ice=25,...")
+    p.add_argument("--connect-concurrency", type=int, default=50)
+    p.add_argument("--drain", type=float, default=2.0, help="секунд ожидания доставки после нагрузки")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--json", help="сохранить отчёт (baseline)")
+    p.add_argument("--max-fanout-p95-ms", type=float)
+    p.add_argument("--max-error-rate", type=float)
+    sys.exit(asyncio.run(main(p.parse_args())))
@@ -0,0 +1,137 @@
+# test_blob_store.py
+"""
+Content-addressed хранилище: одинаковые загрузки делят файл, ссылки
+считаются, сборщик удаляет блоб только после grace-периода без ссылок,
+а файлы без строки в БД — как сирот. Удаление пользователя отпускает аватар.
+
+Запуск: cd backend && python -m pytest -q test_blob_store.py
+"""
+import asyncio
+import hashlib
+import io
+import os
+import time
+from pathlib import Path
+
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.api import users as users_api
+from app.api.deps import get_db
+from app.db.schema import sync_schema
+from app.repositories.blob_repo import BlobRepository
+from app.repositories.user_repo import UserRepository
+from app.services.blobs import BlobStore, BlobCollector, blob_path
+
+
+def _upload(data: bytes, name: str) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=name, size=len(data))
+
+
+def test_dedup_refcount_and_gc(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = os.urandom(5000)
+    sha = hashlib.sha256(data).hexdigest()
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'b.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        gc = BlobCollector(session_factory=Session, grace_seconds=60)
+
+        async with Session() as s:
+            store = BlobStore(BlobRepository(s))
+            p1, _, _ = await store.put_upload(_upload(data, "a.webm"), max_bytes=10**6, kind="recording")
+            p2, _, _ = await store.put_upload(_upload(data, "b.WEBM"), max_bytes=10**6, kind="recording")
+            await s.commit()
+        assert p1 == p2 == blob_path(sha, ".webm").as_posix()
+        assert sorted(p.name for p in Path("static/blobs").rglob("*") if p.is_file()) == [f"{sha}.webm"]
+
+        async with Session() as s:
+            store = BlobStore(BlobRepository(s))
+            await store.release(sha, p1)
+            await s.commit()
+            assert (await BlobRepository(s).get(sha)).refcount == 1
+            await store.release(sha, p1)
+            await s.commit()
+
+        # ссылок нет, но grace-период не прошёл
+        assert await gc.collect_once() == 0 and Path(p1).exists()
+
+        # сирота: файл без строки (упавшая транзакция) и брошенный временный файл
+        orphan = blob_path("f" * 64, ".bin")
+        orphan.parent.mkdir(parents=True, exist_ok=True)
+        orphan.write_bytes(b"x")
+        removed = await gc.collect_once(now=time.time() + 120)
+
+        async with Session() as s:
+            gone = await BlobRepository(s).get(sha)
+        await engine.dispose()
+        return p1, orphan, removed, gone
+
+    path, orphan, removed, gone = asyncio.run(main())
+    assert removed == 2 and gone is None
+    assert not Path(path).exists() and not orphan.exists()
+
+
+def test_deleting_user_releases_avatar(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = os.urandom(3000)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'u.db'}")
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        async with Session() as s:
+            path, _, sha = await BlobStore(BlobRepository(s)).put_upload(
+                _upload(data, "me.png"), max_bytes=10**6, kind="avatar")
+            user = await UserRepository(s).create(nickname="gone")
+            user.avatar_sha256 = sha
+            await s.commit()
+            return user.id, path
+
+    uid, path = asyncio.run(setup())
+
+    async def override_db():
+        async with Session() as s:
+            yield s
+            await s.commit()
+
+    app = FastAPI()
+    app.include_router(users_api.router, prefix="/api/users")
+    app.dependency_overrides[get_db] = override_db
+    with TestClient(app) as c:
+        assert c.delete(f"/api/users/{uid}").status_code == 200
+
+    gc = BlobCollector(session_factory=Session, grace_seconds=60)
+    removed = asyncio.run(gc.collect_once(now=time.time() + 120))
+    asyncio.run(engine.dispose())
+    assert removed == 1 and not Path(path).exists()
+
+
+def test_adopted_blob_survives_sweep_before_commit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    part = tmp_path / "up.part"
+    part.write_bytes(os.urandom(2000))
+    old = time.time() - 7200
+    os.utime(part, (old, old))  # докачивалась пару часов
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'a.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        gc = BlobCollector(session_factory=Session, grace_seconds=60)
+        async with Session() as s:
+            path, _, _ = await BlobStore(BlobRepository(s)).adopt(part, filename="talk.webm")
+            # сборщик успевает между publish и commit вызывающего
+            swept = await gc._sweep_orphans(time.time() - 60)
+            await s.commit()
+        await engine.dispose()
+        return path, swept
+
+    path, swept = asyncio.run(main())
+    assert swept == 0 and Path(path).exists()
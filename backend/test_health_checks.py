@@ -0,0 +1,55 @@
+# test_health_checks.py
+"""
+Проверки здоровья: БД замеряется по-настоящему, занятая блокировка записи
+(общая для всех воркеров) даёт только warning, недоступная БД — not ready,
+результат берётся из кэша.
+
+Запуск: cd backend && python -m pytest -q test_health_checks.py
+"""
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.services.health import HealthMonitor
+from app.services.loop_monitor import LoopMonitor
+from app.services.metrics import MetricsService
+
+
+def test_db_probe_lock_wait_and_readiness(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "health_lock_fail_ms", 150)
+    monkeypatch.setattr(settings, "health_db_fail_ms", 100)  # таймаут пробы — 200 мс
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'h.db'}")
+        health = HealthMonitor(engine=engine, metrics=MetricsService(loop=LoopMonitor()),
+                               interval_seconds=60, records_dir=tmp_path)
+        assert health.readiness() == {"ready": False, "reason": "starting"}
+
+        ok = await health.check_once()
+        assert health.snapshot() is ok and health.readiness()["ready"]
+        db = ok["checks"]["database"]
+        assert db["status"] == "ok" and db["response_time_ms"] > 0 and db["write_lock_wait_ms"] is not None
+        assert ok["checks"]["disk"]["free_mb"] > 0
+
+        # чужой писатель держит блокировку — проба не дожидается, но воркер в ротации
+        async with engine.connect() as writer:
+            await writer.exec_driver_sql("BEGIN IMMEDIATE")
+            locked = await health.check_once()
+            await writer.exec_driver_sql("ROLLBACK")
+        locked_ready = health.readiness()
+        await engine.dispose()
+
+        # проба самого воркера не прошла (файл БД не открыть) — это уже fail
+        broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'h.db'}")
+        health.engine = broken
+        bad = await health.check_once()
+        await broken.dispose()
+        return locked, locked_ready, bad, health.readiness()
+
+    locked, locked_ready, bad, ready = asyncio.run(main())
+    db = locked["checks"]["database"]
+    assert db["write_lock_wait_ms"] is None and db["write_lock_status"] == "fail"
+    assert db["status"] == "warning" and locked["status"] == "degraded" and locked_ready["ready"]
+    assert bad["checks"]["database"]["status"] == "fail" and "error" in bad["checks"]["database"]
+    assert ready == {"ready": False, "reason": "failed_checks", "failed": ["database"]}
@@ -0,0 +1,88 @@
+# test_images.py
+"""
+Производные изображений: фиксированные размеры, WebP, имя с хэшем содержимого,
+устаревшими считаются только производные заменяемой строки (не соседние
+файлы параллельной загрузки того же владельца),
+битый файл — bad_image, переполненная очередь — ImagesBusy.
+
+Запуск: cd backend && python -m pytest -q test_images.py
+"""
+import asyncio
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from app.services.images import IMG_DIR, ImagePipeline, ImagesBusy, _render, stale_variants, variant_files
+
+
+def test_render_avatar_variants(tmp_path):
+    src = tmp_path / "a.jpg"
+    Image.new("RGB", (900, 600), (200, 30, 30)).save(src, "JPEG")
+    out = tmp_path / "out"
+    (out).mkdir()
+    neighbour = out / "user_10-64-0123456789abcdef.webp"
+    neighbour.write_bytes(b"other user")
+
+    names = _render(str(src), str(out), "user_1", (64, 128), True, 80, 10_000_000)
+
+    assert set(names) == {"64", "128"}
+    for size, name in names.items():
+        with Image.open(out / name) as im:
+            assert im.format == "WEBP" and im.size == (int(size), int(size))
+    assert neighbour.exists()
+
+    # то же содержимое — те же имена (URL стабилен, кэш браузера валиден)
+    assert _render(str(src), str(out), "user_1", (64, 128), True, 80, 10_000_000) == names
+
+
+def test_stale_variants_come_from_replaced_row(tmp_path):
+    out = tmp_path / "out"
+    urls = []
+    for i, color in enumerate([(255, 0, 0), (0, 255, 0), (0, 0, 255)]):
+        src = tmp_path / f"{i}.png"
+        Image.new("RGB", (300, 300), color).save(src, "PNG")
+        names = _render(str(src), str(out), "user_1", (64, 128), True, 80, 10_000_000)
+        urls.append({size: f"/{IMG_DIR.as_posix()}/avatars/{name}" for size, name in names.items()})
+    old, mine, concurrent = urls
+
+    # строка ссылалась на old; concurrent — файлы соседней загрузки, их не трогаем
+    stale = stale_variants(old, mine)
+    assert sorted(stale) == sorted(IMG_DIR / "avatars" / Path(u).name for u in old.values())
+    assert not {p.name for p in stale} & {Path(u).name for u in concurrent.values()}
+    # то же содержимое повторно — удалять нечего; чужие и внешние URL игнорируются
+    assert stale_variants(mine, mine) == []
+    assert stale_variants({"64": "https://cdn.example/a.webp", "128": "/static/img/../axenix.db"}) == []
+
+
+def test_render_cover_keeps_aspect_and_rejects_garbage(tmp_path):
+    src = tmp_path / "c.png"
+    Image.new("RGB", (2000, 1000), (0, 90, 200)).save(src, "PNG")
+    names = _render(str(src), str(tmp_path), "room", (480,), False, 80, 10_000_000)
+    with Image.open(tmp_path / names["480"]) as im:
+        assert im.size == (480, 240)
+
+    bad = tmp_path / "bad.jpg"
+    bad.write_bytes(b"not an image")
+    with pytest.raises(ValueError, match="bad_image"):
+        _render(str(bad), str(tmp_path), "room", (480,), False, 80, 10_000_000)
+
+
+def test_pipeline_rejects_when_queue_is_full(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = tmp_path / "a.png"
+    Image.new("RGB", (300, 300), (10, 10, 10)).save(src, "PNG")
+    pipeline = ImagePipeline(workers=1, max_pending=1)
+
+    async def main():
+        first = asyncio.ensure_future(pipeline.avatar(src, 1))
+        await asyncio.sleep(0)
+        with pytest.raises(ImagesBusy):
+            await pipeline.avatar(src, 2)
+        return await first, pipeline.pending
+
+    try:
+        variants, pending = asyncio.run(main())
+    finally:
+        pipeline.shutdown()
+    assert set(variants) == {"64", "128", "256"} and pending == 0
@@ -0,0 +1,60 @@
+# test_latency_histogram.py
+"""
+Логарифмическая гистограмма: квантили в пределах относительной ошибки корзины,
+слияние; middleware пишет латентность по шаблону маршрута, а не по сырому пути,
+и считает классы статусов и байты.
+
+Запуск: cd backend && python -m pytest -q test_latency_histogram.py
+"""
+import random
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.metrics_middleware import MetricsMiddleware
+from app.services.metrics import MetricsService
+from app.utils.histogram import LogHistogram
+
+
+def test_quantiles_within_bucket_error_and_merge():
+    rnd = random.Random(1)
+    values = [rnd.lognormvariate(-4, 1.2) for _ in range(20000)]
+    a, b = LogHistogram(), LogHistogram()
+    for i, v in enumerate(values):
+        (a if i % 2 else b).record(v)
+    a.merge(b)
+
+    exact = sorted(values)
+    for q, got in zip((0.5, 0.95, 0.99), a.quantiles(0.5, 0.95, 0.99)):
+        want = exact[int(q * len(exact)) - 1]
+        assert abs(got - want) / want < 0.04
+    assert a.count == len(values) and a.max == exact[-1]
+    assert LogHistogram().quantiles(0.5) == [0.0]
+
+
+def test_http_routes_and_ws_tracked_separately(monkeypatch):
+    svc = MetricsService()
+    monkeypatch.setattr("app.middleware.metrics_middleware.metrics_service", svc)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    c = TestClient(app)
+    for i in range(5):
+        c.get(f"/items/{i}")
+    c.get("/nope")
+    svc.record_ws_connection_duration(300.0)
+    svc.record_ws_message_time("chat.message", 0.002)
+
+    lat = svc.get_latency_metrics()
+    assert set(lat["http"]) == {"GET /items/{item_id}", "unmatched"}
+    assert lat["http"]["GET /items/{item_id}"]["count"] == 5
+    assert lat["ws"]["chat.message"]["count"] == 1
+    # длинные WS-сессии не портят p95 HTTP
+    assert svc.get_performance_metrics()["p95_response_time_ms"] < 1000
+    http = svc.get_http_metrics()
+    assert http["responses"]["2xx"] == 5 and http["responses"]["4xx"] == 1
+    assert http["in_flight"] == 0 and http["bytes_out"] > 0
@@ -0,0 +1,69 @@
+# test_login_throttle.py
+"""
+Вход: скользящее окно неудач на пару (аккаунт, IP) и попыток с IP (429 до bcrypt;
+чужой перебор не блокирует владельцу вход с его адреса),
+ограниченная очередь пула bcrypt (HasherBusy -> 503).
+
+Запуск: cd backend && python -m pytest -q test_login_throttle.py
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.core.security import HasherBusy, PasswordHasher
+from app.services.login_throttle import LoginThrottle
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_account_failures_block_until_window_passes():
+    clock = _Clock()
+    t = LoginThrottle(window_seconds=60, max_failures=3, max_attempts_ip=100, clock=clock)
+    for _ in range(3):
+        assert t.check(account="A@x.io", ip="1.1.1.1") is None
+        t.failure("a@x.io", "1.1.1.1")
+        clock.now += 10
+    assert t.check(account="a@x.io", ip="1.1.1.1") == 30       # первая неудача выйдет из окна через 30 с
+    assert t.check(account="a@x.io", ip="2.2.2.2") is None      # владелец со своего адреса входит
+    assert t.check(account="b@x.io", ip="1.1.1.1") is None      # другой аккаунт не задет
+    clock.now += 30
+    assert t.check(account="a@x.io", ip="1.1.1.1") is None
+    t.success("a@x.io", "1.1.1.1")
+    assert "acct:a@x.io|1.1.1.1" not in t._hits
+
+
+def test_ip_attempts_and_key_bound():
+    clock = _Clock()
+    t = LoginThrottle(window_seconds=60, max_failures=100, max_attempts_ip=2, max_keys=3, clock=clock)
+    assert t.check(account="u1", ip="9.9.9.9") is None
+    assert t.check(account="u2", ip="9.9.9.9") is None
+    assert t.check(account="u3", ip="9.9.9.9") == 60
+    for i in range(5):
+        t.failure(f"spray{i}", "9.9.9.9")
+    assert len(t._hits) == 3
+
+
+def test_hasher_rejects_when_queue_is_full():
+    hasher = PasswordHasher(workers=1, max_pending=2)
+
+    async def main():
+        slow = [asyncio.ensure_future(hasher._run(time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HasherBusy):
+            await hasher._run(time.sleep, 0)
+        # loop не заблокирован, пока пул занят
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lag = time.perf_counter() - started
+        await asyncio.gather(*slow)
+        return lag, hasher.pending
+
+    lag, pending = asyncio.run(main())
+    assert lag < 0.1 and pending == 0
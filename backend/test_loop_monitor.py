@@ -0,0 +1,35 @@
+# test_loop_monitor.py
+"""
+Монитор event loop: блокирующий вызов виден в гистограмме задержки,
+сторож снимает стек с виновником, health показывает деградацию.
+
+Запуск: cd backend && python -m pytest -q test_loop_monitor.py
+"""
+import asyncio
+import time
+
+from app.services.loop_monitor import LoopMonitor
+from app.services.metrics import MetricsService
+
+
+def _blocking_copy():
+    time.sleep(0.4)  # как синхронное копирование файла прямо в loop
+
+
+def test_stall_is_measured_and_attributed():
+    mon = LoopMonitor(interval_seconds=0.02, stall_threshold_seconds=0.1, history=5)
+
+    async def main():
+        mon.start()
+        await asyncio.sleep(0.1)
+        _blocking_copy()
+        await asyncio.sleep(0.1)
+        health = MetricsService(loop=mon).get_health_status()
+        await mon.stop()
+        return health
+
+    health = asyncio.run(main())
+    assert mon.stall_count == 1 and mon.lag.max >= 0.35
+    report = mon.stalls[0]
+    assert "_blocking_copy" in report["stack"] and report["duration_ms"] >= 350
+    assert health["checks"]["event_loop"]["status"] == "warning" and health["status"] == "degraded"
@@ -0,0 +1,156 @@
+# test_presence_reaper.py
+"""
+Колесо неактивности и фоновый reaper зависших участников.
+
+Запуск: cd backend && python -m pytest -q test_presence_reaper.py
+"""
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db.schema import sync_schema
+from app.models.event import EventLog
+from app.models.membership import Membership
+from app.models.presence import Presence
+from app.repositories import presence_repo
+from app.repositories.room_repo import RoomRepository
+from app.repositories.user_repo import UserRepository
+from app.repositories.membership_repo import MembershipRepository
+from app.services.presence_reaper import PresenceReaper
+from app.utils.timing_wheel import TimingWheel
+
+
+def test_wheel_expires_after_timeout():
+    w = TimingWheel(timeout=10, tick=1, now=1000)
+    w.touch("a", now=1000)
+    assert w.advance(now=1009) == []
+    assert w.advance(now=1010) == ["a"]
+    assert "a" not in w and len(w) == 0
+
+
+def test_wheel_touch_postpones_and_discard_forgets():
+    w = TimingWheel(timeout=10, tick=1, now=1000)
+    w.touch("a", now=1000)
+    w.touch("b", now=1000)
+    w.touch("a", now=1008)
+    w.discard("b")
+    assert w.advance(now=1012) == []
+    assert w.advance(now=1018) == ["a"]
+
+
+def test_wheel_handles_lagging_advance_and_seed_from_past():
+    w = TimingWheel(timeout=10, tick=1, now=1000)
+    w.touch("old", now=900)          # засев из давнего last_seen
+    w.touch("fresh", now=1000)
+    # курсор не двигали дольше нескольких оборотов
+    assert sorted(w.advance(now=1100)) == ["fresh", "old"]
+    w.touch("late", now=1100)
+    assert w.advance(now=1105) == []
+
+
+class _FakeHub:
+    def __init__(self, connected):
+        self.connected = set(connected)
+        self.sent = []
+
+    def is_connected(self, room_slug, user_id):
+        return (room_slug, user_id) in self.connected
+
+    async def broadcast(self, room_slug, data, exclude=None):
+        self.sent.append((room_slug, data))
+
+
+def test_reaper_closes_stale_members_in_batch():
+    db_path = Path(tempfile.mkdtemp(prefix="axenix-reaper-")) / "reaper.db"
+
+    async def main():
+        presence_repo.reset_live_cache()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        async with Session() as session:
+            room = await RoomRepository(session).create(
+                slug="reap", title="Reap", is_private=False, invite_key=None, created_by=None
+            )
+            urepo, mrepo = UserRepository(session), MembershipRepository(session)
+            users = [await urepo.create(nickname=f"u{i}") for i in range(5)]
+            for u in users:
+                await mrepo.create_active(room_id=room.id, user_id=u.id)
+            await session.commit()
+        dead = [u.id for u in users[:4]]
+        alive = users[4].id
+
+        hub = _FakeHub(connected={("reap", alive)})
+        reaper = PresenceReaper(session_factory=Session, hub=hub, batch_size=3)
+        closed = await reaper.reap_once(now=time.time() + 10_000)
+
+        async with Session() as session:
+            statuses = dict((await session.execute(
+                select(Membership.user_id, Membership.status)
+            )).all())
+            present = set((await session.execute(select(Presence.user_id))).scalars())
+            events = (await session.execute(
+                select(EventLog).where(EventLog.type == "member.left")
+            )).scalars().all()
+        await engine.dispose()
+        return closed, statuses, present, events, hub, dead, alive
+
+    closed, statuses, present, events, hub, dead, alive = asyncio.run(main())
+
+    assert closed == 4
+    assert all(statuses[uid] == "left" for uid in dead)
+    assert statuses[alive] == "active"
+    assert present == {alive}
+    assert sorted(json.loads(e.payload)["user_id"] for e in events) == sorted(dead)
+    assert sorted(data["user_id"] for _, data in hub.sent) == sorted(dead)
+    # живой сокет продлён, а не забыт
+    assert (events[0].room_id, alive) in presence_repo.TRACKER
+
+
+def test_rollback_drops_uncommitted_roster_changes():
+    db_path = Path(tempfile.mkdtemp(prefix="axenix-presence-")) / "presence.db"
+
+    async def main():
+        presence_repo.reset_live_cache()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        async with Session() as session:
+            room = await RoomRepository(session).create(
+                slug="rb", title="RB", is_private=False, invite_key=None, created_by=None
+            )
+            urepo, mrepo = UserRepository(session), MembershipRepository(session)
+            stays, ghost = await urepo.create(nickname="stays"), await urepo.create(nickname="ghost")
+            await mrepo.create_active(room_id=room.id, user_id=stays.id)
+            await session.commit()
+
+        # вход, который не закоммитился: в составе виден до отката, после — нет
+        async with Session() as session:
+            mrepo = MembershipRepository(session)
+            await mrepo.create_active(room_id=room.id, user_id=ghost.id)
+            before = {e["user_id"] for e in await mrepo.presence.list_by_room(room.id)}
+            await session.rollback()
+
+        # выход, который не закоммитился (сессия закрыта без commit)
+        async with Session() as session:
+            await MembershipRepository(session).mark_left(room_id=room.id, user_id=stays.id)
+
+        async with Session() as session:
+            after = {e["user_id"] for e in await MembershipRepository(session).presence.list_by_room(room.id)}
+        await engine.dispose()
+        return room.id, stays.id, ghost.id, before, after
+
+    room_id, stays, ghost, before, after = asyncio.run(main())
+    assert before == {stays, ghost}
+    assert after == {stays}
+    assert (room_id, stays) in presence_repo.TRACKER
+    assert (room_id, ghost) not in presence_repo.TRACKER
@@ -0,0 +1,56 @@
+# test_prometheus_export.py
+"""
+/metrics: корректный text exposition format — накопленные корзины монотонны,
++Inf равен _count, метки экранируются; показатели хаба ведутся без обходов.
+
+Запуск: cd backend && python -m pytest -q test_prometheus_export.py
+"""
+import asyncio
+import re
+
+from app.services.metrics import MetricsService
+from app.services.ws_hub import WsHub
+from app.utils.prometheus import LATENCY_BOUNDS
+
+LINE = re.compile(r'^[a-z_]+(\{([a-z_]+="([^"\\]|\\.)*",?)*\})? -?[0-9.e+-]+$')
+
+
+class _Ws:
+    def __init__(self, ok=True):
+        self.ok = ok
+
+    async def send_json(self, data):
+        if not self.ok:
+            raise RuntimeError("closed")
+
+
+def test_exposition_format():
+    hub = WsHub()
+
+    async def connect():
+        for uid in (1, 2, 3):
+            await hub.join("a", uid, _Ws())
+        await hub.join("b", 4, _Ws(ok=False))
+        await hub.broadcast("b", {"type": "x"})
+        await hub.send_to("b", 4, {"type": "x"})  # сокет умер — снимается с учёта
+
+    asyncio.run(connect())
+    svc = MetricsService(hub=hub)
+    for i in range(50):
+        svc.record_response_time(i / 1000, "GET /api/rooms/{slug}")
+    svc.increment_errors('chat_error_bad "quote"\nline')
+    svc.increment_ws_events("chat.message")
+
+    text = "".join(svc.prometheus_families())
+    samples = [l for l in text.splitlines() if not l.startswith("#")]
+    assert samples and all(LINE.match(l) for l in samples), [l for l in samples if not LINE.match(l)]
+
+    buckets = [int(l.rsplit(" ", 1)[1]) for l in samples
+               if l.startswith('axenix_http_request_duration_seconds_bucket{method="GET",route="/api/rooms/{slug}"')]
+    assert len(buckets) == len(LATENCY_BOUNDS) + 1
+    assert buckets == sorted(buckets) and buckets[-1] == 50
+    assert "axenix_ws_connections 3" in samples and "axenix_hub_active_rooms 1" in samples
+    assert "axenix_hub_send_failures_total 2" in samples
+    assert svc.get_hub_metrics()["members_per_room"] == {"a": 3}
+    assert svc.get_system_stats()["ws_connections"] == 3
+    assert 'axenix_ws_events_total{type="chat.message"} 1' in samples
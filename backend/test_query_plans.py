@@ -0,0 +1,293 @@
+# test_query_plans.py
+"""
+Регрессия планов запросов: каждый запрос репозиториев прогоняется через
+EXPLAIN QUERY PLAN на SQLite, горячие запросы не должны уходить в полный
+скан таблицы или во временное B-дерево для сортировки.
+
+Запуск: cd backend && python -m pytest -q test_query_plans.py
+"""
+import asyncio
+import sqlite3
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db.schema import sync_schema
+from app.repositories.room_repo import RoomRepository
+from app.repositories.user_repo import UserRepository
+from app.repositories.membership_repo import MembershipRepository
+from app.repositories.message_repo import MessageRepository
+from app.repositories.event_repo import EventRepository
+from app.repositories.notification_repo import NotificationRepository
+from app.repositories.crypto_repo import CryptoRepository
+from app.repositories.recording_repo import RecordingRepository
+from app.repositories.presence_repo import PresenceRepository, reset_live_cache
+from app.repositories.blob_repo import BlobRepository
+
+# Запросы, для которых полный проход ожидаем (пагинация всей таблицы по PK)
+ALLOWED_SCANS = {
+    "RoomRepository.list",
+}
+
+
+def _run_scenario(scenario):
+    """Выполнить сценарий на чистой БД, вернуть [(label, sql, params)] и путь к БД."""
+    tmpdir = tempfile.mkdtemp(prefix="axenix-plans-")
+    db_path = Path(tmpdir) / "plans.db"
+    captured: list[tuple[str, str, object]] = []
+    label = {"current": "setup"}
+
+    async def main():
+        reset_live_cache()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            if not executemany:
+                captured.append((label["current"], statement, parameters))
+
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        async with Session() as session:
+            def mark(name: str):
+                label["current"] = name
+            await scenario(session, mark)
+            await session.commit()
+        await engine.dispose()
+
+    asyncio.run(main())
+    return captured, db_path
+
+
+def _bad_plan_lines(db_path: Path, sql: str, params) -> list[str]:
+    con = sqlite3.connect(db_path)
+    try:
+        rows = con.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+    finally:
+        con.close()
+    bad = []
+    for row in rows:
+        detail = row[-1]
+        if detail.startswith("SCAN ") or "USE TEMP B-TREE" in detail:
+            bad.append(detail)
+    return bad
+
+
+def _assert_plans(scenario):
+    captured, db_path = _run_scenario(scenario)
+    checked = 0
+    problems = []
+    for label, sql, params in captured:
+        if label == "setup" or label in ALLOWED_SCANS:
+            continue
+        if not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            continue
+        checked += 1
+        bad = _bad_plan_lines(db_path, sql, params)
+        if bad:
+            problems.append(f"{label}: {bad}\n    {sql}")
+    assert checked, "сценарий не выполнил ни одного запроса"
+    assert not problems, "Запросы без подходящего индекса:\n" + "\n".join(problems)
+
+
+async def _seed(session):
+    rrepo, urepo = RoomRepository(session), UserRepository(session)
+    room = await rrepo.create(slug="plan-room", title="Plan", is_private=False, invite_key="inv-1", created_by=None)
+    user = await urepo.create(nickname="u1", email="u1@example.com")
+    other = await urepo.create(nickname="u2")
+    return room, user, other
+
+
+def test_membership_queries_use_indexes():
+    async def scenario(session, mark):
+        room, user, other = await _seed(session)
+        mrepo = MembershipRepository(session)
+        await mrepo.create_active(room_id=room.id, user_id=user.id)
+        await mrepo.create_active(room_id=room.id, user_id=other.id)
+
+        mark("MembershipRepository.get_join_context")
+        await mrepo.get_join_context(room_slug=room.slug, user_id=user.id)
+        mark("MembershipRepository.get_active")
+        await mrepo.get_active(room_id=room.id, user_id=user.id)
+        mark("MembershipRepository.heartbeat")
+        await mrepo.heartbeat(room_id=room.id, user_id=user.id)
+        mark("MembershipRepository.set_hand")
+        await mrepo.set_hand(room_id=room.id, user_id=user.id, raised=True)
+        mark("MembershipRepository.set_media_flags")
+        await mrepo.set_media_flags(room_id=room.id, user_id=user.id, mic_muted=True)
+        mark("MembershipRepository.list_by_room")
+        await mrepo.list_by_room(room_id=room.id)
+        mark("MembershipRepository.mark_left")
+        await mrepo.mark_left(room_id=room.id, user_id=other.id)
+        mark("MembershipRepository.mark_left_many")
+        await mrepo.mark_left_many([(room.id, user.id), (room.id, other.id)])
+
+    _assert_plans(scenario)
+
+
+def test_presence_queries_use_indexes():
+    async def scenario(session, mark):
+        room, user, other = await _seed(session)
+        mrepo = MembershipRepository(session)
+        m = await mrepo.create_active(room_id=room.id, user_id=user.id)
+        await mrepo.create_active(room_id=room.id, user_id=other.id)
+        reset_live_cache()
+        prepo = PresenceRepository(session)
+
+        mark("PresenceRepository.list_by_room")
+        await prepo.list_by_room(room.id)
+        mark("PresenceRepository.upsert")
+        await prepo.upsert(m)
+        mark("PresenceRepository.set_fields")
+        await prepo.set_fields(room_id=room.id, user_id=user.id, hand_raised=True)
+        mark("PresenceRepository.remove")
+        await prepo.remove(room_id=room.id, user_id=other.id)
+
+    _assert_plans(scenario)
+
+
+def test_room_and_user_queries_use_indexes():
+    async def scenario(session, mark):
+        room, user, _ = await _seed(session)
+        rrepo, urepo = RoomRepository(session), UserRepository(session)
+
+        mark("RoomRepository.get_by_id")
+        await rrepo.get_by_id(room.id)
+        mark("RoomRepository.get_by_slug")
+        await rrepo.get_by_slug(room.slug)
+        mark("RoomRepository.get_by_invite_key")
+        await rrepo.get_by_invite_key("inv-1")
+        mark("RoomRepository.slug_exists")
+        await rrepo.slug_exists(room.slug)
+        mark("RoomRepository.invite_exists")
+        await rrepo.invite_exists("inv-1")
+        mark("RoomRepository.list")
+        await rrepo.list()
+        mark("RoomRepository.list_without_cover")
+        await rrepo.list_without_cover(["plan-room", "team"])
+        mark("RoomRepository.set_cover")
+        await rrepo.set_cover(room, path="static/covers/plan-room.png", content_type="image/png",
+                              sha256="0" * 64, size=1, variants={})
+        mark("UserRepository.get")
+        await urepo.get(user.id)
+        mark("UserRepository.get_by_email")
+        await urepo.get_by_email("u1@example.com")
+        mark("UserRepository.get_public_keys")
+        await urepo.get_public_keys([user.id, user.id + 1])
+
+    _assert_plans(scenario)
+
+
+def test_message_queries_use_indexes():
+    async def scenario(session, mark):
+        room, user, _ = await _seed(session)
+        repo = MessageRepository(session)
+        first = await repo.create(room_id=room.id, user_id=user.id, text="hello")
+        await repo.create(room_id=room.id, user_id=user.id, text="world")
+
+        mark("MessageRepository.get")
+        await repo.get(first.id)
+        mark("MessageRepository.get_room_messages")
+        await repo.get_room_messages(room.id, limit=50)
+        mark("MessageRepository.get_room_messages(before_id)")
+        await repo.get_room_messages(room.id, limit=50, before_id=first.id + 1)
+        mark("MessageRepository.get_recent_room_messages")
+        await repo.get_recent_room_messages(room.id)
+        mark("MessageRepository.get_user_messages")
+        await repo.get_user_messages(user.id)
+        mark("MessageRepository.search_in_room")
+        await repo.search_in_room(room.id, "hel")
+        mark("MessageRepository.count_room_messages")
+        await repo.count_room_messages(room.id)
+
+    _assert_plans(scenario)
+
+
+def test_event_queries_use_indexes():
+    async def scenario(session, mark):
+        room, _, _ = await _seed(session)
+        repo = EventRepository(session)
+        for i in range(3):
+            await repo.append(room_id=room.id, type_="chat.message", payload_json=f'{{"i": {i}}}')
+
+        mark("EventRepository.list_after")
+        await repo.list_after(room_id=room.id, after_seq=1)
+        mark("EventRepository.next_seq")
+        await repo.next_seq()
+
+    _assert_plans(scenario)
+
+
+def test_notification_queries_use_indexes():
+    async def scenario(session, mark):
+        _, user, _ = await _seed(session)
+        repo = NotificationRepository(session)
+        n = await repo.create(user.id, "plan-room", "t", "m")
+        await repo.create(user.id, "plan-room", "t2", "m2")
+
+        mark("NotificationRepository.get_user_notifications")
+        await repo.get_user_notifications(user.id)
+        mark("NotificationRepository.get_unread_count")
+        await repo.get_unread_count(user.id)
+        mark("NotificationRepository.mark_as_read")
+        await repo.mark_as_read(n.id, user.id)
+        mark("NotificationRepository.mark_all_as_read")
+        await repo.mark_all_as_read(user.id)
+
+    _assert_plans(scenario)
+
+
+def test_crypto_and_recording_queries_use_indexes():
+    async def scenario(session, mark):
+        room, user, _ = await _seed(session)
+        crepo = CryptoRepository(session)
+        rk = await crepo.create_room_key(room_id=room.id, created_by=user.id)
+        await crepo.add_share(room_key_id=rk.id, room_id=room.id, user_id=user.id, wrapped_key_b64="AA==")
+        rec_repo = RecordingRepository(session)
+        rec = await rec_repo.create(room_id=room.id, uploader_user_id=user.id, title="r", file_url="/x")
+
+        mark("CryptoRepository.latest_share_for_user")
+        await crepo.latest_share_for_user(room_id=room.id, user_id=user.id)
+        mark("CryptoRepository.list_shares_for_room")
+        await crepo.list_shares_for_room(room_id=room.id)
+        mark("CryptoRepository.active_key")
+        await crepo.active_key(room_id=room.id)
+        mark("CryptoRepository.share_for_key")
+        await crepo.share_for_key(room_key_id=rk.id, user_id=user.id)
+        mark("CryptoRepository.rotate_active")
+        await crepo.rotate_active(room_id=room.id)
+        mark("RecordingRepository.list_for_room")
+        await rec_repo.list_for_room(room_id=room.id)
+        mark("RecordingRepository.get")
+        await rec_repo.get(rec_id=rec.id)
+
+        brepo = BlobRepository(session)
+        await brepo.acquire(sha256="a" * 64, path="static/blobs/aa/x", size=1, content_type=None)
+        mark("BlobRepository.release")
+        await brepo.release("a" * 64)
+        mark("BlobRepository.list_garbage")
+        await brepo.list_garbage(older_than=datetime.utcnow(), limit=10)
+        mark("BlobRepository.delete_unreferenced")
+        await brepo.delete_unreferenced(["a" * 64])
+        mark("BlobRepository.known")
+        await brepo.known(["a" * 64, "b" * 64])
+
+    _assert_plans(scenario)
+
+
+def test_plan_checker_detects_scan():
+    """Санити-проверка самого детектора: запрос без индекса обязан упасть."""
+    async def scenario(session, mark):
+        await _seed(session)
+        from sqlalchemy import select
+        from app.models.user import User
+        mark("UserRepository.by_nickname")
+        await session.execute(select(User).where(User.nickname == "u1"))
+
+    with pytest.raises(AssertionError):
+        _assert_plans(scenario)
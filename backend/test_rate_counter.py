@@ -0,0 +1,27 @@
+# test_rate_counter.py
+"""
+RateCounter: счёт за любое окно без обхода истории, пропуски времени
+и выход за горизонт.
+
+Запуск: cd backend && python -m pytest -q test_rate_counter.py
+"""
+from app.utils.counters import RateCounter
+
+
+def test_windows_gaps_and_horizon():
+    now = [1000.0]
+    c = RateCounter(horizon_seconds=10, clock=lambda: now[0])
+    for _ in range(3):
+        c.add()
+    now[0] += 1.5
+    c.add(2)
+    assert c.count(1) == 2 and c.count(2) == 5 and c.count(60) == 5
+
+    now[0] += 5
+    assert c.count(5) == 0 and c.count(6) == 2 and c.count(7) == 5
+
+    # дальше горизонта — всё вытеснено, итог сохраняется
+    now[0] += 100
+    c.add()
+    assert c.count(10) == 1 and c.total == 6
+    assert c.per_minute(30) == 2.0
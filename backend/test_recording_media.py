@@ -0,0 +1,78 @@
+# test_recording_media.py
+"""
+Раздача записей: strong ETag по sha256, 304 на If-None-Match, Range/206/416,
+immutable-кэш.
+
+Запуск: cd backend && python -m pytest -q test_recording_media.py
+"""
+import asyncio
+import hashlib
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.api import recordings as recordings_api
+from app.api.deps import get_db
+from app.db.schema import sync_schema
+from app.repositories.presence_repo import reset_live_cache
+from app.repositories.room_repo import RoomRepository
+from app.repositories.user_repo import UserRepository
+from app.repositories.membership_repo import MembershipRepository
+
+
+def test_recording_media_etag_and_ranges(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    reset_live_cache()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'media.db'}")
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        async with Session() as s:
+            room = await RoomRepository(s).create(slug="m", title="M", is_private=False, invite_key=None, created_by=None)
+            user = await UserRepository(s).create(nickname="u")
+            await MembershipRepository(s).create_active(room_id=room.id, user_id=user.id)
+            await s.commit()
+            return user.id
+
+    uid = asyncio.run(setup())
+
+    async def override_db():
+        async with Session() as s:
+            yield s
+            await s.commit()
+
+    app = FastAPI()
+    app.include_router(recordings_api.router, prefix="/api/recordings")
+    app.dependency_overrides[get_db] = override_db
+
+    data = os.urandom(300_000)
+    with TestClient(app) as c:
+        rec = c.post(f"/api/recordings/m/upload?uploader_user_id={uid}",
+                     files={"file": ("talk.webm", data, "video/webm")}).json()
+        url = rec["media_url"]
+        etag = f'"{hashlib.sha256(data).hexdigest()}"'
+
+        r = c.get(url)
+        assert r.status_code == 200 and r.content == data
+        assert r.headers["etag"] == etag
+        assert "immutable" in r.headers["cache-control"]
+        assert r.headers["accept-ranges"] == "bytes"
+
+        assert c.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+        r = c.get(url, headers={"Range": "bytes=1000-1999"})
+        assert r.status_code == 206 and r.content == data[1000:2000]
+        assert r.headers["content-range"] == f"bytes 1000-1999/{len(data)}"
+
+        # If-Range с чужим ETag — отдаём файл целиком
+        r = c.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+        assert r.status_code == 200 and len(r.content) == len(data)
+
+        assert c.get(url, headers={"Range": f"bytes={len(data) + 10}-"}).status_code == 416
+        assert c.head(url).headers["content-length"] == str(len(data))
+        assert c.get("/api/recordings/m/999/media").status_code == 404
+    asyncio.run(engine.dispose())
@@ -0,0 +1,202 @@
+# test_resumable_upload.py
+"""
+Возобновляемая загрузка записи: куски в произвольном порядке (и параллельно),
+оборванный кусок не засчитывается, complete собирает Recording ровно один раз
+(параллельный complete получает upload_not_found), брошенная загрузка
+удаляется сборщиком по TTL.
+
+Запуск: cd backend && python -m pytest -q test_resumable_upload.py
+"""
+import asyncio
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db.schema import sync_schema
+from app.repositories.presence_repo import reset_live_cache
+from app.repositories.room_repo import RoomRepository
+from app.repositories.user_repo import UserRepository
+from app.repositories.membership_repo import MembershipRepository
+from app.repositories.recording_repo import RecordingRepository
+from app.repositories.upload_repo import UploadRepository
+from app.services.blobs import BlobCollector
+from app.services.recording import RecordingService
+from app.services.uploads import coverage
+
+
+def test_coverage_merges_overlaps_and_gaps():
+    assert coverage([], 10) == (0, 0, [(0, 10)])
+    assert coverage([(0, 4), (6, 4)], 10) == (4, 8, [(4, 6)])
+    assert coverage([(6, 4), (0, 4), (2, 5)], 10) == (10, 10, [])
+
+
+async def _body(data: bytes, piece: int = 1000):
+    for i in range(0, len(data), piece):
+        yield data[i:i + piece]
+        await asyncio.sleep(0)
+
+
+def test_resumable_upload_out_of_order_and_parallel(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = os.urandom(10_000)
+
+    async def main():
+        reset_live_cache()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'up.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        def svc(session):
+            return RecordingService(RoomRepository(session), MembershipRepository(session),
+                                    RecordingRepository(session), UploadRepository(session))
+
+        async with Session() as s:
+            room = await RoomRepository(s).create(slug="up", title="Up", is_private=False, invite_key=None, created_by=None)
+            user = await UserRepository(s).create(nickname="u")
+            await MembershipRepository(s).create_active(room_id=room.id, user_id=user.id)
+            st = await svc(s).create_upload(room_slug="up", uploader_user_id=user.id, filename="../meet.webm",
+                                            size=len(data), title="Meet", duration_sec=60)
+            await s.commit()
+        upload_id = st["upload_id"]
+
+        async def put(offset, length, body=None):
+            async with Session() as s:
+                st = await svc(s).put_chunk(room_slug="up", upload_id=upload_id, user_id=user.id, offset=offset,
+                                            length=length, body=body or _body(data[offset:offset + length]))
+                await s.commit()
+                return st
+
+        # обрыв: пришло меньше, чем объявлено — кусок не засчитан
+        with pytest.raises(ValueError, match="chunk_incomplete"):
+            await put(0, 4000, body=_body(data[:1500]))
+
+        # хвост и середина параллельно, начало последним
+        await asyncio.gather(put(8000, 2000), put(4000, 4000))
+        async with Session() as s:
+            st = await svc(s).upload_status(room_slug="up", upload_id=upload_id, user_id=user.id)
+        assert st["offset"] == 0 and st["missing"] == [(0, 4000)] and st["received"] == 6000
+
+        async with Session() as s:
+            with pytest.raises(ValueError, match="upload_incomplete"):
+                await svc(s).complete_upload(room_slug="up", upload_id=upload_id, user_id=user.id)
+
+        st = await put(0, 4000)
+        assert st["complete"] and st["offset"] == len(data)
+
+        async with Session() as s:
+            with pytest.raises(PermissionError):
+                await svc(s).upload_status(room_slug="up", upload_id=upload_id, user_id=user.id + 100)
+            rec = await svc(s).complete_upload(room_slug="up", upload_id=upload_id, user_id=user.id)
+            await s.commit()
+            with pytest.raises(ValueError, match="upload_not_found"):
+                await svc(s).upload_status(room_slug="up", upload_id=upload_id, user_id=user.id)
+        await engine.dispose()
+        return rec, upload_id
+
+    rec, upload_id = asyncio.run(main())
+    # собранный файл переехал в content-addressed хранилище
+    sha = hashlib.sha256(data).hexdigest()
+    assert rec["file_url"] == f"/static/blobs/{sha[:2]}/{sha}.webm"
+    assert rec["size_bytes"] == len(data)
+    assert Path(rec["file_url"].lstrip("/")).read_bytes() == data
+    assert not (Path("data/uploads") / f"{upload_id}.part").exists()
+
+
+def test_concurrent_complete_claims_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = os.urandom(5000)
+
+    async def main():
+        reset_live_cache()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'claim.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        def svc(session):
+            return RecordingService(RoomRepository(session), MembershipRepository(session),
+                                    RecordingRepository(session), UploadRepository(session))
+
+        async def start():
+            async with Session() as s:
+                st = await svc(s).create_upload(room_slug="c", uploader_user_id=user.id, filename="a.webm",
+                                                size=len(data), title="A", duration_sec=None)
+                await svc(s).put_chunk(room_slug="c", upload_id=st["upload_id"], user_id=user.id,
+                                       offset=0, length=len(data), body=_body(data))
+                await s.commit()
+            return st["upload_id"]
+
+        async def complete(upload_id):
+            async with Session() as s:
+                try:
+                    rec = await svc(s).complete_upload(room_slug="c", upload_id=upload_id, user_id=user.id)
+                except ValueError as e:
+                    return str(e)
+                await s.commit()
+                return rec["id"]
+
+        async with Session() as s:
+            room = await RoomRepository(s).create(slug="c", title="C", is_private=False, invite_key=None, created_by=None)
+            user = await UserRepository(s).create(nickname="u")
+            await MembershipRepository(s).create_active(room_id=room.id, user_id=user.id)
+            await s.commit()
+
+        upload_id = await start()
+        results = await asyncio.gather(complete(upload_id), complete(upload_id))
+        async with Session() as s:
+            recs = await RecordingRepository(s).list_for_room(room_id=room.id, limit=10)
+
+        # .part пропал (удалён вручную/сборщиком) — 409, а не 500
+        lost = await start()
+        (Path("data/uploads") / f"{lost}.part").unlink()
+        missing = await complete(lost)
+        await engine.dispose()
+        return results, len(recs), missing
+
+    results, n_recs, missing = asyncio.run(main())
+    # .part переносит только один complete; второй не видит сессии
+    assert results.count("upload_not_found") == 1 and n_recs == 1
+    assert missing == "upload_part_missing"
+
+
+def test_abandoned_upload_expires(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        reset_live_cache()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ttl.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        gc = BlobCollector(session_factory=Session, upload_ttl_seconds=3600)
+
+        async with Session() as s:
+            room = await RoomRepository(s).create(slug="ttl", title="T", is_private=False, invite_key=None, created_by=None)
+            user = await UserRepository(s).create(nickname="u")
+            await MembershipRepository(s).create_active(room_id=room.id, user_id=user.id)
+            svc = RecordingService(RoomRepository(s), MembershipRepository(s), RecordingRepository(s), UploadRepository(s))
+            st = await svc.create_upload(room_slug="ttl", uploader_user_id=user.id, filename="a.webm",
+                                         size=5000, title="A", duration_sec=None)
+            await s.commit()
+        part = Path("data/uploads") / f"{st['upload_id']}.part"
+        # .part без сессии: create_upload упал между allocate и commit
+        stray = Path("data/uploads") / ("0" * 32 + ".part")
+        stray.write_bytes(b"x")
+
+        fresh = await gc.expire_uploads()
+        existed = part.exists() and stray.exists()
+        expired = await gc.expire_uploads(now=time.time() + 7200)
+        async with Session() as s:
+            left = await UploadRepository(s).get(st["upload_id"])
+        await engine.dispose()
+        return fresh, existed, expired, left, part, stray
+
+    fresh, existed, expired, left, part, stray = asyncio.run(main())
+    assert fresh == 0 and existed
+    assert expired == 2 and left is None
+    assert not part.exists() and not stray.exists()
@@ -0,0 +1,44 @@
+# test_room_activity.py
+"""
+Активность комнат: простаивающие вытесняются по TTL и по лимиту, топ-K
+совпадает с полным пересчётом и после вытеснения лидера.
+
+Запуск: cd backend && python -m pytest -q test_room_activity.py
+"""
+import random
+
+from app.services.room_activity import RoomActivity
+
+
+def test_ttl_capacity_and_top_k():
+    now = [0.0]
+    ra = RoomActivity(ttl_seconds=100, max_rooms=50, top_k=3, active_window_seconds=10, clock=lambda: now[0])
+    rnd = random.Random(3)
+    for _ in range(2000):
+        now[0] += 0.01
+        ra.message(f"r{rnd.randrange(20)}")
+    ra.participants("r0", 7)
+    ra.participants("r0", 2)
+    assert ra.get("r0")["peak_participants"] == 7
+
+    def brute():
+        return sorted(((s, r["messages"]) for s, r in ra._rooms.items()), key=lambda x: -x[1])[:3]
+
+    assert [r["messages"] for _, r in ra.top()] == [m for _, m in brute()]
+    assert ra.active_count() == 20
+
+    # лидер простаивает и вытесняется — топ пересобирается из оставшихся
+    leader = ra.top()[0][0]
+    now[0] += 50
+    for i in range(20):
+        if f"r{i}" != leader:
+            ra.message(f"r{i}")
+    now[0] += 60
+    assert ra.get(leader) is None and len(ra) == 19
+    assert leader not in dict(ra.top()) and [r["messages"] for _, r in ra.top()] == [m for _, m in brute()]
+    assert ra.active_count() == 0
+
+    # лимит комнат
+    for i in range(100):
+        ra.message(f"x{i}")
+    assert len(ra) == 50 and ra.get("x99") and ra.get("x0") is None
@@ -0,0 +1,123 @@
+# test_room_covers.py
+"""
+Обложки в строке комнаты: разовый перенос старых файлов при старте, кэш по slug
+сбрасывается после записи, запрос, читавший БД до коммита, кэш не портит;
+заменённый файл удаляется только после коммита.
+
+Запуск: cd backend && python -m pytest -q test_room_covers.py
+"""
+import asyncio
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db.schema import sync_schema
+from app.repositories.room_repo import RoomRepository
+from app.services.blobs import discard
+from app.services.covers import CoverCache, CoverService, cover_payload
+from app.services.images import IMAGES
+
+
+def test_backfill_and_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("static/covers").mkdir(parents=True)
+    Path("static/covers/team.png").write_bytes(b"png-bytes")
+    Path("static/covers/team-a.txt").write_bytes(b"orphan")   # похожий префикс, комнаты нет
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'c.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        cache = CoverCache()
+
+        async with Session() as s:
+            rrepo = RoomRepository(s)
+            await rrepo.create(slug="team", title="T", is_private=False, invite_key=None, created_by=None)
+            await rrepo.create(slug="bare", title="B", is_private=False, invite_key=None, created_by=None)
+            assert await CoverService(rrepo).backfill_from_disk() == 1
+            await s.commit()
+
+        # перенос разовый: следующий старт не сканирует ни комнаты, ни каталог
+        Path("static/covers/bare.png").write_bytes(b"late")
+        async with Session() as s:
+            assert await CoverService(RoomRepository(s)).backfill_from_disk() == 0
+            await s.commit()
+
+        async with Session() as s:
+            rrepo = RoomRepository(s)
+            team = await cache.get(rrepo, "team")
+            assert await cache.get(rrepo, "bare") is None
+            with pytest.raises(ValueError, match="room_not_found"):
+                await cache.get(rrepo, "nope")
+
+            # чтение, начатое до записи, не кладёт в кэш устаревшее значение
+            room = await rrepo.get_by_slug("bare")
+            cache.invalidate("bare")
+            stale = asyncio.create_task(cache.get(rrepo, "bare"))
+            await asyncio.sleep(0)          # задача ушла в БД
+            cache.invalidate("bare")
+            assert await stale is None and "bare" not in cache._items
+            await rrepo.set_cover(room, path="static/covers/bare.jpg", content_type="image/jpeg",
+                                  sha256="ab" * 32, size=3, variants={"960": "/static/img/covers/bare-960-x.webp"})
+            await s.commit()
+            cache.invalidate("bare")
+            bare = await cache.get(rrepo, "bare")
+            listed = {r.slug: cover_payload(r) for r in await rrepo.list()}
+        await engine.dispose()
+        return team, bare, listed
+
+    team, bare, listed = asyncio.run(main())
+    assert team["cover_url"] == "/static/covers/team.png" and team["size"] == len(b"png-bytes")
+    assert team["content_type"] == "image/png" and team["cover_urls"] is None
+    assert bare["cover_url"] == "/static/img/covers/bare-960-x.webp"
+    assert listed["bare"] == bare and listed["team"] == team
+
+
+def test_replaced_legacy_cover_is_deleted_only_after_commit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("static/covers").mkdir(parents=True)
+    legacy = Path("static/covers/old.png")
+    legacy.write_bytes(b"legacy")
+
+    def upload() -> UploadFile:
+        buf = io.BytesIO()
+        Image.new("RGB", (600, 300), (0, 120, 0)).save(buf, "PNG")
+        return UploadFile(file=io.BytesIO(buf.getvalue()), filename="new.png", size=len(buf.getvalue()))
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'r.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        async with Session() as s:
+            rrepo = RoomRepository(s)
+            await rrepo.create(slug="old", title="O", is_private=False, invite_key=None, created_by=None)
+            await CoverService(rrepo).backfill_from_disk()
+            await s.commit()
+
+        # коммит не состоялся — строка по-прежнему ссылается на старый файл
+        async with Session() as s:
+            rrepo = RoomRepository(s)
+            await CoverService(rrepo).upload(await rrepo.get_by_slug("old"), upload())
+            await s.rollback()
+        kept = legacy.exists()
+
+        async with Session() as s:
+            rrepo = RoomRepository(s)
+            _, stale = await CoverService(rrepo).upload(await rrepo.get_by_slug("old"), upload())
+            in_tx = legacy.exists()
+            await s.commit()
+            await discard(stale)
+        await engine.dispose()
+        return kept, in_tx
+
+    try:
+        kept, in_tx = asyncio.run(main())
+    finally:
+        IMAGES.shutdown()
+    assert kept and in_tx and not legacy.exists()
@@ -0,0 +1,208 @@
+# test_room_key_distribution.py
+"""
+Раздача ключа комнаты: ключи пользователей грузятся одним запросом,
+RSA-OAEP — в пуле процессов, доли вставляются пачкой; некорректные и
+отсутствующие ключи пропускаются, разобранные ключи кэшируются по отпечатку.
+Опоздавшим ключ оборачивается в фоне только для них; одновременная доставка
+не плодит долей. Вне dev без APP_CRYPTO_KEK сервер не стартует.
+
+Запуск: cd backend && python -m pytest -q test_room_key_distribution.py
+"""
+import asyncio
+import base64
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.db.schema import sync_schema
+from app.repositories.presence_repo import reset_live_cache
+from app.repositories.room_repo import RoomRepository
+from app.repositories.user_repo import UserRepository
+from app.repositories.membership_repo import MembershipRepository
+from app.repositories.crypto_repo import CryptoRepository
+from app.services.crypto import (
+    CryptoService, OAEP, PublicKeyCache, check_kek, open_room_key, seal_room_key,
+)
+from app.services.key_delivery import KeyDelivery
+
+
+def _keypair():
+    priv = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = priv.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode("ascii")
+    return priv, pem
+
+
+def test_public_key_cache_is_lru_by_fingerprint():
+    cache = PublicKeyCache(maxsize=2)
+    (_, a), (_, b), (_, c) = _keypair(), _keypair(), _keypair()
+    ka = cache.get(a)
+    assert cache.get(a) is ka
+    assert cache.get("garbage") is None
+    cache.get(b)                      # вытесняет "garbage", a недавно использован
+    cache.get(c)
+    assert len(cache) == 2 and cache.get(c) is not None
+
+
+def test_init_room_key_wraps_for_every_keyed_member():
+    db_path = Path(tempfile.mkdtemp(prefix="axenix-keys-")) / "keys.db"
+    pairs = [_keypair() for _ in range(3)]
+
+    async def main():
+        reset_live_cache()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        async with Session() as s:
+            rrepo, urepo, mrepo = RoomRepository(s), UserRepository(s), MembershipRepository(s)
+            room = await rrepo.create(slug="k", title="K", is_private=False, invite_key=None, created_by=None)
+            pems = [pem for _, pem in pairs] + [pairs[0][1], "not a key", None]
+            users = []
+            for i, pem in enumerate(pems):
+                u = await urepo.create(nickname=f"u{i}")
+                u.public_key_pem = pem
+                await mrepo.create_active(room_id=room.id, user_id=u.id, role="owner" if i == 0 else "participant")
+                users.append(u)
+            await s.flush()
+            svc = CryptoService(rrepo, mrepo, urepo, CryptoRepository(s))
+            out = await svc.init_room_key(room_slug="k", actor_user_id=users[0].id)
+            await s.commit()
+            shares = {u.id: await svc.get_my_wrapped_key(room_slug="k", user_id=u.id) for u in users}
+        await engine.dispose()
+        return out, users, shares
+
+    out, users, shares = asyncio.run(main())
+    assert out["distributed"] == 4
+    privs = [priv for priv, _ in pairs] + [pairs[0][0]]
+    keys = {priv.decrypt(base64.b64decode(shares[u.id]["wrapped_key_b64"]), OAEP) for priv, u in zip(privs, users)}
+    assert len(keys) == 1 and len(keys.pop()) == 32
+    assert [shares[u.id] for u in users[4:]] == [None, None]
+
+
+class _FakeHub:
+    def __init__(self):
+        self.sent = []
+
+    async def send_to(self, room_slug, user_id, data):
+        self.sent.append((room_slug, user_id, data))
+
+
+def test_late_joiner_gets_key_without_rewrapping_room():
+    db_path = Path(tempfile.mkdtemp(prefix="axenix-late-")) / "late.db"
+    (owner_priv, owner_pem), (late_priv, late_pem) = _keypair(), _keypair()
+
+    async def main():
+        reset_live_cache()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        def svc(s):
+            return CryptoService(RoomRepository(s), MembershipRepository(s), UserRepository(s), CryptoRepository(s))
+
+        async with Session() as s:
+            urepo, mrepo = UserRepository(s), MembershipRepository(s)
+            room = await RoomRepository(s).create(slug="late", title="L", is_private=False, invite_key=None, created_by=None)
+            bare = await RoomRepository(s).create(slug="bare", title="B", is_private=False, invite_key=None, created_by=None)
+            owner, late, nokey, direct = [await urepo.create(nickname=n) for n in ("o", "l", "n", "d")]
+            owner.public_key_pem = owner_pem
+            late.public_key_pem = direct.public_key_pem = late_pem
+            await mrepo.create_active(room_id=room.id, user_id=owner.id, role="owner")
+            await svc(s).init_room_key(room_slug="late", actor_user_id=owner.id)
+            for u in (late, nokey, direct):
+                await mrepo.create_active(room_id=room.id, user_id=u.id)
+            await mrepo.create_active(room_id=bare.id, user_id=late.id)
+            await s.commit()
+
+        hub = _FakeHub()
+        delivery = KeyDelivery(session_factory=Session, hub=hub)
+        for room_id, uid in ((room.id, late.id), (room.id, nokey.id), (bare.id, late.id)):
+            delivery.schedule(room_slug="x", room_id=room_id, user_id=uid)
+        await delivery.drain()
+
+        async with Session() as s:
+            shares = {sh.user_id: sh for sh in await CryptoRepository(s).list_shares_for_room(room_id=room.id)}
+            # фоновая доставка не планировалась — ключ оборачивается по запросу my_key
+            on_demand = await svc(s).get_my_wrapped_key(room_slug="late", user_id=direct.id)
+            await s.commit()
+        await engine.dispose()
+        return owner, late, shares, hub, delivery, bare, on_demand
+
+    owner, late, shares, hub, delivery, bare, on_demand = asyncio.run(main())
+    assert set(shares) == {owner.id, late.id}
+    k_owner = owner_priv.decrypt(base64.b64decode(shares[owner.id].wrapped_key_b64), OAEP)
+    k_late = late_priv.decrypt(base64.b64decode(shares[late.id].wrapped_key_b64), OAEP)
+    assert k_owner == k_late
+    assert hub.sent == [("x", late.id, {"type": "room_key.ready", "room_key_id": shares[late.id].room_key_id})]
+    assert delivery._keyed[bare.id] is False
+    assert late_priv.decrypt(base64.b64decode(on_demand["wrapped_key_b64"]), OAEP) == k_owner
+
+
+def test_concurrent_delivery_keeps_one_share_per_user():
+    db_path = Path(tempfile.mkdtemp(prefix="axenix-race-")) / "race.db"
+    (_, owner_pem), (late_priv, late_pem) = _keypair(), _keypair()
+
+    async def main():
+        reset_live_cache()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        def svc(s):
+            return CryptoService(RoomRepository(s), MembershipRepository(s), UserRepository(s), CryptoRepository(s))
+
+        async with Session() as s:
+            urepo, mrepo = UserRepository(s), MembershipRepository(s)
+            room = await RoomRepository(s).create(slug="race", title="R", is_private=False, invite_key=None, created_by=None)
+            owner, late = await urepo.create(nickname="o"), await urepo.create(nickname="l")
+            owner.public_key_pem, late.public_key_pem = owner_pem, late_pem
+            await mrepo.create_active(room_id=room.id, user_id=owner.id, role="owner")
+            await svc(s).init_room_key(room_slug="race", actor_user_id=owner.id)
+            await mrepo.create_active(room_id=room.id, user_id=late.id)
+            await s.commit()
+
+        # фоновая доставка и GET my_key для одного участника одновременно
+        async def my_key():
+            async with Session() as s:
+                out = await svc(s).get_my_wrapped_key(room_slug="race", user_id=late.id)
+                await s.commit()
+                return out
+
+        got = await asyncio.gather(my_key(), my_key())
+        async with Session() as s:
+            shares = [sh for sh in await CryptoRepository(s).list_shares_for_room(room_id=room.id) if sh.user_id == late.id]
+        await engine.dispose()
+        return got, shares
+
+    got, shares = asyncio.run(main())
+    assert len(shares) == 1
+    assert {g["wrapped_key_b64"] for g in got} == {shares[0].wrapped_key_b64}
+    assert len(late_priv.decrypt(base64.b64decode(shares[0].wrapped_key_b64), OAEP)) == 32
+
+
+def test_kek_required_outside_dev(monkeypatch):
+    monkeypatch.setattr(settings, "crypto_kek", "")
+    monkeypatch.setattr(settings, "app_env", "prod")
+    with pytest.raises(RuntimeError, match="APP_CRYPTO_KEK"):
+        check_kek()
+    with pytest.raises(RuntimeError):
+        seal_room_key(b"k" * 32, 1)
+
+    monkeypatch.setattr(settings, "crypto_kek", base64.b64encode(b"short").decode())
+    with pytest.raises(RuntimeError, match="32 bytes"):
+        check_kek()
+
+    kek = base64.b64encode(bytes(range(32))).decode()
+    monkeypatch.setattr(settings, "crypto_kek", kek)
+    check_kek()
+    assert open_room_key(seal_room_key(b"k" * 32, 7), 7) == b"k" * 32
@@ -0,0 +1,56 @@
+# test_sql_accounting.py
+"""
+Учёт SQL: выражения считаются по единице работы (HTTP-запрос с заголовком
+Server-Timing в debug), query_budget валит тест при превышении.
+
+Запуск: cd backend && python -m pytest -q test_sql_accounting.py
+"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.db.sql_stats import instrument, query_budget
+from app.middleware.metrics_middleware import MetricsMiddleware
+from app.services.metrics import MetricsService
+
+
+def test_query_budget_and_server_timing(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 's.db'}")
+    instrument(engine.sync_engine)
+    Session = async_sessionmaker(bind=engine)
+
+    async def queries(n):
+        async with Session() as s:
+            for _ in range(n):
+                await s.execute(text("select 1"))
+
+    with query_budget(3) as stats:
+        asyncio.run(queries(3))
+    assert stats.statements == 3 and stats.seconds > 0
+    with pytest.raises(AssertionError, match="4 > 3"):
+        with query_budget(3):
+            asyncio.run(queries(4))
+
+    svc = MetricsService()
+    monkeypatch.setattr("app.middleware.metrics_middleware.metrics_service", svc)
+    monkeypatch.setattr(settings, "debug", True)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/rooms/{slug}")
+    async def room(slug: str):
+        await queries(2)
+        return {"slug": slug}
+
+    with TestClient(app) as c:
+        r = c.get("/rooms/a")
+        c.get("/rooms/b")
+    assert '2 queries' in r.headers["server-timing"]
+    row = svc.get_sql_metrics()["http"]["GET /rooms/{slug}"]
+    assert row["count"] == 2 and row["statements"] == 4
+    asyncio.run(engine.dispose())
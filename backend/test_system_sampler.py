@@ -0,0 +1,30 @@
+# test_system_sampler.py
+"""
+Фоновый сэмплер: кольцо ограничено, эндпоинты метрик читают последний
+замер и не вызывают psutil на каждый запрос.
+
+Запуск: cd backend && python -m pytest -q test_system_sampler.py
+"""
+import psutil
+
+from app.services.metrics import MetricsService
+from app.services.system_sampler import SystemSampler
+
+
+def test_ring_and_cached_reads(monkeypatch):
+    now = [100.0]
+    sampler = SystemSampler(interval_seconds=1, history=3, clock=lambda: now[0])
+    for _ in range(5):
+        now[0] += 1
+        sampler.sample()
+    assert len(sampler.history()) == 3 and len(sampler.history(1.5)) == 2
+
+    svc = MetricsService(sampler=sampler)
+
+    def boom(*a, **kw):
+        raise AssertionError("psutil called on read")
+
+    monkeypatch.setattr(psutil, "virtual_memory", boom)
+    perf = svc.get_performance_metrics()
+    assert perf["process_memory_mb"] == sampler.latest()["process_memory_mb"] > 0
+    assert svc.get_health_status()["status"] in ("healthy", "degraded")
@@ -0,0 +1,61 @@
+# test_token_cache.py
+"""
+Кэш проверенных токенов: повторный токен не проверяется заново, истёкший
+не принимается, поддельный — отказ; REST-зависимость отвечает 401 без токена.
+
+Запуск: cd backend && python -m pytest -q test_token_cache.py
+"""
+import time
+
+import jwt
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_user_id
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.services.metrics import metrics_service
+from app.services.tokens import TokenVerifier
+
+
+def test_cache_hits_expiry_and_bad_tokens():
+    now = [time.time()]
+    tv = TokenVerifier(maxsize=2, clock=lambda: now[0])
+    token = create_access_token(user_id=7)
+    before = metrics_service.get_auth_metrics()
+
+    assert tv.user_id(token) == 7 and tv.user_id(token) == 7
+    after = metrics_service.get_auth_metrics()
+    assert after["verified"] - before["verified"] == 1
+    assert after["cache_hits"] - before["cache_hits"] == 1
+
+    with pytest.raises(ValueError):
+        tv.user_id(token[:-2] + "xx")
+
+    # кэш не продлевает жизнь токена: после exp — снова полная проверка
+    now[0] += settings.jwt_ttl_seconds + 1
+    tv.user_id(token)
+    assert metrics_service.get_auth_metrics()["verified"] - before["verified"] == 2
+    expired = jwt.encode({"uid": 7, "exp": int(time.time()) - 1}, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+    with pytest.raises(ValueError):
+        tv.user_id(expired)
+
+    # LRU ограничен
+    for uid in (1, 2, 3):
+        tv.user_id(jwt.encode({"uid": uid, "exp": int(now[0]) + 60}, settings.jwt_secret, algorithm=settings.jwt_algorithm))
+    assert len(tv) == 2
+
+
+def test_bearer_dependency():
+    app = FastAPI()
+
+    @app.get("/who")
+    async def who(uid: int = Depends(get_current_user_id)):
+        return {"uid": uid}
+
+    c = TestClient(app)
+    assert c.get("/who").status_code == 401
+    assert c.get("/who", headers={"Authorization": "Bearer nope"}).status_code == 401
+    r = c.get("/who", headers={"Authorization": f"Bearer {create_access_token(user_id=5)}"})
+    assert r.json() == {"uid": 5}